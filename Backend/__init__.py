@@ -4,7 +4,7 @@ from flask_login import LoginManager
 from jinja2 import ChoiceLoader, FileSystemLoader
 from werkzeug.exceptions import NotFound
 
-from .models import get_user, seed_sample_users
+from .models import get_cached_user, seed_sample_users
 from .db import init_db
 
 login_manager = LoginManager()
@@ -58,6 +58,26 @@ def create_app():
     app.config['JWT_SECRET'] = os.environ.get('VMS_JWT_SECRET', 'jwt-secret')
     app.config['JWT_ALGORITHM'] = os.environ.get('VMS_JWT_ALGORITHM', 'HS256')
     app.config['JWT_EXP_HOURS'] = int(os.environ.get('VMS_JWT_EXP_HOURS', '24'))
+    # staging area for chunked uploads; must be shared by all workers
+    app.config['UPLOAD_STAGING_DIR'] = os.environ.get('VMS_UPLOAD_STAGING_DIR')
+    app.config['UPLOAD_MAX_ROWS'] = int(os.environ.get('VMS_UPLOAD_MAX_ROWS', '100000'))
+    app.config['UPLOAD_MAX_BYTES'] = int(os.environ.get('VMS_UPLOAD_MAX_BYTES', str(50 * 1024 * 1024)))
+    # content-addressed ticket attachment store (see storage.py); must be shared by all workers
+    app.config['ATTACHMENT_STORAGE_DIR'] = os.environ.get('VMS_ATTACHMENT_STORAGE_DIR')
+    # let the front proxy send attachment bytes: 'x-accel' (nginx) or 'x-sendfile'; unset serves them directly
+    app.config['ATTACHMENT_SENDFILE'] = os.environ.get('VMS_ATTACHMENT_SENDFILE') or None
+    app.config['ATTACHMENT_ACCEL_PREFIX'] = os.environ.get('VMS_ATTACHMENT_ACCEL_PREFIX', '/_attachments/')
+    # processes rendering attachment previews (needs Pillow; PyMuPDF for PDFs); 0 disables them
+    app.config['THUMBNAIL_WORKERS'] = int(os.environ.get('VMS_THUMBNAIL_WORKERS', '2'))
+    # timelog data-quality scan: open sessions older than this many hours are stale;
+    # the policy is 'flag' (record only) or 'close' (auto-close for review)
+    app.config['TIMELOG_STALE_HOURS'] = int(os.environ.get('VMS_TIMELOG_STALE_HOURS', '48'))
+    app.config['TIMELOG_STALE_POLICY'] = os.environ.get('VMS_TIMELOG_STALE_POLICY', 'flag')
+    # ticket notifications are coalesced per recipient over this many minutes;
+    # urgent tickets are always emailed immediately
+    app.config['TICKET_DIGEST_MINUTES'] = int(os.environ.get('VMS_TICKET_DIGEST_MINUTES', '15'))
+    # assign new tickets to the officer with the fewest open and in-progress tickets
+    app.config['TICKET_AUTO_ASSIGN'] = bool(int(os.environ.get('VMS_TICKET_AUTO_ASSIGN', '0')))
     
     # PostgreSQL database configuration (required)
     database_url = os.environ.get('DATABASE_URL')
@@ -102,7 +122,7 @@ def create_app():
 
     @login_manager.user_loader
     def load_user(user_id):
-        return get_user(user_id)
+        return get_cached_user(user_id)
 
     # register blueprints
     from .auth import bp as auth_bp
@@ -111,6 +131,7 @@ def create_app():
     from .log import bp as log_bp
     from .admin import bp as admin_bp
     from .tickets import bp as tickets_bp
+    from .chunked_uploads import bp as uploads_bp
 
     app.register_blueprint(auth_bp)
     app.register_blueprint(officer_bp, url_prefix='/officer')
@@ -118,6 +139,7 @@ def create_app():
     app.register_blueprint(log_bp)
     app.register_blueprint(admin_bp, url_prefix='/admin')
     app.register_blueprint(tickets_bp)
+    app.register_blueprint(uploads_bp)
 
     # Add custom Jinja2 filters
     @app.template_filter('format_datetime')
@@ -161,6 +183,13 @@ def create_app():
         # Race condition when multiple workers try to seed simultaneously - safe to ignore
         app.logger.info(f'Seed users skipped (already seeded or race condition): {e}')
 
+    from .maintenance import init_app as init_maintenance
+    init_maintenance(app)
+    from .notifications import init_app as init_notifications
+    init_notifications(app)
+    from .workload import init_app as init_workload
+    init_workload(app)
+
     # initialize email subsystem if available
     try:
         from .email import init_mail
@@ -193,8 +222,7 @@ def create_app():
         try:
             from flask import session
             from flask_login import current_user
-            from .db import get_db
-            from . import models
+            from .stats import officer_counters
         except Exception:
             return {}
         view_as_role = session.get('view_as_role')
@@ -221,10 +249,10 @@ def create_app():
         pending_bulk_submissions_count = 0
         if effective_role == 'officer' and getattr(current_user, 'is_authenticated', False):
             try:
-                db = get_db()
-                pending_timelogs_count = db.query(models.TimeLog).filter(models.TimeLog.status == 'PENDING').count()
-                pending_event_requests_count = db.query(models.TimeLog).filter(models.TimeLog.status == 'PENDING_APPROVAL').count()
-                pending_bulk_submissions_count = db.query(models.BulkSubmission).filter(models.BulkSubmission.status == 'PENDING').count()
+                counters = officer_counters(current_user.id)
+                pending_timelogs_count = counters['pending_timelogs']
+                pending_event_requests_count = counters['pending_event_requests']
+                pending_bulk_submissions_count = counters['pending_bulk_submissions']
             except Exception:
                 pending_timelogs_count = 0
                 pending_event_requests_count = 0
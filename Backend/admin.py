@@ -1,9 +1,10 @@
 from flask import Blueprint, render_template, request, redirect, url_for, flash, current_app, session
 from flask_login import login_required, current_user
 from .db import get_db
-from . import models
+from . import models, maintenance
 from .email import send_email
 from werkzeug.security import generate_password_hash
+from datetime import datetime
 
 bp = Blueprint('admin', __name__)
 
@@ -154,6 +155,65 @@ def email_logs():
     return render_template('admin/email_logs.html', logs=logs, page=page, per_page=per_page, total=total, url_for_page=url_for_page, status=status, q=q, start=start, end=end)
 
 
+@bp.route('/timelog-anomalies', methods=('GET', 'POST'))
+@login_required
+def timelog_anomalies():
+    if not admin_required():
+        return render_template('403.html'), 403
+    db = get_db()
+    Anomaly = models.TimelogAnomaly
+    if request.method == 'POST':
+        action = request.form.get('action')
+        if action == 'scan':
+            policy = request.form.get('policy') or None
+            try:
+                summary = maintenance.scan_timelogs(policy=policy)
+            except Exception as e:
+                current_app.logger.exception('Timelog scan failed')
+                flash(f'Scan failed: {e}')
+            else:
+                flash(
+                    f"Scanned {summary['scanned']} timelogs: {summary['recomputed']} hours recomputed, "
+                    f"{summary['closed']} stale sessions closed, {summary['recorded']} new anomalies"
+                )
+        elif action == 'resolve':
+            ids = [i for i in request.form.getlist('ids[]') if i]
+            if not ids:
+                flash('No anomalies selected')
+            else:
+                count = db.query(Anomaly).filter(Anomaly.id.in_(ids), Anomaly.status == 'OPEN').update(
+                    {'status': 'RESOLVED', 'resolved_at': datetime.utcnow(), 'resolved_by': current_user.id},
+                    synchronize_session=False,
+                )
+                db.commit()
+                flash(f'{count} anomalies marked resolved')
+        return redirect(url_for('admin.timelog_anomalies', **request.args.to_dict()))
+
+    page = int(request.args.get('page') or 1)
+    per_page = int(request.args.get('per_page') or 50)
+    kind = request.args.get('kind') or ''
+    status = request.args.get('status') or 'OPEN'
+    query = db.query(Anomaly, models.TimeLog).join(models.TimeLog, models.TimeLog.id == Anomaly.timelog_id)
+    if status != 'ALL':
+        query = query.filter(Anomaly.status == status)
+    if kind:
+        query = query.filter(Anomaly.kind == kind)
+    total = query.count()
+    rows = query.order_by(Anomaly.created_at.desc(), Anomaly.id).offset((page-1)*per_page).limit(per_page).all()
+
+    def url_for_page(p):
+        args = request.args.to_dict()
+        args['page'] = p
+        return url_for('admin.timelog_anomalies', **args)
+
+    return render_template(
+        'admin/timelog_anomalies.html', rows=rows, counts=maintenance.open_anomaly_counts(),
+        kinds=[(k, k.replace('_', ' ').title()) for k in maintenance.ANOMALY_KINDS],
+        kind=kind, status=status, page=page, per_page=per_page, total=total, url_for_page=url_for_page,
+        policy=current_app.config.get('TIMELOG_STALE_POLICY', 'flag'),
+    )
+
+
 @bp.route('/users')
 @login_required
 def users():
@@ -239,6 +299,7 @@ def edit_user(user_id):
         if password:
             user.password_hash = generate_password_hash(password)
         db.commit()
+        models.bump_user_version(user.id)
         flash('User updated')
         return redirect(url_for('admin.users'))
     return render_template('admin/user_form.html', action='Edit', user=user)
@@ -256,6 +317,7 @@ def delete_user(user_id):
         return redirect(url_for('admin.users'))
     db.delete(user)
     db.commit()
+    models.bump_user_version(user_id)
     flash('User deleted')
     return redirect(url_for('admin.users'))
 
@@ -272,6 +334,7 @@ def promote_user(user_id):
         return redirect(url_for('admin.users'))
     user.role = 'admin'
     db.commit()
+    models.bump_user_version(user.id)
     flash(f'User {user.email} promoted to admin')
     return redirect(url_for('admin.users'))
 
@@ -289,5 +352,6 @@ def demote_user(user_id):
     # demote to officer by default
     user.role = 'officer'
     db.commit()
+    models.bump_user_version(user.id)
     flash(f'User {user.email} demoted to officer')
     return redirect(url_for('admin.users'))
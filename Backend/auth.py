@@ -1,13 +1,13 @@
 from flask import Blueprint, render_template, request, redirect, url_for, flash, current_app
 from werkzeug.security import check_password_hash, generate_password_hash
 from flask_login import login_user, logout_user, current_user, login_required
-import json
 
 from .models import seed_sample_users, gen_id, next_timelog_id
 from .db import get_db
 from . import log as log_mod
-from . import models
+from . import models, overlaps
 from .email import send_email
+from .stats import officer_counters, club_leader_counters
 import jwt
 from datetime import datetime, timedelta
 from flask import abort
@@ -62,47 +62,28 @@ def home_page():
         if role == 'admin':
             return render_template('home_admin.html')
         if role == 'officer':
-            # Get officer dashboard stats
+            # Get officer dashboard stats (one cached query shared with the header badges)
             db = get_db()
-            now = datetime.utcnow()
-            
-            # Pending approvals count
-            pending_count = db.query(models.TimeLog).filter(models.TimeLog.status.in_(['PENDING', 'PENDING_APPROVAL'])).count()
+            counters = officer_counters(current_user.id)
+            pending_count = counters['pending_timelogs'] + counters['pending_event_requests']
+            active_events = counters['active_events']
+            total_events = counters['total_events']
             
             # Recent events created by this officer
             recent_events = db.query(models.Event).filter_by(officer_id=current_user.id).order_by(models.Event.created_at.desc()).limit(3).all()
             
-            # Active events (currently running)
-            active_events = db.query(models.Event).filter(
-                models.Event.start_ts <= now,
-                models.Event.end_ts > now
-            ).count()
-            
-            # Total events created
-            total_events = db.query(models.Event).filter_by(officer_id=current_user.id).count()
-            
             return render_template('home_officer.html', 
                                  pending_count=pending_count,
                                  recent_events=recent_events,
                                  active_events=active_events,
                                  total_events=total_events)
         if role in ('club_leader', 'clubleader'):
-            # Club leader statistics
+            # Club leader statistics, computed in SQL from the submission entries
             db = get_db()
-            pending_submissions = db.query(models.BulkSubmission).filter_by(club_leader_id=current_user.id, status='PENDING').count()
-            total_submissions = db.query(models.BulkSubmission).filter_by(club_leader_id=current_user.id).count()
-            
-            # Get total unique volunteers from all submissions
-            all_submissions = db.query(models.BulkSubmission).filter_by(club_leader_id=current_user.id).all()
-            volunteer_emails = set()
-            for sub in all_submissions:
-                try:
-                    hours_data = json.loads(sub.hours_data or '[]')
-                    for entry in hours_data:
-                        volunteer_emails.add(entry.get('email', '').lower())
-                except:
-                    pass
-            total_volunteers = len(volunteer_emails)
+            counters = club_leader_counters(current_user.id)
+            pending_submissions = counters['pending_submissions']
+            total_submissions = counters['total_submissions']
+            total_volunteers = counters['total_volunteers']
             
             # Recent submissions (last 5)
             recent_submissions = db.query(models.BulkSubmission).filter_by(club_leader_id=current_user.id).order_by(models.BulkSubmission.created_at.desc()).limit(5).all()
@@ -173,6 +154,7 @@ def reset_password(token):
             return redirect(request.url)
         user.password_hash = __import__('werkzeug.security', fromlist=['generate_password_hash']).generate_password_hash(pw)
         db.commit()
+        models.bump_user_version(user.id)
         flash('Password updated; please login')
         return redirect(url_for('auth.login'))
     return render_template('auth/reset.html', token=token)
@@ -271,6 +253,13 @@ def signup_event():
             flash('You are already signed up for that event')
         return redirect(url_for('auth.volunteer_dashboard'))
     
+    # reject signups that clash with an event the student already holds a slot for
+    clashes = overlaps.conflicting_events(db, user_email, event)
+    if clashes:
+        names = ', '.join(e.name or e.id for e in clashes)
+        flash(f'This event overlaps with {names}, which you are already signed up for.')
+        return redirect(url_for('auth.volunteer_dashboard'))
+
     tid = next_timelog_id()
     if is_active:
         # For active events, create a pending approval request
@@ -393,6 +382,7 @@ def profile():
                 flash('Password updated successfully', 'success')
         
         db.commit()
+        models.bump_user_version(user.id)
         flash('Profile updated successfully', 'success')
         return redirect(url_for('auth.profile'))
     
@@ -0,0 +1,264 @@
+"""Resumable, chunked uploads for large spreadsheets.
+
+The browser opens an upload session, sends the file in parts at explicit
+byte offsets (an interrupted upload resumes from ``received_bytes``) and then
+completes it. Completion checks the size and SHA-256 digest and starts a
+background job that parses the staged file with ``parsers`` while the browser
+polls for progress. The parsed result waits in the staging area until the form
+that started the upload (club hours or event roster) consumes it.
+"""
+import hashlib
+import json
+import os
+import re
+import threading
+from datetime import datetime, timedelta
+
+from flask import Blueprint, request, jsonify, current_app, abort
+from flask_login import login_required, current_user
+from sqlalchemy import update
+
+from . import models, parsers
+from .db import get_db
+
+bp = Blueprint('uploads', __name__, url_prefix='/uploads')
+
+CHUNK_SIZE = 1024 * 1024  # bytes per part; small enough to finish well inside a worker timeout
+STALE_AFTER = timedelta(hours=24)
+ALLOWED_EXTENSIONS = ('.csv', '.xlsx', '.xls')
+# upload purpose -> roles allowed to start one
+PURPOSES = {
+    'hours': ('club_leader',),
+    'roster': ('officer',),
+}
+_SHA256_RE = re.compile(r'^[0-9a-f]{64}$')
+
+
+def staging_dir():
+    path = current_app.config.get('UPLOAD_STAGING_DIR') or os.path.join(current_app.root_path, 'uploads', 'staging')
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def _data_path(upload_id):
+    return os.path.join(staging_dir(), f'{upload_id}.part')
+
+
+def _result_path(upload_id):
+    return os.path.join(staging_dir(), f'{upload_id}.json')
+
+
+def _remove_files(upload_id):
+    for path in (_data_path(upload_id), _result_path(upload_id)):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def _status(up):
+    return {
+        'upload_id': up.id,
+        'status': up.status,
+        'received_bytes': up.received_bytes or 0,
+        'total_size': up.total_size,
+        'rows_processed': up.rows_processed or 0,
+        'error': up.error,
+        'chunk_size': CHUNK_SIZE,
+    }
+
+
+def _get_owned(upload_id):
+    up = get_db().query(models.UploadSession).filter_by(id=upload_id, owner_id=current_user.id).first()
+    if not up:
+        abort(404)
+    return up
+
+
+def purge_stale_uploads():
+    """Delete upload sessions (and their staged files) older than ``STALE_AFTER``."""
+    db = get_db()
+    cutoff = datetime.utcnow() - STALE_AFTER
+    stale = [uid for (uid,) in db.query(models.UploadSession.id).filter(models.UploadSession.created_at < cutoff).all()]
+    if not stale:
+        return 0
+    for uid in stale:
+        _remove_files(uid)
+    db.query(models.UploadSession).filter(models.UploadSession.id.in_(stale)).delete(synchronize_session=False)
+    db.commit()
+    return len(stale)
+
+
+@bp.route('/', methods=['POST'])
+@login_required
+def create_upload():
+    """Open an upload session. Body: ``{"purpose", "filename", "size", "sha256"}``."""
+    data = request.get_json(silent=True) or {}
+    purpose = data.get('purpose')
+    if purpose not in PURPOSES:
+        return jsonify({'error': 'Unknown upload purpose'}), 400
+    if current_user.role not in PURPOSES[purpose]:
+        abort(403)
+    filename = os.path.basename(str(data.get('filename') or ''))
+    if not filename.lower().endswith(ALLOWED_EXTENSIONS):
+        return jsonify({'error': 'Invalid file type. Please upload .xlsx, .xls, or .csv file'}), 400
+    try:
+        size = int(data.get('size'))
+    except (TypeError, ValueError):
+        return jsonify({'error': 'size is required'}), 400
+    if size <= 0:
+        return jsonify({'error': 'The file is empty'}), 400
+    max_bytes = parsers.upload_limits()[1]
+    if size > max_bytes:
+        return jsonify({'error': f'File too large (max {max_bytes // (1024 * 1024)}MB)'}), 413
+    sha256 = (data.get('sha256') or '').lower() or None
+    if sha256 and not _SHA256_RE.match(sha256):
+        return jsonify({'error': 'sha256 must be a hex digest'}), 400
+
+    purge_stale_uploads()
+    db = get_db()
+    up = models.UploadSession(
+        id=models.gen_id('up_'), owner_id=current_user.id, purpose=purpose, filename=filename,
+        total_size=size, sha256=sha256, received_bytes=0, status='UPLOADING', rows_processed=0,
+    )
+    db.add(up)
+    db.commit()
+    open(_data_path(up.id), 'wb').close()
+    return jsonify(_status(up)), 201
+
+
+@bp.route('/<upload_id>', methods=['GET'])
+@login_required
+def upload_status(upload_id):
+    """Progress of an upload; clients resume by sending from ``received_bytes``."""
+    return jsonify(_status(_get_owned(upload_id)))
+
+
+@bp.route('/<upload_id>/parts', methods=['PUT'])
+@login_required
+def upload_part(upload_id):
+    """Store one part of the file. ``?offset=`` must equal the bytes received so far."""
+    db = get_db()
+    up = _get_owned(upload_id)
+    if up.status != 'UPLOADING':
+        return jsonify(dict(_status(up), error='Upload is no longer accepting data')), 409
+    offset = request.args.get('offset', type=int)
+    if offset != up.received_bytes:
+        # the client is out of sync (e.g. a retried part); tell it where to resume
+        return jsonify(dict(_status(up), error='Unexpected offset')), 409
+    if request.content_length is not None and request.content_length > CHUNK_SIZE:
+        return jsonify({'error': f'Parts may be at most {CHUNK_SIZE} bytes'}), 413
+    chunk = request.stream.read(CHUNK_SIZE + 1)
+    if not chunk or len(chunk) > CHUNK_SIZE:
+        return jsonify({'error': f'Parts must be 1 to {CHUNK_SIZE} bytes'}), 400
+    if offset + len(chunk) > up.total_size:
+        return jsonify({'error': 'Part extends past the declared file size'}), 400
+    part_digest = (request.headers.get('X-Part-SHA256') or '').lower()
+    if part_digest and hashlib.sha256(chunk).hexdigest() != part_digest:
+        return jsonify(dict(_status(up), error='Part checksum mismatch')), 422
+
+    with open(_data_path(up.id), 'r+b') as f:
+        f.seek(offset)
+        f.write(chunk)
+    # only advance if nobody else did meanwhile, so duplicate sends stay harmless
+    db.execute(
+        update(models.UploadSession)
+        .where(models.UploadSession.id == up.id, models.UploadSession.received_bytes == offset)
+        .values(received_bytes=offset + len(chunk), updated_at=datetime.utcnow())
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+    db.refresh(up)
+    return jsonify(_status(up))
+
+
+@bp.route('/<upload_id>/complete', methods=['POST'])
+@login_required
+def complete_upload(upload_id):
+    """Verify the assembled file and start parsing it in the background."""
+    db = get_db()
+    up = _get_owned(upload_id)
+    if up.status != 'UPLOADING':
+        return jsonify(_status(up))
+    if up.received_bytes != up.total_size:
+        return jsonify(dict(_status(up), error='Upload is incomplete')), 409
+
+    digest = hashlib.sha256()
+    with open(_data_path(up.id), 'rb') as f:
+        for block in iter(lambda: f.read(CHUNK_SIZE), b''):
+            digest.update(block)
+    if up.sha256 and digest.hexdigest() != up.sha256:
+        up.status = 'FAILED'
+        up.error = 'Checksum mismatch; please upload the file again'
+        db.commit()
+        _remove_files(up.id)
+        return jsonify(_status(up)), 422
+    up.sha256 = digest.hexdigest()
+    up.status = 'PARSING'
+    db.commit()
+
+    app = current_app._get_current_object()
+    threading.Thread(target=_parse_job, args=(app, up.id), daemon=True).start()
+    return jsonify(_status(up)), 202
+
+
+def _parse_job(app, upload_id):
+    with app.app_context():
+        db = get_db()
+        up = db.query(models.UploadSession).filter_by(id=upload_id).first()
+        if not up:
+            return
+
+        def progress(rows):
+            db.execute(
+                update(models.UploadSession).where(models.UploadSession.id == upload_id)
+                .values(rows_processed=int(rows)).execution_options(synchronize_session=False)
+            )
+            db.commit()
+
+        try:
+            with open(_data_path(upload_id), 'rb') as f:
+                if up.purpose == 'hours':
+                    entries, errors, error_count = parsers.parse_hours_file(f, up.filename, progress=progress)
+                    result = {'entries': entries, 'errors': errors, 'error_count': error_count}
+                else:
+                    result = {'volunteers': parsers.parse_roster(f, up.filename, progress=progress)}
+            tmp = _result_path(upload_id) + '.tmp'
+            with open(tmp, 'w') as out:
+                json.dump(result, out)
+            os.replace(tmp, _result_path(upload_id))
+            up.status, up.error = 'PARSED', None
+        except parsers.ParseError as e:
+            up.status, up.error = 'FAILED', str(e)
+        except Exception:
+            app.logger.exception('Parsing upload %s failed', upload_id)
+            up.status, up.error = 'FAILED', 'Could not process the file'
+        db.commit()
+
+
+def load_upload_result(upload_id, purpose):
+    """Return the parsed result of the current user's finished upload.
+
+    Raises ``parsers.ParseError`` with a user-facing message when the upload
+    is unknown, still being processed or failed.
+    """
+    up = get_db().query(models.UploadSession).filter_by(id=upload_id, owner_id=current_user.id, purpose=purpose).first()
+    if not up or up.status == 'CONSUMED':
+        raise parsers.ParseError('Upload not found; please choose the file again')
+    if up.status == 'FAILED':
+        raise parsers.ParseError(up.error or 'Could not process the file')
+    if up.status != 'PARSED':
+        raise parsers.ParseError('The file is still being processed; please submit again in a moment')
+    with open(_result_path(upload_id)) as f:
+        return json.load(f)
+
+
+def finish_upload(upload_id):
+    """Mark an upload as used and delete its staged files.
+
+    Call after the data taken from it has been committed.
+    """
+    db = get_db()
+    db.query(models.UploadSession).filter_by(id=upload_id).update({'status': 'CONSUMED'}, synchronize_session=False)
+    db.commit()
+    _remove_files(upload_id)
@@ -1,11 +1,12 @@
-from flask import Blueprint, render_template, request, flash, current_app, abort, redirect, url_for
+from flask import Blueprint, render_template, request, flash, current_app, abort, redirect, url_for, jsonify
 from flask_login import login_required, current_user
 import json
-import pandas as pd
 import os
 from werkzeug.utils import secure_filename
 
-from . import models
+from sqlalchemy import func, insert
+
+from . import chunked_uploads, models, parsers
 from .db import get_db
 
 bp = Blueprint('club', __name__)
@@ -21,85 +22,40 @@ def submit_hours():
         date_range = request.form.get('date_range')
         description = request.form.get('description')
 
-        # Check if file was uploaded
-        if 'hours_file' not in request.files:
-            flash('No file uploaded')
-            return render_template('submit_hours.html')
-
-        file = request.files['hours_file']
-        if file.filename == '':
-            flash('No file selected')
-            return render_template('submit_hours.html')
-
-        if not file.filename.lower().endswith(('.xlsx', '.xls', '.csv')):
-            flash('Invalid file type. Please upload .xlsx, .xls, or .csv file')
-            return render_template('submit_hours.html')
-
-        try:
-            # Read the file
-            if file.filename.lower().endswith('.csv'):
-                df = pd.read_csv(file)
-            else:
-                df = pd.read_excel(file)
-
-            # Validate required columns
-            required_columns = ['name', 'email', 'hours', 'role']
-            missing_columns = [col for col in required_columns if col not in df.columns]
-            if missing_columns:
-                flash(f'Missing required columns: {", ".join(missing_columns)}')
+        upload_id = request.form.get('upload_id')
+        if upload_id:
+            # the file was sent through the chunked upload path and parsed in the background
+            try:
+                result = chunked_uploads.load_upload_result(upload_id, 'hours')
+            except parsers.ParseError as e:
+                flash(str(e))
+                return render_template('submit_hours.html')
+            batches = [(result['entries'], result['errors'])]
+            error_count = result['error_count']
+        else:
+            # Check if file was uploaded
+            if 'hours_file' not in request.files:
+                flash('No file uploaded')
                 return render_template('submit_hours.html')
 
-            # Process and validate data
-            entries = []
-            errors = []
-
-            for idx, row in df.iterrows():
-                try:
-                    name = str(row['name']).strip()
-                    email = str(row['email']).strip().lower()
-                    hours = float(row['hours'])
-                    role = str(row['role']).strip()
-
-                    # Validate email format and domain
-                    if not email.endswith('@auib.edu.iq'):
-                        errors.append(f'Row {idx+2}: Email must end with @auib.edu.iq: {email}')
-                        continue
-
-                    if not models.is_valid_email(email):
-                        errors.append(f'Row {idx+2}: Invalid email format: {email}')
-                        continue
-
-                    if hours <= 0:
-                        errors.append(f'Row {idx+2}: Hours must be positive: {hours}')
-                        continue
-
-                    if not name or not role:
-                        errors.append(f'Row {idx+2}: Name and role are required')
-                        continue
-
-                    entries.append({
-                        'name': name,
-                        'email': email,
-                        'hours': hours,
-                        'role': role
-                    })
-
-                except Exception as e:
-                    errors.append(f'Row {idx+2}: Error processing data - {str(e)}')
-
-            if errors:
-                flash('Validation errors found:<br>' + '<br>'.join(errors))
+            file = request.files['hours_file']
+            if file.filename == '':
+                flash('No file selected')
                 return render_template('submit_hours.html')
 
-            if not entries:
-                flash('No valid entries found in the file')
+            if not file.filename.lower().endswith(('.xlsx', '.xls', '.csv')):
+                flash('Invalid file type. Please upload .xlsx, .xls, or .csv file')
                 return render_template('submit_hours.html')
 
-            # Create bulk submission
-            b_id = models.next_bulk_id()
-            db = get_db()
+            # validated chunks go straight into the insert; nothing holds the whole file
+            batches = parsers.iter_hours_batches(file, file.filename, file.mimetype)
+            error_count = 0
 
-            # Create bulk submission
+        b_id = models.next_bulk_id()
+        db = get_db()
+        errors = []
+        inserted = 0
+        try:
             sub = models.BulkSubmission(
                 id=b_id,
                 club_leader_id=current_user.id,
@@ -109,29 +65,58 @@ def submit_hours():
                 status='PENDING'
             )
             db.add(sub)
+            db.flush()
+
+            for entries, batch_errors in batches:
+                if not upload_id:
+                    error_count += len(batch_errors)
+                errors.extend(batch_errors[:parsers.MAX_REPORTED_ERRORS - len(errors)])
+                if entries and not error_count:
+                    # one executemany per chunk instead of an ORM object per row
+                    db.execute(insert(models.BulkSubmissionEntry), [
+                        dict(
+                            entry, id=models.gen_id('be_'), bulk_submission_id=b_id, status='PENDING',
+                            fingerprint=models.entry_fingerprint(entry['email'], project_name, date_range, entry['hours']),
+                        )
+                        for entry in entries
+                    ])
+                    inserted += len(entries)
+        except parsers.ParseError as e:
+            db.rollback()
+            flash(str(e))
+            return render_template('submit_hours.html')
+        except Exception as e:
+            db.rollback()
+            flash(f'Error processing file: {str(e)}')
+            return render_template('submit_hours.html')
 
-            # Create individual entries
-            for entry in entries:
-                entry_id = models.gen_id('be_')
-                bulk_entry = models.BulkSubmissionEntry(
-                    id=entry_id,
-                    bulk_submission_id=b_id,
-                    name=entry['name'],
-                    email=entry['email'],
-                    hours=entry['hours'],
-                    role=entry['role'],
-                    status='PENDING'
-                )
-                db.add(bulk_entry)
+        if error_count:
+            db.rollback()
+            more = error_count - len(errors)
+            flash('Validation errors found:<br>' + '<br>'.join(errors) + (f'<br>...and {more} more' if more else ''))
+            return render_template('submit_hours.html')
 
-            db.commit()
-            flash(f'Bulk submission created with {len(entries)} entries pending officer approval')
-            return redirect(url_for('club.my_submissions'))
+        if not inserted:
+            db.rollback()
+            flash('No valid entries found in the file')
+            return render_template('submit_hours.html')
 
+        try:
+            duplicates = models.flag_duplicate_entries(db, b_id)
+            db.commit()
         except Exception as e:
+            db.rollback()
             flash(f'Error processing file: {str(e)}')
             return render_template('submit_hours.html')
 
+        if upload_id:
+            chunked_uploads.finish_upload(upload_id)
+        flash(f'Bulk submission created with {inserted} entries pending officer approval')
+        if duplicates:
+            flash(f'{duplicates} entries repeat hours already claimed for this project and date range; '
+                  'they are flagged for the officer reviewing the submission')
+        return redirect(url_for('club.my_submissions'))
+
     return render_template('submit_hours.html')
 
 
@@ -141,19 +126,64 @@ def my_submissions():
     if current_user.role != 'club_leader':
         abort(403)
     db = get_db()
-    submissions = db.query(models.BulkSubmission).filter_by(club_leader_id=current_user.id).order_by(models.BulkSubmission.created_at.desc()).all()
-
-    # Add computed fields for template
-    for s in submissions:
-        # Get entries for this submission
-        entries = db.query(models.BulkSubmissionEntry).filter_by(bulk_submission_id=s.id).all()
-        s.total_volunteers = len(entries)
-        s.total_hours = sum(entry.hours for entry in entries)
-        s.entries = entries  # Add entries to submission object
-
-        # Count approved/rejected entries
-        s.approved_count = sum(1 for entry in entries if entry.status == 'APPROVED')
-        s.rejected_count = sum(1 for entry in entries if entry.status == 'REJECTED')
-        s.pending_count = sum(1 for entry in entries if entry.status == 'PENDING')
-
-    return render_template('my_submissions.html', submissions=submissions)
+    Sub, Entry = models.BulkSubmission, models.BulkSubmissionEntry
+    try:
+        page = max(1, int(request.args.get('page', 1)))
+    except ValueError:
+        page = 1
+    try:
+        per_page = min(100, max(1, int(request.args.get('per_page', 20))))
+    except ValueError:
+        per_page = 20
+
+    # one grouped query per page: entry totals per submission plus the overall count
+    rows = db.query(
+        Sub,
+        func.count(Entry.id).label('total_volunteers'),
+        func.coalesce(func.sum(Entry.hours), 0).label('total_hours'),
+        func.count(Entry.id).filter(Entry.status == 'APPROVED').label('approved_count'),
+        func.count(Entry.id).filter(Entry.status == 'REJECTED').label('rejected_count'),
+        func.count(Entry.id).filter(Entry.status == 'PENDING').label('pending_count'),
+        func.count().over().label('total'),
+    ).outerjoin(Entry, Entry.bulk_submission_id == Sub.id).filter(
+        Sub.club_leader_id == current_user.id
+    ).group_by(Sub.id).order_by(Sub.created_at.desc(), Sub.id).offset((page - 1) * per_page).limit(per_page).all()
+
+    if not rows and page > 1:
+        return redirect(url_for('club.my_submissions', per_page=per_page))
+
+    submissions = []
+    for row in rows:
+        s = row[0]
+        s.total_volunteers = row.total_volunteers
+        s.total_hours = row.total_hours
+        s.approved_count = row.approved_count
+        s.rejected_count = row.rejected_count
+        s.pending_count = row.pending_count
+        submissions.append(s)
+    total = rows[0].total if rows else 0
+
+    def url_for_page(p):
+        return url_for('club.my_submissions', page=p, per_page=per_page)
+
+    return render_template('my_submissions.html', submissions=submissions, page=page, per_page=per_page, total=total, url_for_page=url_for_page)
+
+
+@bp.route('/my_submissions/<b_id>/entries')
+@login_required
+def submission_entries(b_id):
+    """JSON page of one of the leader's submissions' entries (``?after=<entry id>``)."""
+    if current_user.role != 'club_leader':
+        abort(403)
+    db = get_db()
+    sub = db.query(models.BulkSubmission).filter_by(id=b_id, club_leader_id=current_user.id).first()
+    if not sub:
+        return jsonify({'error': 'Submission not found'}), 404
+    entries, next_after = models.bulk_entries_page(sub, request.args.get('after'))
+    return jsonify({
+        'entries': [
+            {'id': e.id, 'name': e.name, 'email': e.email, 'hours': e.hours, 'role': e.role, 'status': e.status, 'rejection_reason': e.rejection_reason}
+            for e in entries
+        ],
+        'next': next_after,
+    })
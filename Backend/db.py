@@ -4,6 +4,50 @@ from sqlalchemy.orm import sessionmaker, scoped_session
 
 SessionLocal = None
 
+# index DDL applied on startup; names match what create_all generates for index=True
+_INDEXES = [
+    'CREATE INDEX IF NOT EXISTS ix_timelogs_status ON timelogs (status)',
+    'CREATE INDEX IF NOT EXISTS ix_bulk_submissions_status ON bulk_submissions (status)',
+    'CREATE INDEX IF NOT EXISTS ix_bulk_submissions_club_leader_id ON bulk_submissions (club_leader_id)',
+    'CREATE INDEX IF NOT EXISTS ix_bulk_submission_entries_bulk_submission_id ON bulk_submission_entries (bulk_submission_id)',
+    'CREATE INDEX IF NOT EXISTS ix_bulk_submission_entries_fingerprint ON bulk_submission_entries (fingerprint)',
+    'CREATE INDEX IF NOT EXISTS ix_timelogs_fingerprint ON timelogs (fingerprint)',
+    'CREATE INDEX IF NOT EXISTS ix_ticket_responses_ticket_id ON ticket_responses (ticket_id)',
+    'CREATE INDEX IF NOT EXISTS ix_ticket_attachments_ticket_id ON ticket_attachments (ticket_id)',
+    'CREATE INDEX IF NOT EXISTS ix_ticket_attachments_sha256 ON ticket_attachments (sha256)',
+]
+
+
+def _backfill_fingerprints(conn, batch_size=5000):
+    """Fingerprint existing bulk entries and copy them onto the timelogs approved from them."""
+    from sqlalchemy import text
+    from .models import entry_fingerprint
+    rows = conn.execute(text(
+        'SELECT e.id, e.email, s.project_name, s.date_range, e.hours '
+        'FROM bulk_submission_entries e JOIN bulk_submissions s ON s.id = e.bulk_submission_id'
+    ))
+    while True:
+        batch = rows.fetchmany(batch_size)
+        if not batch:
+            break
+        params = [{'id': r[0], 'fp': entry_fingerprint(r[1], r[2], r[3], r[4])} for r in batch]
+        conn.execute(text('UPDATE bulk_submission_entries SET fingerprint = :fp WHERE id = :id'), params)
+        # bulk approvals create timelog 'tl_' || entry id
+        conn.execute(text("UPDATE timelogs SET fingerprint = :fp WHERE id = 'tl_' || :id"), params)
+
+
+def _backfill_ticket_responses(conn):
+    """Fill ``tickets.responses_text`` from the existing public responses."""
+    from sqlalchemy import text
+    if conn.dialect.name == 'postgresql':
+        agg = "string_agg(r.response_text, E'\\n' ORDER BY r.created_at)"
+    else:
+        agg = 'group_concat(r.response_text, char(10))'
+    conn.execute(text(
+        f'UPDATE tickets SET responses_text = (SELECT {agg} FROM ticket_responses r '
+        'WHERE r.ticket_id = tickets.id AND (r.is_internal IS NULL OR r.is_internal = 0))'
+    ))
+
 
 def init_db(app):
     global SessionLocal
@@ -97,6 +141,86 @@ def init_db(app):
                         app.logger.info('Added cgpa column to timelogs table')
                     except Exception:
                         app.logger.info('Could not add cgpa column to timelogs (may not be supported by this DB)')
+                if 'fingerprint' not in timelog_cols:
+                    try:
+                        conn.execute(text('ALTER TABLE timelogs ADD COLUMN fingerprint VARCHAR(64)'))
+                        app.logger.info('Added fingerprint column to timelogs table')
+                    except Exception:
+                        app.logger.info('Could not add fingerprint column to timelogs (may not be supported by this DB)')
+
+        # Add duplicate-claim columns to bulk_submission_entries and fingerprint existing rows
+        if 'bulk_submission_entries' in insp.get_table_names():
+            entry_cols = [c['name'] for c in insp.get_columns('bulk_submission_entries')]
+            with engine.begin() as conn:
+                if 'duplicate_of' not in entry_cols:
+                    try:
+                        conn.execute(text('ALTER TABLE bulk_submission_entries ADD COLUMN duplicate_of VARCHAR'))
+                        app.logger.info('Added duplicate_of column to bulk_submission_entries table')
+                    except Exception:
+                        app.logger.info('Could not add duplicate_of column to bulk_submission_entries (may not be supported by this DB)')
+                if 'fingerprint' not in entry_cols:
+                    try:
+                        conn.execute(text('ALTER TABLE bulk_submission_entries ADD COLUMN fingerprint VARCHAR(64)'))
+                        _backfill_fingerprints(conn)
+                        app.logger.info('Added and filled fingerprint column on bulk_submission_entries table')
+                    except Exception:
+                        app.logger.info('Could not add fingerprint column to bulk_submission_entries (may not be supported by this DB)')
+        # Add the searchable response text to tickets and fill it from existing responses
+        if 'tickets' in insp.get_table_names():
+            ticket_cols = [c['name'] for c in insp.get_columns('tickets')]
+            if 'responses_text' not in ticket_cols:
+                try:
+                    with engine.begin() as conn:
+                        conn.execute(text('ALTER TABLE tickets ADD COLUMN responses_text TEXT'))
+                        _backfill_ticket_responses(conn)
+                    app.logger.info('Added and filled responses_text column on tickets table')
+                except Exception:
+                    app.logger.info('Could not add responses_text column to tickets (may not be supported by this DB)')
+        # content hash of ticket attachments stored in the blob store
+        if 'ticket_attachments' in insp.get_table_names():
+            attachment_cols = [c['name'] for c in insp.get_columns('ticket_attachments')]
+            if 'sha256' not in attachment_cols:
+                try:
+                    with engine.begin() as conn:
+                        conn.execute(text('ALTER TABLE ticket_attachments ADD COLUMN sha256 VARCHAR(64)'))
+                    app.logger.info('Added sha256 column to ticket_attachments table')
+                except Exception:
+                    app.logger.info('Could not add sha256 column to ticket_attachments (may not be supported by this DB)')
+        if 'attachment_blobs' in insp.get_table_names():
+            blob_cols = [c['name'] for c in insp.get_columns('attachment_blobs')]
+            if 'preview' not in blob_cols:
+                try:
+                    with engine.begin() as conn:
+                        conn.execute(text('ALTER TABLE attachment_blobs ADD COLUMN preview VARCHAR'))
+                    app.logger.info('Added preview column to attachment_blobs table')
+                except Exception:
+                    app.logger.info('Could not add preview column to attachment_blobs (may not be supported by this DB)')
+        if 'ticket_notifications' in insp.get_table_names():
+            notification_cols = [c['name'] for c in insp.get_columns('ticket_notifications')]
+            if 'claimed_at' not in notification_cols:
+                try:
+                    with engine.begin() as conn:
+                        conn.execute(text('ALTER TABLE ticket_notifications ADD COLUMN claimed_at TIMESTAMP'))
+                    app.logger.info('Added claimed_at column to ticket_notifications table')
+                except Exception:
+                    app.logger.info('Could not add claimed_at column to ticket_notifications (may not be supported by this DB)')
+        # create_all only indexes new tables, so add indexes declared later on existing ones
+        for ddl in _INDEXES:
+            try:
+                with engine.begin() as conn:
+                    conn.execute(text(ddl))
+            except Exception:
+                app.logger.info('Could not create index: %s', ddl)
+        # range functions and GiST indexes for overlap checks (see overlaps.py) and
+        # the ticket search vector with its GIN index (see ticket_search.py)
+        if engine.dialect.name == 'postgresql':
+            from . import overlaps, ticket_search
+            for ddl in overlaps.PG_DDL + ticket_search.PG_DDL:
+                try:
+                    with engine.begin() as conn:
+                        conn.exec_driver_sql(ddl)
+                except Exception:
+                    app.logger.info('Could not apply PostgreSQL DDL: %s', ddl.strip().splitlines()[0])
     except Exception:
         try:
             app.logger.exception('Automatic DB migration check failed')
@@ -115,3 +239,41 @@ def close_db():
     global SessionLocal
     if SessionLocal:
         SessionLocal.remove()
+
+
+def any_of(column, values):
+    """Match ``column`` against a list of values.
+
+    On PostgreSQL this renders ``column = ANY(:values)`` with the list bound as a
+    single array parameter, so the statement text does not grow with the list;
+    other backends get a plain ``IN``.
+    """
+    from sqlalchemy import any_, literal
+    from sqlalchemy.dialects.postgresql import ARRAY
+    values = list(values)
+    if get_db().get_bind().dialect.name == 'postgresql':
+        return column == any_(literal(values, ARRAY(column.type)))
+    return column.in_(values)
+
+
+# ISO dates and times PostgreSQL can cast; anything else gets no hours
+ISO_TIMESTAMP_RE = (
+    r'^\d{4}-(0[1-9]|1[0-2])-(0[1-9]|[12]\d|3[01])'
+    r'([T ]([01]\d|2[0-3]):[0-5]\d(:[0-5]\d(\.\d+)?)?)?(Z|[+-]\d{2}(:?\d{2})?)?$'
+)
+
+
+def hours_between(start, stop):
+    """SQL expression for the hours between two ISO timestamp string columns.
+
+    Rounded to three decimals like the hours computed in Python. PostgreSQL
+    casts the strings to timestamps, only for rows matching
+    ``ISO_TIMESTAMP_RE`` so one malformed value cannot abort the statement;
+    other backends use ``julianday``. Either way a bad timestamp gives NULL.
+    """
+    from sqlalchemy import and_, case, cast, func, DateTime, Float, Numeric
+    if get_db().get_bind().dialect.name == 'postgresql':
+        seconds = func.extract('epoch', cast(stop, DateTime) - cast(start, DateTime))
+        valid = and_(start.regexp_match(ISO_TIMESTAMP_RE), stop.regexp_match(ISO_TIMESTAMP_RE))
+        return case((valid, cast(func.round(cast(seconds / 3600.0, Numeric), 3), Float)), else_=None)
+    return func.round((func.julianday(stop) - func.julianday(start)) * 24.0, 3)
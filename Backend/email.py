@@ -50,7 +50,8 @@ def send_email(subject, body, recipients, html=None, sender=None, async_send=Tru
     """Send an email. Uses Flask-Mailman if available, otherwise falls back to smtplib.
 
     This function spawns a background thread when async_send=True to avoid blocking the request.
-    Errors are logged via the captured app.logger.
+    Errors are logged via the captured app.logger. With async_send=False it returns whether
+    the message was handed to the mail server.
     """
     if isinstance(recipients, str):
         recipients = [recipients]
@@ -106,7 +107,7 @@ def send_email(subject, body, recipients, html=None, sender=None, async_send=Tru
                                 pass
                 except Exception:
                     pass
-                return
+                return True
             except Exception as e:
                 try:
                     app.logger.exception('Mailman send failed, falling back to SMTP: %s', e)
@@ -201,7 +202,7 @@ def send_email(subject, body, recipients, html=None, sender=None, async_send=Tru
                         pass
             except Exception:
                 pass
-            return
+            return False
 
         # build message
         try:
@@ -229,6 +230,7 @@ def send_email(subject, body, recipients, html=None, sender=None, async_send=Tru
                         pass
             except Exception:
                 pass
+            return True
         except Exception as e:
             try:
                 app.logger.exception('SMTP send failed: %s', e)
@@ -243,9 +245,10 @@ def send_email(subject, body, recipients, html=None, sender=None, async_send=Tru
                         pass
             except Exception:
                 pass
+            return False
 
     if async_send:
         t = threading.Thread(target=_send, daemon=True)
         t.start()
     else:
-        _send()
+        return _send()
@@ -0,0 +1,153 @@
+"""Event invitation links, minted in a background batch.
+
+``create_event`` only records one PENDING row per invited volunteer. A worker
+thread then signs the tokens in batches, fills in the links and queues the
+invitation emails, so the officer's request returns immediately even for
+events with thousands of volunteers.
+
+Only that thread moves rows on from PENDING, so a worker restart mid-batch
+leaves them stuck, and FAILED sends stay failed. ``resend_invitations`` (the
+"Resend" button on the invitations page) runs the batch again for them.
+"""
+import threading
+from datetime import datetime, timedelta
+
+from flask import current_app, url_for
+from sqlalchemy import func, insert, update
+
+from . import models
+from .db import get_db
+from .log import make_logging_jwts
+
+BATCH_SIZE = 500
+# rows younger than this may still belong to a running batch
+RESEND_AFTER_MINUTES = 30
+_TOKEN_PLACEHOLDER = '__token__'
+
+
+def link_prefix():
+    """Return the external URL that precedes a token in a logging link.
+
+    Needs a request context; computed once per batch rather than calling
+    ``url_for`` for every volunteer.
+    """
+    url = url_for('log.log_via_jwt', jwt_token=_TOKEN_PLACEHOLDER, _external=True)
+    return url[:-len(_TOKEN_PLACEHOLDER)]
+
+
+def add_invitations(db, event_id, volunteers):
+    """Stage PENDING invitation rows for ``volunteers`` (dicts with email/name).
+
+    Rows are inserted with executemany in chunks; the caller commits.
+    """
+    rows = [
+        {'id': models.gen_id('inv_'), 'event_id': event_id, 'email': v['email'], 'name': v.get('name'), 'status': 'PENDING'}
+        for v in volunteers
+    ]
+    for i in range(0, len(rows), BATCH_SIZE):
+        db.execute(insert(models.EventInvitation), rows[i:i + BATCH_SIZE])
+    return len(rows)
+
+
+def start_invitation_batch(event_id, send_emails=True):
+    """Mint (and optionally email) the pending invitations of an event in a background thread."""
+    app = current_app._get_current_object()
+    prefix = link_prefix()
+    t = threading.Thread(target=_run_batch, args=(app, event_id, prefix, send_emails), name='event-invitations',
+                         daemon=True)
+    t.start()
+    return t
+
+
+def resend_invitations(event_id, older_than=None):
+    """Run the batch again for invitations of ``event_id`` that were never sent; needs a request context.
+
+    FAILED rows go back to READY. Returns the number of rows the new batch
+    will mint or email, or None (and does nothing) while some PENDING or READY
+    row is younger than ``older_than`` (default ``RESEND_AFTER_MINUTES``),
+    since the first batch may still be working on it.
+    """
+    db = get_db()
+    Inv = models.EventInvitation
+    cutoff = datetime.utcnow() - (older_than or timedelta(minutes=RESEND_AFTER_MINUTES))
+    unsent = (Inv.event_id == event_id, Inv.status.in_(('PENDING', 'READY')))
+    if db.query(Inv.id).filter(*unsent, Inv.created_at > cutoff).first():
+        return None
+    db.execute(update(Inv).where(Inv.event_id == event_id, Inv.status == 'FAILED').values(status='READY')
+               .execution_options(synchronize_session=False))
+    db.commit()
+    count = db.query(func.count(Inv.id)).filter(*unsent).scalar()
+    if count:
+        start_invitation_batch(event_id)
+    return count
+
+
+def _run_batch(app, event_id, prefix, send_emails):
+    with app.app_context():
+        try:
+            mint_invitations(event_id, prefix)
+            if send_emails:
+                email_invitations(event_id)
+        except Exception:
+            app.logger.exception('Invitation batch failed for event %s', event_id)
+
+
+def mint_invitations(event_id, prefix, hours=None):
+    """Sign tokens for every PENDING invitation of ``event_id`` and store the links."""
+    db = get_db()
+    if hours is None:
+        hours = current_app.config.get('JWT_EXP_HOURS', 24)
+    minted = 0
+    while True:
+        batch = db.query(models.EventInvitation.id, models.EventInvitation.email).filter_by(
+            event_id=event_id, status='PENDING'
+        ).order_by(models.EventInvitation.id).limit(BATCH_SIZE).all()
+        if not batch:
+            break
+        tokens = make_logging_jwts(event_id, [row.email for row in batch], hours)
+        db.execute(update(models.EventInvitation), [
+            {'id': row.id, 'token': token, 'link': prefix + token, 'status': 'READY'}
+            for row, token in zip(batch, tokens)
+        ])
+        db.commit()
+        minted += len(batch)
+    return minted
+
+
+def email_invitations(event_id):
+    """Email every READY invitation of ``event_id``; each is marked SENT or FAILED.
+
+    Returns the number sent. FAILED rows are retried by ``resend_invitations``.
+    """
+    from .email import send_email
+
+    db = get_db()
+    ev = db.query(models.Event).filter_by(id=event_id).first()
+    if not ev:
+        return 0
+    hours = current_app.config.get('JWT_EXP_HOURS', 24)
+    subj = f"Logging link for event: {ev.name}"
+    sender = current_app.config.get('MAIL_DEFAULT_SENDER')
+    template = current_app.jinja_env.get_template('email_link.html')
+    sent = 0
+    while True:
+        batch = db.query(models.EventInvitation.id, models.EventInvitation.email, models.EventInvitation.link).filter_by(
+            event_id=event_id, status='READY'
+        ).order_by(models.EventInvitation.id).limit(BATCH_SIZE).all()
+        if not batch:
+            break
+        outcomes = []
+        for row in batch:
+            body = f"Dear volunteer,\n\nYou have been invited to log volunteer hours for the event '{ev.name}' ({ev.display_date}). Use the link below to start/stop your session:\n\n{row.link}\n\nThis link expires in {hours} hours.\n\nThank you,\nAUIB VMS"
+            html = template.render(link=row.link, event_name=ev.name, expires_desc=f'{hours} hours')
+            try:
+                # already off the request thread, so send inline instead of one thread per email
+                ok = send_email(subj, body, row.email, html=html, sender=sender, async_send=False, event_id=event_id)
+            except Exception:
+                current_app.logger.exception('Failed to send invitation to %s', row.email)
+                ok = False
+            outcomes.append({'id': row.id, 'status': 'SENT' if ok else 'FAILED'})
+        db.execute(update(models.EventInvitation), outcomes)
+        db.commit()
+        sent += sum(1 for o in outcomes if o['status'] == 'SENT')
+    return sent
@@ -1,7 +1,8 @@
-from flask import Blueprint, render_template, request, current_app
-from datetime import datetime, timedelta
+from flask import Blueprint, render_template, request, current_app, jsonify
+from datetime import datetime, timedelta, timezone
 import jwt
 
+from . import models
 from .models import next_timelog_id
 from .db import get_db
 
@@ -19,9 +20,25 @@ def make_logging_jwt(event_id, volunteer_email, hours=24):
     return token
 
 
-def decode_logging_jwt(token):
+def make_logging_jwts(event_id, volunteer_emails, hours=24):
+    """Sign logging tokens for many volunteers of one event.
+
+    Secret, algorithm and timestamps are resolved once for the whole batch
+    instead of once per volunteer as ``make_logging_jwt`` does.
+    """
+    secret = current_app.config.get('JWT_SECRET','jwt-secret')
+    algorithm = current_app.config.get('JWT_ALGORITHM','HS256')
+    now = datetime.utcnow()
+    exp = now + timedelta(hours=hours)
+    return [
+        jwt.encode({'event_id': event_id, 'volunteer_email': email, 'exp': exp, 'iat': now}, secret, algorithm=algorithm)
+        for email in volunteer_emails
+    ]
+
+
+def decode_logging_jwt(token, verify_exp=True):
     try:
-        payload = jwt.decode(token, current_app.config.get('JWT_SECRET','jwt-secret'), algorithms=[current_app.config.get('JWT_ALGORITHM','HS256')])
+        payload = jwt.decode(token, current_app.config.get('JWT_SECRET','jwt-secret'), algorithms=[current_app.config.get('JWT_ALGORITHM','HS256')], options={'verify_exp': verify_exp})
         return payload, None
     except jwt.ExpiredSignatureError:
         return None, 'Link has expired.'
@@ -29,53 +46,190 @@ def decode_logging_jwt(token):
         return None, 'Invalid link.'
 
 
+def _open_session(db, event_id, volunteer_email):
+    """Return the started-but-not-stopped timelog for a volunteer, if any."""
+    return db.query(models.TimeLog).filter_by(event_id=event_id, student_email=volunteer_email, stop_ts=None).filter(
+        models.TimeLog.start_ts != None
+    ).first()
+
+
+def apply_clock_action(db, event_id, volunteer_email, action, ts, open_tl=None):
+    """Start or stop a volunteer session at ``ts`` (naive UTC) without committing.
+
+    Returns ``(timelog, error)``; ``error`` is a user-facing message when the
+    action does not fit the volunteer's current state.
+    """
+    if action == 'start':
+        if open_tl:
+            return None, 'You already have an open session for this event. Please stop your current session first.'
+        tl = models.TimeLog(id=next_timelog_id(), student_email=volunteer_email, event_id=event_id, start_ts=ts.isoformat(), stop_ts=None, calculated_hours=None, status='PENDING')
+        db.add(tl)
+        return tl, None
+    if action == 'stop':
+        if not open_tl:
+            return None, 'You do not have an open session to stop. Please start a session first.'
+        hours = models.compute_hours(open_tl.start_ts, ts)
+        if hours is not None and hours < 0:
+            return None, 'Stop time is before the session start.'
+        open_tl.stop_ts = ts.isoformat()
+        open_tl.calculated_hours = hours
+        open_tl.status = 'PENDING'
+        return open_tl, None
+    return None, 'Invalid action. Please use the Start or Stop buttons on this page.'
+
+
 @bp.route('/log/<jwt_token>', methods=['GET','POST'])
 def log_via_jwt(jwt_token):
     payload, error = decode_logging_jwt(jwt_token)
     if error:
         return render_template('log.html', error=error)
     db = get_db()
-    event = db.query(__import__('vms.models', fromlist=['Event']).Event).filter_by(id=payload.get('event_id')).first()
+    event = db.query(models.Event).filter_by(id=payload.get('event_id')).first()
     if not event:
         return render_template('log.html', error='Event not found')
     volunteer_email = payload.get('volunteer_email')
-    # find open timelog (one that has been started but not stopped)
-    open_tl = db.query(__import__('vms.models', fromlist=['TimeLog']).TimeLog).filter_by(event_id=event.id, student_email=volunteer_email, stop_ts=None).filter(__import__('vms.models', fromlist=['TimeLog']).TimeLog.start_ts != None).first()
+    open_tl = _open_session(db, event.id, volunteer_email)
     message = None
     if request.method == 'POST':
         action = request.form.get('action')
         now = datetime.utcnow()
-        if action == 'start' and not open_tl:
-            t_id = 't_' + str(__import__('uuid').uuid4())
-            tl = __import__('vms.models', fromlist=['TimeLog']).TimeLog(id=t_id, student_email=volunteer_email, event_id=event.id, start_ts=now.isoformat(), stop_ts=None, calculated_hours=None, status='PENDING')
-            db.add(tl)
-            db.commit()
-            message = f'Clocked in at {now.strftime("%Y-%m-%d %H:%M:%S UTC")}'
-            open_tl = db.query(__import__('vms.models', fromlist=['TimeLog']).TimeLog).filter_by(event_id=event.id, student_email=volunteer_email, stop_ts=None).first()
-        elif action == 'stop' and open_tl:
-            open_tl.stop_ts = datetime.utcnow().isoformat()
-            try:
-                start = datetime.fromisoformat(open_tl.start_ts)
-                stop = datetime.fromisoformat(open_tl.stop_ts)
-                delta = stop - start
-                hours = delta.total_seconds() / 3600.0
-                open_tl.calculated_hours = round(hours, 3)
-            except Exception:
-                open_tl.calculated_hours = None
-            open_tl.status = 'PENDING'
+        tl, message = apply_clock_action(db, event.id, volunteer_email, action, now, open_tl)
+        if tl:
             db.commit()
-            message = f'Clocked out at {datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S UTC")}, hours={open_tl.get("calculated_hours") if hasattr(open_tl, "get") else getattr(open_tl, "calculated_hours", None)}'
-        else:
-            # Provide more specific error messages
-            if action == 'start' and open_tl:
-                message = 'You already have an open session for this event. Please stop your current session first.'
-            elif action == 'stop' and not open_tl:
-                message = 'You do not have an open session to stop. Please start a session first.'
+            if action == 'start':
+                open_tl = tl
+                message = f'Clocked in at {now.strftime("%Y-%m-%d %H:%M:%S UTC")}'
             else:
-                message = 'Invalid action. Please use the Start or Stop buttons on this page.'
+                open_tl = None
+                message = f'Clocked out at {now.strftime("%Y-%m-%d %H:%M:%S UTC")}, hours={tl.calculated_hours}'
     start_display = None
     open_flag = False
     if open_tl:
         open_flag = True
         start_display = open_tl.start_ts
-    return render_template('log.html', error=None, event=event, volunteer_email=volunteer_email, open=open_flag, start_display=start_display, message=message)
+    return render_template('log.html', error=None, event=event, volunteer_email=volunteer_email, open=open_flag, start_display=start_display, message=message, jwt_token=jwt_token)
+
+
+SYNC_MAX_RECORDS = 500
+# a client clock this far ahead of the server is tolerated; anything later is rejected
+SYNC_MAX_CLOCK_SKEW = timedelta(minutes=2)
+# sessions with a client time further than this from the time it reached the
+# server are marked for the reviewing officer (queued offline, or a wrong clock)
+SYNC_MARK_DELAY = timedelta(minutes=5)
+CLIENT_TIME_MARKER = 'CLIENT_TIME'
+
+
+def _parse_client_ts(value):
+    """Parse an ISO-8601 string or epoch milliseconds into naive UTC."""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return datetime.fromtimestamp(value / 1000.0, tz=timezone.utc).replace(tzinfo=None)
+    if isinstance(value, str) and value:
+        dt = datetime.fromisoformat(value.replace('Z', '+00:00'))
+        if dt.tzinfo is not None:
+            dt = dt.astimezone(timezone.utc).replace(tzinfo=None)
+        return dt
+    raise ValueError('client_ts is required')
+
+
+@bp.route('/log/sync', methods=['POST'])
+def sync_clock_events():
+    """Apply queued offline Start/Stop records in one transaction.
+
+    Body: ``{"records": [{"id", "token", "action", "client_ts"}, ...]}``.
+    Each record is idempotent: replaying a start or stop that was already
+    applied (same volunteer, event and timestamp) reports ``duplicate``
+    instead of creating a second session. Tokens are checked against the
+    time of the action rather than the time of the sync, so a clock-out
+    queued before the link expired is still accepted.
+
+    The client's clock is not trusted further than that: a ``client_ts``
+    ahead of the server by more than ``SYNC_MAX_CLOCK_SKEW`` is rejected, and
+    a session whose start or stop was stamped more than ``SYNC_MARK_DELAY``
+    before it arrived gets the ``CLIENT_TIME`` marker so officers check it
+    before approving.
+    """
+    data = request.get_json(silent=True) or {}
+    records = data.get('records')
+    if not isinstance(records, list):
+        return jsonify({'error': 'records must be a list'}), 400
+    if len(records) > SYNC_MAX_RECORDS:
+        return jsonify({'error': f'At most {SYNC_MAX_RECORDS} records per request'}), 413
+
+    now = datetime.utcnow()
+    results = [None] * len(records)
+    parsed = []
+    payloads = {}
+    for i, rec in enumerate(records):
+        rec = rec if isinstance(rec, dict) else {}
+        rid = rec.get('id')
+        token = rec.get('token') or ''
+        if token not in payloads:
+            payloads[token] = decode_logging_jwt(token, verify_exp=False) if token else (None, 'Invalid link.')
+        payload, error = payloads[token]
+        if error:
+            results[i] = {'id': rid, 'status': 'rejected', 'error': error}
+            continue
+        try:
+            ts = _parse_client_ts(rec.get('client_ts'))
+        except (TypeError, ValueError, OverflowError):
+            results[i] = {'id': rid, 'status': 'rejected', 'error': 'Invalid client_ts'}
+            continue
+        issued = datetime.fromtimestamp(payload.get('iat', 0), tz=timezone.utc).replace(tzinfo=None)
+        expires = datetime.fromtimestamp(payload.get('exp', 0), tz=timezone.utc).replace(tzinfo=None)
+        if ts > now + SYNC_MAX_CLOCK_SKEW:
+            results[i] = {'id': rid, 'status': 'rejected', 'error': 'client_ts is in the future'}
+            continue
+        if ts < issued - SYNC_MAX_CLOCK_SKEW:
+            results[i] = {'id': rid, 'status': 'rejected', 'error': 'client_ts is outside the link validity window'}
+            continue
+        if ts > expires:
+            results[i] = {'id': rid, 'status': 'rejected', 'error': 'Link has expired.'}
+            continue
+        parsed.append((i, rid, payload.get('event_id'), payload.get('volunteer_email'), rec.get('action'), ts))
+
+    db = get_db()
+    event_ids = {p[2] for p in parsed}
+    emails = {p[3] for p in parsed}
+    known_events = set()
+    sessions = {}
+    if parsed:
+        known_events = {eid for (eid,) in db.query(models.Event.id).filter(models.Event.id.in_(event_ids)).all()}
+        # every started session for the volunteers in this batch, loaded once
+        for tl in db.query(models.TimeLog).filter(
+            models.TimeLog.event_id.in_(event_ids),
+            models.TimeLog.student_email.in_(emails),
+            models.TimeLog.start_ts != None,
+        ).all():
+            sessions.setdefault((tl.event_id, tl.student_email), []).append(tl)
+
+    # replay per volunteer in client order so a start always precedes its stop
+    for i, rid, event_id, email, action, ts in sorted(parsed, key=lambda p: (p[2], p[3], p[5], p[4] != 'start')):
+        if event_id not in known_events:
+            results[i] = {'id': rid, 'status': 'rejected', 'error': 'Event not found'}
+            continue
+        logs = sessions.setdefault((event_id, email), [])
+        stamp = ts.isoformat()
+        if action == 'start' and any(tl.start_ts == stamp for tl in logs):
+            results[i] = {'id': rid, 'status': 'duplicate'}
+            continue
+        if action == 'stop' and any(tl.stop_ts == stamp for tl in logs):
+            results[i] = {'id': rid, 'status': 'duplicate'}
+            continue
+        open_tl = next((tl for tl in logs if tl.stop_ts is None), None)
+        tl, error = apply_clock_action(db, event_id, email, action, ts, open_tl)
+        if error:
+            results[i] = {'id': rid, 'status': 'rejected', 'error': error}
+            continue
+        if action == 'start':
+            logs.append(tl)
+        if now - ts > SYNC_MARK_DELAY:
+            tl.marker = CLIENT_TIME_MARKER
+        results[i] = {'id': rid, 'status': 'applied', 'hours': tl.calculated_hours}
+
+    try:
+        db.commit()
+    except Exception:
+        db.rollback()
+        current_app.logger.exception('Clock sync batch failed')
+        return jsonify({'error': 'Could not save clock events; retry later'}), 503
+    return jsonify({'results': results})
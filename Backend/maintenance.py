@@ -0,0 +1,203 @@
+"""Data-quality scan for the timelogs table.
+
+``scan_timelogs`` walks the table in keyset chunks, parses timestamps and
+recomputes hours for a whole chunk at once with pandas, and records what it
+finds in ``timelog_anomalies`` for an admin to review:
+
+* ``STALE_OPEN``: clocked in, never clocked out, and older than the policy limit
+* ``NON_POSITIVE``: stop at or before start
+* ``OVER_24H``: a single session longer than ``MAX_SESSION_HOURS``
+* ``UNPARSEABLE``: a timestamp that is not ISO-8601
+* ``HOURS_MISMATCH``: ``calculated_hours`` disagreed with start/stop
+
+Hours are only rewritten on PENDING timelogs and on timelogs with no hours at
+all. An APPROVED or REJECTED timelog keeps the total its reviewer saw; its
+mismatch is recorded for an admin to resolve. Rows without timestamps (bulk approvals) carry their hours directly and are
+left alone. Run it with ``flask --app Backend scan-timelogs`` or from the admin
+data-quality page.
+"""
+from datetime import datetime, timedelta
+
+import click
+import numpy as np
+import pandas as pd
+from sqlalchemy import func, insert, outerjoin, select, update
+
+from . import models
+from .db import get_db
+
+SCAN_CHUNK = 50000
+MAX_SESSION_HOURS = 24
+HOURS_TOLERANCE = 0.01
+# policy for open sessions older than TIMELOG_STALE_HOURS: 'flag' only records
+# them, 'close' also stops them at the event's end (or at the start, i.e. zero
+# hours, when the event has no end) and marks them AUTO_CLOSED for review; a
+# marker already set (e.g. CLIENT_TIME) is kept, the STALE_OPEN anomaly still
+# records the session
+STALE_OPEN_HOURS = 48
+STALE_POLICIES = ('flag', 'close')
+ANOMALY_KINDS = ('STALE_OPEN', 'NON_POSITIVE', 'OVER_24H', 'UNPARSEABLE', 'HOURS_MISMATCH')
+
+
+def _parse_ts(values):
+    """Vectorized ``datetime.fromisoformat`` for a Series of strings; NaT where it fails."""
+    parsed = pd.to_datetime(values, errors='coerce', format='ISO8601', utc=True)
+    return parsed.dt.tz_localize(None)
+
+
+def _chunks(db, chunk_rows):
+    TimeLog, Event = models.TimeLog, models.Event
+    columns = [TimeLog.id, TimeLog.start_ts, TimeLog.stop_ts, TimeLog.calculated_hours, TimeLog.marker, TimeLog.status,
+               Event.end_ts]
+    after = None
+    while True:
+        stmt = select(*columns).select_from(outerjoin(TimeLog, Event, TimeLog.event_id == Event.id))
+        if after is not None:
+            stmt = stmt.where(TimeLog.id > after)
+        # Core execution on the session's connection skips ORM row processing
+        rows = db.connection().execute(stmt.order_by(TimeLog.id).limit(chunk_rows)).fetchall()
+        if not rows:
+            return
+        after = rows[-1][0]
+        yield pd.DataFrame(rows, columns=['id', 'start_ts', 'stop_ts', 'calculated_hours', 'marker', 'status', 'event_end'])
+
+
+def analyze_chunk(df, now, stale_after):
+    """Classify one chunk of timelogs.
+
+    Returns ``(fixes, anomalies, stale)``: ``fixes`` maps timelog id to
+    recomputed hours (PENDING rows and rows without hours only), ``anomalies`` is a list of ``(timelog_id, kind,
+    detail)`` and ``stale`` is the frame of stale open sessions.
+    """
+    has_start = df['start_ts'].fillna('') != ''
+    has_stop = df['stop_ts'].fillna('') != ''
+    start = _parse_ts(df['start_ts'].where(has_start))
+    stop = _parse_ts(df['stop_ts'].where(has_stop))
+    hours = ((stop - start).dt.total_seconds() / 3600.0).round(3)
+    recorded = pd.to_numeric(df['calculated_hours'], errors='coerce').astype(float)
+
+    unparseable = (has_start & start.isna()) | (has_stop & stop.isna())
+    closed = has_start & has_stop & ~unparseable
+    non_positive = closed & (hours <= 0)
+    over_limit = closed & (hours > MAX_SESSION_HOURS)
+    sane = closed & ~non_positive & ~over_limit
+    mismatch = sane & ~(np.abs(recorded.fillna(-1) - hours) <= HOURS_TOLERANCE)
+    stale = has_start & ~has_stop & ~unparseable & (start < now - stale_after)
+
+    anomalies = []
+
+    def add(mask, kind, detail):
+        # messages are only built for the flagged rows
+        if mask.any():
+            anomalies.extend(zip(df['id'][mask], [kind] * int(mask.sum()), detail(mask)))
+
+    add(unparseable, 'UNPARSEABLE',
+        lambda m: 'start=' + df['start_ts'][m].astype(str) + ' stop=' + df['stop_ts'][m].astype(str))
+    add(non_positive, 'NON_POSITIVE', lambda m: 'Duration ' + hours[m].astype(str) + 'h')
+    add(over_limit, 'OVER_24H', lambda m: 'Duration ' + hours[m].astype(str) + 'h')
+    add(mismatch & recorded.notna(), 'HOURS_MISMATCH',
+        lambda m: 'Recorded ' + recorded[m].astype(str) + 'h, start/stop give ' + hours[m].astype(str) + 'h')
+    add(stale, 'STALE_OPEN', lambda m: 'Open since ' + df['start_ts'][m].astype(str))
+
+    # reviewed totals are not changed behind the reviewer's back
+    fixable = mismatch & ((df['status'] == 'PENDING') | recorded.isna())
+    fixes = dict(zip(df['id'][fixable], hours[fixable].astype(float)))
+    stale_rows = df[stale].assign(start=start[stale])
+    return fixes, anomalies, stale_rows
+
+
+def _close_stale(db, stale):
+    """Stop stale sessions at their event's end (zero hours when unknown or before start).
+
+    Sessions without a marker get ``AUTO_CLOSED``; an existing marker is kept.
+    """
+    if stale.empty:
+        return 0
+    event_end = pd.to_datetime(stale['event_end'])
+    end = event_end.where(event_end > stale['start'], stale['start'])
+    hours = ((end - stale['start']).dt.total_seconds() / 3600.0).round(3).clip(upper=MAX_SESSION_HOURS)
+    markers = stale['marker'].where(stale['marker'].notna(), 'AUTO_CLOSED')
+    db.execute(update(models.TimeLog), [
+        {'id': tid, 'stop_ts': stop.isoformat(), 'calculated_hours': float(h), 'marker': marker}
+        for tid, stop, h, marker in zip(stale['id'], end, hours, markers)
+    ])
+    return len(stale)
+
+
+def _record_anomalies(db, anomalies, first_id, last_id):
+    """Insert anomalies not already recorded for the same timelog and kind; returns the count.
+
+    ``first_id``/``last_id`` bound the chunk, so existing anomalies are found
+    with one range query instead of an IN list as long as the chunk.
+    """
+    if not anomalies:
+        return 0
+    Anomaly = models.TimelogAnomaly
+    existing = set(db.connection().execute(
+        select(Anomaly.timelog_id, Anomaly.kind).where(Anomaly.timelog_id >= first_id, Anomaly.timelog_id <= last_id)
+    ).fetchall())
+    now = datetime.utcnow()
+    rows = [
+        {'id': models.gen_id('an_'), 'timelog_id': tid, 'kind': kind, 'detail': detail, 'status': 'OPEN', 'created_at': now}
+        for tid, kind, detail in anomalies if (tid, kind) not in existing
+    ]
+    if rows:
+        db.execute(insert(Anomaly), rows)
+    return len(rows)
+
+
+def scan_timelogs(stale_hours=None, policy=None, dry_run=False, chunk_rows=SCAN_CHUNK, now=None):
+    """Scan every timelog; fix hours, record anomalies and apply the stale-session policy.
+
+    Commits once per chunk unless ``dry_run``. Returns a summary dict with
+    ``scanned``, ``recomputed``, ``closed``, ``recorded`` and per-kind counts.
+    """
+    from flask import current_app
+    stale_hours = stale_hours or current_app.config.get('TIMELOG_STALE_HOURS') or STALE_OPEN_HOURS
+    policy = policy or current_app.config.get('TIMELOG_STALE_POLICY') or 'flag'
+    if policy not in STALE_POLICIES:
+        raise ValueError(f'Unknown stale session policy: {policy}')
+    now = now or datetime.utcnow()
+    db = get_db()
+    summary = dict({'scanned': 0, 'recomputed': 0, 'closed': 0, 'recorded': 0}, **{k: 0 for k in ANOMALY_KINDS})
+    for df in _chunks(db, chunk_rows):
+        fixes, anomalies, stale = analyze_chunk(df, now, timedelta(hours=stale_hours))
+        summary['scanned'] += len(df)
+        for _, kind, _ in anomalies:
+            summary[kind] += 1
+        if dry_run:
+            continue
+        try:
+            if fixes:
+                db.execute(update(models.TimeLog), [{'id': k, 'calculated_hours': v} for k, v in fixes.items()])
+            summary['recomputed'] += len(fixes)
+            if policy == 'close':
+                summary['closed'] += _close_stale(db, stale)
+            summary['recorded'] += _record_anomalies(db, anomalies, df['id'].iloc[0], df['id'].iloc[-1])
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+    return summary
+
+
+def open_anomaly_counts():
+    """``{kind: count}`` of unresolved anomalies."""
+    Anomaly = models.TimelogAnomaly
+    return dict(get_db().query(Anomaly.kind, func.count()).filter(Anomaly.status == 'OPEN').group_by(Anomaly.kind).all())
+
+
+def init_app(app):
+    """Register the ``scan-timelogs`` CLI command."""
+
+    @app.cli.command('scan-timelogs')
+    @click.option('--dry-run', is_flag=True, help='Report what would change without writing anything.')
+    @click.option('--policy', type=click.Choice(STALE_POLICIES), default=None,
+                  help='What to do with stale open sessions (default: TIMELOG_STALE_POLICY).')
+    @click.option('--stale-hours', type=int, default=None,
+                  help='Open sessions older than this are stale (default: TIMELOG_STALE_HOURS).')
+    def scan_timelogs_command(dry_run, policy, stale_hours):
+        """Recompute timelog hours and flag data-quality anomalies."""
+        summary = scan_timelogs(stale_hours=stale_hours, policy=policy, dry_run=dry_run)
+        for key, value in summary.items():
+            click.echo(f'{key}: {value}')
@@ -1,5 +1,5 @@
-from sqlalchemy import Column, Integer, String, DateTime, Float, Text, ForeignKey
-from sqlalchemy.orm import declarative_base, relationship
+from sqlalchemy import Column, Integer, String, DateTime, Float, Text, ForeignKey, Index, UniqueConstraint
+from sqlalchemy.orm import declarative_base, relationship, deferred
 from datetime import datetime
 import uuid
 
@@ -71,8 +71,12 @@ class Event(Base):
 
 
 # Utility helpers (compat shim for previous in-memory helpers)
+import hashlib
 import re
+import threading
+import time
 import uuid
+from collections import OrderedDict
 from werkzeug.security import generate_password_hash
 from .db import get_db
 
@@ -107,6 +111,78 @@ def get_user(user_id):
     return db.query(User).filter_by(id=user_id).first()
 
 
+class UserSnapshot:
+    """Detached, read-only copy of a User row used as Flask-Login's ``current_user``.
+
+    Holds plain attributes only, so it never lazy-loads from a closed session
+    and can be shared between requests by the user cache below.
+    """
+    _fields = ('id', 'email', 'role', 'name', 'club_id', 'student_status', 'cgpa')
+
+    def __init__(self, user):
+        for field in self._fields:
+            setattr(self, field, getattr(user, field))
+
+    def get_id(self):
+        return self.id
+
+    @property
+    def is_active(self):
+        return True
+
+    @property
+    def is_authenticated(self):
+        return True
+
+    @property
+    def is_anonymous(self):
+        return False
+
+
+# user_id -> (timestamp, version, snapshot), oldest first
+_user_cache = OrderedDict()
+# user_id -> version; bumped whenever a user's role, password or profile changes
+_user_versions = {}
+_user_cache_lock = threading.Lock()
+_user_cache_ttl = 60  # seconds
+_user_cache_size = 1024
+
+
+def bump_user_version(user_id):
+    """Invalidate the cached snapshot of ``user_id`` in this process."""
+    with _user_cache_lock:
+        _user_versions[user_id] = _user_versions.get(user_id, 0) + 1
+        _user_cache.pop(user_id, None)
+
+
+def clear_user_cache():
+    with _user_cache_lock:
+        _user_cache.clear()
+
+
+def get_cached_user(user_id):
+    """Return a ``UserSnapshot`` for ``user_id``, reading the database at most once per TTL."""
+    now = time.time()
+    with _user_cache_lock:
+        version = _user_versions.get(user_id, 0)
+        cached = _user_cache.get(user_id)
+        if cached and cached[1] == version and (now - cached[0]) < _user_cache_ttl:
+            _user_cache.move_to_end(user_id)
+            return cached[2]
+    user = get_user(user_id)
+    if not user:
+        return None
+    snapshot = UserSnapshot(user)
+    with _user_cache_lock:
+        # a bump while we were reading means the row we loaded may be stale
+        if _user_versions.get(user_id, 0) == version:
+            _user_cache[user_id] = (now, version, snapshot)
+            _user_cache.move_to_end(user_id)
+            while len(_user_cache) > _user_cache_size:
+                _user_cache.popitem(last=False)
+    return snapshot
+
+
 def find_user_by_email(email):
     if not email:
         return None
@@ -195,29 +271,45 @@ class TimeLog(Base):
     start_ts = Column(String)
     stop_ts = Column(String)
     calculated_hours = Column(Float)
-    status = Column(String, default='PENDING')
+    status = Column(String, default='PENDING', index=True)
     marker = Column(String, nullable=True)
     cgpa = Column(Float, nullable=True)
     student_status = Column(String, nullable=True)  # 'ASP' or 'UG'
+    fingerprint = Column(String(64), nullable=True, index=True)  # copied from the approved bulk entry
+
+
+class EventInvitation(Base):
+    __tablename__ = 'event_invitations'
+    id = Column(String, primary_key=True)
+    event_id = Column(String, ForeignKey('events.id'), index=True, nullable=False)
+    email = Column(String, nullable=False)
+    name = Column(String)
+    token = Column(Text, nullable=True)  # filled in by the background minting batch
+    link = Column(Text, nullable=True)
+    status = Column(String, default='PENDING')  # PENDING, READY, SENT, FAILED
+    created_at = Column(DateTime, default=datetime.utcnow)
 
 
 class BulkSubmission(Base):
     __tablename__ = 'bulk_submissions'
     id = Column(String, primary_key=True)
-    club_leader_id = Column(String, ForeignKey('users.id'))
+    club_leader_id = Column(String, ForeignKey('users.id'), index=True)
     project_name = Column(String)
     date_range = Column(String)
     description = Column(Text)
-    status = Column(String, default='PENDING')  # PENDING, APPROVED, REJECTED, PARTIALLY_APPROVED
-    hours_data = Column(Text)  # store JSON serialized with individual approval status
+    status = Column(String, default='PENDING', index=True)  # PENDING, APPROVED, REJECTED, PARTIALLY_APPROVED
+    # legacy JSON snapshot; the per-entry rows are authoritative, so only load it on access
+    hours_data = deferred(Column(Text))
     rejection_reason = Column(Text, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
 
+    entries = relationship('BulkSubmissionEntry', backref='submission', order_by='BulkSubmissionEntry.id')
+
 
 class BulkSubmissionEntry(Base):
     __tablename__ = 'bulk_submission_entries'
     id = Column(String, primary_key=True)
-    bulk_submission_id = Column(String, ForeignKey('bulk_submissions.id'))
+    bulk_submission_id = Column(String, ForeignKey('bulk_submissions.id'), index=True)
     name = Column(String)
     email = Column(String)
     hours = Column(Float)
@@ -225,6 +317,38 @@ class BulkSubmissionEntry(Base):
     status = Column(String, default='PENDING')  # PENDING, APPROVED, REJECTED
     rejection_reason = Column(Text, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
+    fingerprint = Column(String(64), index=True)  # see entry_fingerprint
+    duplicate_of = Column(String, nullable=True)  # earlier pending entry or approved timelog with the same claim
+
+
+class UploadSession(Base):
+    __tablename__ = 'upload_sessions'
+    id = Column(String, primary_key=True)
+    owner_id = Column(String, ForeignKey('users.id'), index=True, nullable=False)
+    purpose = Column(String, nullable=False)  # hours, roster
+    filename = Column(String, nullable=False)
+    total_size = Column(Integer, nullable=False)
+    sha256 = Column(String, nullable=True)  # expected digest sent by the client
+    received_bytes = Column(Integer, default=0)
+    status = Column(String, default='UPLOADING')  # UPLOADING, PARSING, PARSED, FAILED, CONSUMED
+    rows_processed = Column(Integer, default=0)
+    error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class TimelogAnomaly(Base):
+    """A timelog flagged by the data-quality scan (see ``maintenance.scan_timelogs``)."""
+    __tablename__ = 'timelog_anomalies'
+    __table_args__ = (UniqueConstraint('timelog_id', 'kind', name='uq_timelog_anomalies_timelog_kind'),)
+    id = Column(String, primary_key=True)
+    timelog_id = Column(String, ForeignKey('timelogs.id', ondelete='CASCADE'), nullable=False)
+    kind = Column(String, nullable=False)  # STALE_OPEN, NON_POSITIVE, OVER_24H, UNPARSEABLE, HOURS_MISMATCH
+    detail = Column(Text)
+    status = Column(String, default='OPEN', index=True)  # OPEN, RESOLVED
+    created_at = Column(DateTime, default=datetime.utcnow)
+    resolved_at = Column(DateTime, nullable=True)
+    resolved_by = Column(String, ForeignKey('users.id'), nullable=True)
 
 
 class EmailLog(Base):
@@ -265,9 +389,17 @@ class Ticket(Base):
     category = Column(String, nullable=False)  # suggestion, problem, bug, feature_request, general
     priority = Column(String, default='normal')  # low, normal, high, urgent
     status = Column(String, default='open')  # open, in_progress, resolved, closed
+    # public (non-internal) response texts, newline-separated; feeds ticket search
+    responses_text = Column(Text, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
+    # Relationships
+    submitter = relationship('User', foreign_keys=[submitter_id])
+    assigned_officer = relationship('User', foreign_keys=[assigned_officer_id])
+    responses = relationship('TicketResponse', back_populates='ticket', order_by='TicketResponse.created_at')
+    attachments = relationship('TicketAttachment', back_populates='ticket', order_by='TicketAttachment.created_at')
+
     @property
     def status_display(self):
         return {
@@ -300,17 +432,22 @@ class Ticket(Base):
 class TicketResponse(Base):
     __tablename__ = 'ticket_responses'
     id = Column(String, primary_key=True)
-    ticket_id = Column(String, ForeignKey('tickets.id'), nullable=False)
+    ticket_id = Column(String, ForeignKey('tickets.id'), nullable=False, index=True)
     responder_id = Column(String, ForeignKey('users.id'), nullable=False)
     response_text = Column(Text, nullable=False)
     is_internal = Column(Integer, default=0)  # 0=public, 1=internal note
     created_at = Column(DateTime, default=datetime.utcnow)
 
+    # Relationships
+    ticket = relationship('Ticket', back_populates='responses')
+    author = relationship('User')
+    attachments = relationship('TicketAttachment', back_populates='response')
+
 
 class TicketAttachment(Base):
     __tablename__ = 'ticket_attachments'
     id = Column(String, primary_key=True)
-    ticket_id = Column(String, ForeignKey('tickets.id'), nullable=False)
+    ticket_id = Column(String, ForeignKey('tickets.id'), nullable=False, index=True)
     response_id = Column(String, ForeignKey('ticket_responses.id'), nullable=True)  # NULL for ticket attachments
     uploader_id = Column(String, ForeignKey('users.id'), nullable=False)
     filename = Column(String, nullable=False)
@@ -318,12 +455,51 @@ class TicketAttachment(Base):
     file_size = Column(Integer, nullable=False)
     mime_type = Column(String, nullable=False)
     file_path = Column(String, nullable=False)  # Relative path from upload directory
+    sha256 = Column(String(64), nullable=True, index=True)  # content blob (see storage.py); NULL for legacy files
     created_at = Column(DateTime, default=datetime.utcnow)
 
     # Relationships
-    ticket = relationship('Ticket', backref='attachments')
-    response = relationship('TicketResponse', backref='attachments')
+    ticket = relationship('Ticket', back_populates='attachments')
+    response = relationship('TicketResponse', back_populates='attachments')
     uploader = relationship('User')
+    blob = relationship('AttachmentBlob', primaryjoin='foreign(TicketAttachment.sha256) == AttachmentBlob.sha256', viewonly=True)
+
+
+class AttachmentBlob(Base):
+    """A stored attachment file, shared by every attachment with the same content."""
+    __tablename__ = 'attachment_blobs'
+    sha256 = Column(String(64), primary_key=True)
+    size = Column(Integer, nullable=False)
+    mime_type = Column(String, nullable=True)
+    ref_count = Column(Integer, nullable=False, default=0)
+    preview = Column(String, nullable=True)  # format of the stored preview image ('webp'/'jpg'), see thumbnails.py
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+
+class TicketNotification(Base):
+    """One ticket event for one recipient, waiting to go out in a digest (see notifications.py)."""
+    __tablename__ = 'ticket_notifications'
+    id = Column(String, primary_key=True)
+    ticket_id = Column(String, ForeignKey('tickets.id', ondelete='CASCADE'), nullable=False)
+    recipient = Column(String, nullable=False, index=True)  # email address, or '@officers'
+    action = Column(String, nullable=False)  # created, responded, status_changed, assigned
+    detail = Column(Text, nullable=True)
+    link = Column(String, nullable=True)  # absolute ticket URL, built while a request was available
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
+    batch_id = Column(String, nullable=True, index=True)  # set when a digest claims the row
+    claimed_at = Column(DateTime, nullable=True)  # when it was claimed; an old unsent claim is retried
+    sent_at = Column(DateTime, nullable=True)
+
+
+class OfficerWorkload(Base):
+    """Open and in-progress tickets assigned to one officer, kept current on every change (see workload.py)."""
+    __tablename__ = 'officer_workload'
+    __table_args__ = (Index('ix_officer_workload_active', 'active_count', 'officer_id'),)
+    officer_id = Column(String, ForeignKey('users.id', ondelete='CASCADE'), primary_key=True)
+    open_count = Column(Integer, nullable=False, default=0)
+    in_progress_count = Column(Integer, nullable=False, default=0)
+    active_count = Column(Integer, nullable=False, default=0)  # open + in progress; orders auto-assignment
+    reconciled_at = Column(DateTime, nullable=True)
 
 
 # Utility functions for ID generation
@@ -337,6 +513,21 @@ def next_timelog_id():
     return gen_id('tl_')
 
 
+def compute_hours(start_ts, stop_ts):
+    """Hours between two ISO timestamps, rounded to 3 places; None if either is missing or unparseable.
+
+    The SQL counterpart for set-based updates is ``db.hours_between``.
+    """
+    if not start_ts or not stop_ts:
+        return None
+    try:
+        start = start_ts if isinstance(start_ts, datetime) else datetime.fromisoformat(start_ts)
+        stop = stop_ts if isinstance(stop_ts, datetime) else datetime.fromisoformat(stop_ts)
+        return round((stop - start).total_seconds() / 3600.0, 3)
+    except (TypeError, ValueError):
+        return None
+
+
 def next_bulk_id():
     """Generate a unique bulk submission ID"""
     return gen_id('b_')
@@ -346,3 +537,65 @@ def next_ticket_id():
     """Generate a unique ticket ID"""
     return gen_id('tk_')
 
+
+def bulk_entries_page(submission, after=None, limit=200):
+    """Return ``(entries, next_after)`` for one keyset page of a submission's entries.
+
+    Entries are ordered by id; pass ``next_after`` back as ``after`` to get the
+    following page. ``next_after`` is None on the last page.
+    """
+    from sqlalchemy.orm import with_parent
+    query = get_db().query(BulkSubmissionEntry).filter(with_parent(submission, BulkSubmission.entries))
+    if after:
+        query = query.filter(BulkSubmissionEntry.id > after)
+    entries = query.order_by(BulkSubmissionEntry.id).limit(limit + 1).all()
+    if len(entries) > limit:
+        entries = entries[:limit]
+        return entries, entries[-1].id
+    return entries, None
+
+
+def entry_fingerprint(email, project_name, date_range, hours):
+    """Identify a claim: the same member, project, date range and hours hash alike.
+
+    Text is lowercased with whitespace collapsed, and hours are rounded to two
+    decimals, so trivially different spellings of one claim still match.
+    """
+    def norm(value):
+        return ' '.join(str(value or '').split()).lower()
+    raw = '|'.join([norm(email), norm(project_name), norm(date_range), f'{float(hours or 0):.2f}'])
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+def flag_duplicate_entries(db, b_id):
+    """Set ``duplicate_of`` on entries of submission ``b_id`` that repeat a live claim.
+
+    A claim is live while another submission's entry with the same
+    fingerprint is pending, or an approved timelog carries it. Both lookups
+    are joins on the indexed fingerprint column, run as one statement. Does
+    not commit; returns the number of flagged entries.
+    """
+    from sqlalchemy import and_, func, select, union_all, update
+    from sqlalchemy.orm import aliased
+    New, Old = aliased(BulkSubmissionEntry), aliased(BulkSubmissionEntry)
+    pending = (
+        select(New.id, func.min(Old.id))
+        .join(Old, and_(Old.fingerprint == New.fingerprint, Old.bulk_submission_id != New.bulk_submission_id,
+                        Old.status == 'PENDING'))
+        .where(New.bulk_submission_id == b_id)
+        .group_by(New.id)
+    )
+    approved = (
+        select(New.id, func.min(TimeLog.id))
+        .join(TimeLog, and_(TimeLog.fingerprint == New.fingerprint, TimeLog.status == 'APPROVED'))
+        .where(New.bulk_submission_id == b_id)
+        .group_by(New.id)
+    )
+    matches = {}
+    for entry_id, other_id in db.execute(union_all(pending, approved)).all():
+        # an approved timelog is the stronger signal, so it wins over a pending entry
+        if entry_id not in matches or other_id.startswith('tl_'):
+            matches[entry_id] = other_id
+    if matches:
+        db.execute(update(BulkSubmissionEntry), [{'id': k, 'duplicate_of': v} for k, v in matches.items()])
+    return len(matches)
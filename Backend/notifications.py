@@ -0,0 +1,275 @@
+"""Ticket notifications, coalesced into per-recipient digests.
+
+Ticket events are recorded as ``ticket_notifications`` rows instead of being
+emailed one by one. Once a recipient's oldest pending row is
+``TICKET_DIGEST_MINUTES`` old, everything pending for them goes out as a
+single digest email, so a bulk status change over 200 tickets is one email
+per submitter rather than 200. Events every officer should see are recorded
+once for the ``OFFICERS`` recipient and sent as one email to all officers.
+
+Urgent tickets skip the window: their events are emailed straight away from
+a background thread and marked sent once the mail server took them. An urgent
+email that failed stays claimed, so the retry below sends it with the next
+digest.
+
+Digests are sent by a timer thread that ``queue`` starts in the process that
+recorded the events; a recipient's rows are claimed with a conditional update
+first, so several workers never send the same event twice. Rows are marked
+sent per recipient once the mail server took the digest. A claim that was
+not marked sent within ``RETRY_MINUTES`` (the send failed, or the worker
+died) is picked up again by the next flush, so anything left over after a
+restart or an SMTP outage still goes out, with the next flush or with
+``flask --app Backend send-ticket-digests``.
+"""
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+import click
+from flask import current_app, url_for
+from sqlalchemy import and_, func, insert, or_, outerjoin, select, update
+
+from . import models
+from .db import any_of, get_db
+from .email import send_email
+
+DIGEST_MINUTES = 15
+RETRY_MINUTES = 10
+OFFICERS = '@officers'
+ACTION_LABELS = {
+    'created': 'New ticket',
+    'responded': 'New response',
+    'status_changed': 'Status changed',
+    'assigned': 'Assigned',
+}
+
+_timer = None
+_timer_lock = threading.Lock()
+
+
+def _window():
+    minutes = current_app.config.get('TICKET_DIGEST_MINUTES')
+    return timedelta(minutes=DIGEST_MINUTES if minutes is None else minutes)
+
+
+def _unsent(now):
+    """Rows waiting to go out: never claimed, or claimed by a flush that did not finish."""
+    N = models.TicketNotification
+    # claims from before claimed_at existed count as abandoned
+    abandoned = or_(N.claimed_at.is_(None), N.claimed_at <= now - timedelta(minutes=RETRY_MINUTES))
+    return and_(N.sent_at.is_(None), or_(N.batch_id.is_(None), abandoned))
+
+
+def _short_id(ticket_id):
+    return ticket_id.split('_', 1)[1] if '_' in ticket_id else ticket_id
+
+
+def _officer_emails(db):
+    return [email for (email,) in db.query(models.User.email).filter(models.User.role == 'officer').all()]
+
+
+def _ticket_block(ticket_id, title, status, events):
+    lines = [f"Ticket #{_short_id(ticket_id)}: {title or '(deleted)'}"]
+    if status:
+        lines[0] += f" [{status.replace('_', ' ').title()}]"
+    for action, detail, _ in events:
+        label = ACTION_LABELS.get(action, action.replace('_', ' ').title())
+        lines.append(f'  - {label}' + (f': {detail}' if detail else ''))
+    link = next((link for _, _, link in events if link), None)
+    if link:
+        lines.append(f'  View ticket: {link}')
+    return '\n'.join(lines)
+
+
+def queue(events):
+    """Record ticket events and schedule their digest; commits.
+
+    ``events`` is an iterable of ``(ticket, action, recipient, detail)``;
+    ``recipient`` is an email address or ``OFFICERS``. Events without a
+    recipient are dropped. Must be called while a request is active (the
+    ticket links are built here). Runs after the ticket change is committed,
+    so errors are logged and never fail the request; returns the number of
+    events recorded.
+    """
+    db = get_db()
+    try:
+        return _record(db, events)
+    except Exception:
+        db.rollback()
+        current_app.logger.exception('Recording ticket notifications failed')
+        return 0
+
+
+def _record(db, events):
+    now = datetime.utcnow()
+    pending, urgent = [], []
+    for ticket, action, recipient, detail in events:
+        if not recipient:
+            continue
+        row = {
+            'id': models.gen_id('tn_'), 'ticket_id': ticket.id, 'recipient': recipient, 'action': action,
+            'detail': detail, 'link': url_for('tickets.view', ticket_id=ticket.id, _external=True), 'created_at': now,
+        }
+        if ticket.priority == 'urgent':
+            # claimed by its own send; unsent until the mail server took it
+            row.update(batch_id=models.gen_id('nb_'), claimed_at=now)
+            urgent.append((ticket, row))
+        pending.append(row)
+    if not pending:
+        return 0
+
+    officers = _officer_emails(db) if any(row['recipient'] == OFFICERS for _, row in urgent) else []
+    messages = []
+    for ticket, row in urgent:
+        recipients = officers if row['recipient'] == OFFICERS else [row['recipient']]
+        if not recipients:
+            # nobody to send to (no officers) counts as delivered
+            row['sent_at'] = now
+            continue
+        body = _ticket_block(ticket.id, ticket.title, ticket.status, [(row['action'], row['detail'], row['link'])])
+        subject = f"[Urgent] Ticket #{_short_id(ticket.id)} - {ACTION_LABELS.get(row['action'], row['action'])}"
+        messages.append((row['batch_id'], subject, body, recipients))
+    db.execute(insert(models.TicketNotification), pending)
+    db.commit()
+
+    if messages:
+        thread = threading.Thread(target=_send_urgent, args=(current_app._get_current_object(), messages),
+                                  name='ticket-urgent', daemon=True)
+        thread.start()
+    # the digest window, or the retry of a failed urgent email
+    schedule_flush(_window() if len(urgent) < len(pending) else timedelta(minutes=RETRY_MINUTES))
+    return len(pending)
+
+
+def _send_urgent(app, messages):
+    """Email urgent events one by one, marking each sent once the mail server took it."""
+    N = models.TicketNotification
+    with app.app_context():
+        db = get_db()
+        for batch_id, subject, body, recipients in messages:
+            try:
+                if not send_email(subject=subject, body=body, recipients=recipients, async_send=False):
+                    continue
+                db.execute(update(N).where(N.batch_id == batch_id).values(sent_at=datetime.utcnow())
+                           .execution_options(synchronize_session=False))
+                db.commit()
+            except Exception:
+                db.rollback()
+                app.logger.exception('Sending urgent ticket notification %s failed', batch_id)
+
+
+def flush_digests(now=None, force=False):
+    """Send one digest per recipient whose oldest pending event is older than the window.
+
+    ``force`` sends everything pending regardless of age. Returns the number
+    of digests sent; recipients whose digest failed are retried after
+    ``RETRY_MINUTES``.
+    """
+    db = get_db()
+    now = now or datetime.utcnow()
+    N = models.TicketNotification
+    due = db.query(N.recipient).filter(_unsent(now)).group_by(N.recipient)
+    if not force:
+        due = due.having(func.min(N.created_at) <= now - _window())
+    due = [recipient for (recipient,) in due.all()]
+    if not due:
+        return 0
+
+    # claim the rows; a concurrent flush only sees rows it claimed itself
+    batch_id = models.gen_id('nb_')
+    db.execute(
+        update(N).where(_unsent(now), any_of(N.recipient, due))
+        .values(batch_id=batch_id, claimed_at=now).execution_options(synchronize_session=False)
+    )
+    db.commit()
+
+    rows = db.execute(
+        select(N.recipient, N.ticket_id, models.Ticket.title, models.Ticket.status, N.action, N.detail, N.link)
+        .select_from(outerjoin(N, models.Ticket, models.Ticket.id == N.ticket_id))
+        .where(N.batch_id == batch_id)
+        .order_by(N.recipient, N.ticket_id, N.created_at)
+    ).all()
+    digests = OrderedDict()
+    for recipient, ticket_id, title, status, action, detail, link in rows:
+        tickets = digests.setdefault(recipient, OrderedDict())
+        tickets.setdefault(ticket_id, (title, status, []))[2].append((action, detail, link))
+
+    officers = _officer_emails(db) if OFFICERS in digests else []
+    sent = 0
+    for recipient, tickets in digests.items():
+        recipients = officers if recipient == OFFICERS else [recipient]
+        if recipients:
+            body = '\n\n'.join(_ticket_block(tid, title, status, events) for tid, (title, status, events) in tickets.items())
+            count = len(tickets)
+            subject = f"Ticket updates: {count} ticket{'s' if count != 1 else ''}"
+            try:
+                ok = send_email(subject=subject, body=body, recipients=recipients, async_send=False)
+            except Exception:
+                current_app.logger.exception('Sending ticket digest to %s failed', recipient)
+                ok = False
+            if not ok:
+                # left claimed; the next flush after RETRY_MINUTES tries again
+                continue
+            sent += 1
+        # nobody to send to (no officers) counts as delivered
+        db.execute(
+            update(N).where(N.batch_id == batch_id, N.recipient == recipient).values(sent_at=datetime.utcnow())
+            .execution_options(synchronize_session=False)
+        )
+        db.commit()
+    return sent
+
+
+def _next_due():
+    """Seconds until the next pending or retried event is due, or None when nothing is waiting."""
+    N = models.TicketNotification
+    db = get_db()
+    now = datetime.utcnow()
+    due = []
+    oldest = db.query(func.min(N.created_at)).filter(N.sent_at.is_(None), N.batch_id.is_(None)).scalar()
+    if oldest is not None:
+        due.append(oldest + _window())
+    claimed = db.query(func.min(N.claimed_at)).filter(N.sent_at.is_(None), N.batch_id.isnot(None)).scalar()
+    if claimed is not None:
+        due.append(claimed + timedelta(minutes=RETRY_MINUTES))
+    if not due:
+        return None
+    return max(0.0, (min(due) - now).total_seconds())
+
+
+def _run_flush(app):
+    global _timer
+    with app.app_context():
+        with _timer_lock:
+            _timer = None
+        try:
+            flush_digests()
+            delay = _next_due()
+        except Exception:
+            app.logger.exception('Sending ticket digests failed')
+            delay = None
+        if delay is not None:
+            schedule_flush(timedelta(seconds=delay))
+
+
+def schedule_flush(delay):
+    """Flush digests after ``delay`` unless a flush is already scheduled in this process."""
+    global _timer
+    app = current_app._get_current_object()
+    with _timer_lock:
+        if _timer is not None:
+            return
+        # a second of slack so the oldest event is past the window when the timer fires
+        _timer = threading.Timer(delay.total_seconds() + 1, _run_flush, args=(app,))
+        _timer.daemon = True
+        _timer.start()
+
+
+def init_app(app):
+    """Register the ``send-ticket-digests`` CLI command."""
+
+    @app.cli.command('send-ticket-digests')
+    @click.option('--all', 'send_all', is_flag=True, help='Send everything pending, even inside the digest window.')
+    def send_ticket_digests_command(send_all):
+        """Email pending ticket notifications as per-recipient digests."""
+        click.echo(f'digests sent: {flush_digests(force=send_all)}')
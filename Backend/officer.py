@@ -1,14 +1,15 @@
-from flask import Blueprint, render_template, request, flash, url_for, send_file, current_app, redirect, abort, jsonify
+from flask import Blueprint, render_template, request, flash, url_for, send_file, current_app, redirect, abort, jsonify, stream_with_context
 from flask_login import login_required, current_user
 import io
 import pandas as pd
 from datetime import datetime
 import smtplib
 from email.message import EmailMessage
-from sqlalchemy import func
+from sqlalchemy import and_, case, delete, func, insert, literal, or_, select, update, String
 
-from . import models
-from .db import get_db
+from . import chunked_uploads, models, overlaps, parsers
+from .db import get_db, any_of, hours_between
+from .stats import clear_officer_counters
 
 bp = Blueprint('officer', __name__)
 
@@ -24,7 +25,6 @@ def officer_index():
 def create_event():
     if current_user.role != 'officer':
         abort(403)
-    links = None
     if request.method == 'POST':
         name = request.form.get('name')
         start_raw = request.form.get('start')
@@ -88,14 +88,38 @@ def create_event():
         # validate start exists and end is after start
         if not sd:
             flash('Start date/time is required and must be a valid datetime')
-            return render_template('create_event.html', links=None, name=name, start=start_raw, end=end_raw, location=location, description=description, volunteer_limit=volunteer_limit, category=category, contact_name=contact_name, contact_email=contact_email, required_skills=required_skills, equipment_needed=equipment_needed, min_age=min_age, max_age=max_age, priority=priority)
+            return _render_event_form(request.form)
         if ed and ed < sd:
             flash('End date/time must be after start date/time')
-            return render_template('create_event.html', links=None, name=name, start=start_raw, end=end_raw, location=location, description=description, volunteer_limit=volunteer_limit, category=category, contact_name=contact_name, contact_email=contact_email, required_skills=required_skills, equipment_needed=equipment_needed, min_age=min_age, max_age=max_age, priority=priority)
+            return _render_event_form(request.form)
 
-        # create event record with all new parameters
-        import uuid
-        eid = 'e_' + str(uuid.uuid4())
+        # validate the whole roster before anything is written
+        volunteers_data = []
+        upload_id = request.form.get('upload_id')
+        if invite_volunteers:
+            try:
+                if entry_method == 'file' and upload_id:
+                    # roster sent through the chunked upload path and parsed in the background
+                    volunteers_data = chunked_uploads.load_upload_result(upload_id, 'roster')['volunteers']
+                    parsers.check_roster_limit(volunteers_data, volunteer_limit_int, parsers.FILE_LIMIT_MESSAGE)
+                elif entry_method == 'file':
+                    file = request.files.get('file')
+                    if not file:
+                        raise parsers.RosterError('File required when using file upload method')
+                    volunteers_data = parsers.parse_roster(file, file.filename, file.mimetype, limit=volunteer_limit_int)
+                else:
+                    volunteers_data = parsers.roster_from_form(
+                        request.form.getlist('volunteer_names[]'),
+                        request.form.getlist('volunteer_emails[]'),
+                        limit=volunteer_limit_int,
+                    )
+            except parsers.ParseError as e:
+                flash(str(e))
+                return _render_event_form(request.form)
+
+        # create the event and its invitations in one transaction
+        from .invitations import add_invitations, start_invitation_batch
+        eid = models.next_event_id()
         db = get_db()
         ev = models.Event(
             id=eid, 
@@ -115,169 +139,48 @@ def create_event():
             max_age=max_age_int,
             priority=priority
         )
-        db.add(ev)
-        db.commit()
+        try:
+            db.add(ev)
+            if volunteers_data:
+                db.flush()
+                add_invitations(db, eid, volunteers_data)
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            current_app.logger.exception('Failed to create event')
+            flash('Failed to create event: ' + str(e))
+            return _render_event_form(request.form)
+        clear_officer_counters()
+        if upload_id and invite_volunteers and entry_method == 'file':
+            chunked_uploads.finish_upload(upload_id)
 
-        # Process volunteers only if invite_volunteers is checked
-        volunteers_data = []
-        if invite_volunteers:
-            # Process volunteers based on entry method
-            if entry_method == 'file':
-                # File upload method
-                file = request.files.get('file')
-                if not file:
-                    flash('File required when using file upload method')
-                    db.delete(ev)
-                    db.commit()
-                    return render_template('create_event.html', links=None, name=name, start=start_raw, end=end_raw, location=location, description=description, volunteer_limit=volunteer_limit, category=category, contact_name=contact_name, contact_email=contact_email, required_skills=required_skills, equipment_needed=equipment_needed, min_age=min_age, max_age=max_age, priority=priority)
-                
-                data = file.read()
-                try:
-                    df = None
-                    filename = file.filename.lower()
-                    if filename.endswith('.csv') or file.mimetype == 'text/csv':
-                        df = pd.read_csv(io.BytesIO(data))
-                    else:
-                        df = pd.read_excel(io.BytesIO(data))
-                except Exception as e:
-                    flash('Failed to read file: ' + str(e))
-                    db.delete(ev)
-                    db.commit()
-                    return render_template('create_event.html', links=None, name=name, start=start_raw, end=end_raw, location=location, description=description, volunteer_limit=volunteer_limit, category=category, contact_name=contact_name, contact_email=contact_email, required_skills=required_skills, equipment_needed=equipment_needed, min_age=min_age, max_age=max_age, priority=priority)
-                
-                email_col = 'Email' if 'Email' in df.columns else ('email' if 'email' in df.columns else None)
-                if not email_col:
-                    flash("File must contain 'Email' column")
-                    db.delete(ev)
-                    db.commit()
-                    return render_template('create_event.html', links=None, name=name, start=start_raw, end=end_raw, location=location, description=description, volunteer_limit=volunteer_limit, category=category, contact_name=contact_name, contact_email=contact_email, required_skills=required_skills, equipment_needed=equipment_needed, min_age=min_age, max_age=max_age, priority=priority)
-                
-                df['email_norm'] = df[email_col].astype(str).str.strip().str.lower()
-                # try to capture a name column if present for user-friendly output
-                name_col = None
-                if 'Name' in df.columns:
-                    name_col = 'Name'
-                elif 'name' in df.columns:
-                    name_col = 'name'
-                df = df[df['email_norm'].apply(models.is_valid_email)]
-                df = df.drop_duplicates(subset=['email_norm'])
-                
-                # Check volunteer limit
-                if volunteer_limit_int and len(df) > volunteer_limit_int:
-                    flash(f'Too many volunteers in file. Limit is {volunteer_limit_int}, file contains {len(df)}.')
-                    db.delete(ev)
-                    db.commit()
-                    return render_template('create_event.html', links=None, name=name, start=start_raw, end=end_raw, location=location, description=description, volunteer_limit=volunteer_limit, category=category, contact_name=contact_name, contact_email=contact_email, required_skills=required_skills, equipment_needed=equipment_needed, min_age=min_age, max_age=max_age, priority=priority)
-                
-                for idx, row in df.iterrows():
-                    e = str(row['email_norm'])
-                    display_name = (str(row[name_col]).strip() if name_col and not pd.isna(row.get(name_col)) else '') if name_col else ''
-                    volunteers_data.append({'email': e, 'name': display_name or e.split('@')[0]})
-                    
-            else:
-                # Manual entry method
-                volunteer_names = request.form.getlist('volunteer_names[]')
-                volunteer_emails = request.form.getlist('volunteer_emails[]')
-                
-                if not volunteer_emails or not any(email.strip() for email in volunteer_emails):
-                    flash('At least one volunteer email is required when inviting volunteers')
-                    db.delete(ev)
-                    db.commit()
-                    return render_template('create_event.html', links=None, name=name, start=start_raw, end=end_raw, location=location, description=description, volunteer_limit=volunteer_limit, category=category, contact_name=contact_name, contact_email=contact_email, required_skills=required_skills, equipment_needed=equipment_needed, min_age=min_age, max_age=max_age, priority=priority)
-                
-                # Filter out empty entries
-                for i, email in enumerate(volunteer_emails):
-                    email = email.strip()
-                    if email:
-                        if not models.is_valid_email(email):
-                            flash(f'Invalid email address: {email}')
-                            db.delete(ev)
-                            db.commit()
-                            return render_template('create_event.html', links=None, name=name, start=start_raw, end=end_raw, location=location, description=description, volunteer_limit=volunteer_limit, category=category, contact_name=contact_name, contact_email=contact_email, required_skills=required_skills, equipment_needed=equipment_needed, min_age=min_age, max_age=max_age, priority=priority)
-                        
-                        name = volunteer_names[i].strip() if i < len(volunteer_names) else ''
-                        volunteers_data.append({
-                            'email': email.lower(),
-                            'name': name or email.split('@')[0]
-                        })
-                
-                # Remove duplicates
-                seen_emails = set()
-                unique_volunteers = []
-                for v in volunteers_data:
-                    if v['email'] not in seen_emails:
-                        seen_emails.add(v['email'])
-                        unique_volunteers.append(v)
-                volunteers_data = unique_volunteers
-                
-                # Check volunteer limit
-                if volunteer_limit_int and len(volunteers_data) > volunteer_limit_int:
-                    flash(f'Too many volunteers. Limit is {volunteer_limit_int}, you entered {len(volunteers_data)}.')
-                    db.delete(ev)
-                    db.commit()
-                    return render_template('create_event.html', links=None, name=name, start=start_raw, end=end_raw, location=location, description=description, volunteer_limit=volunteer_limit, category=category, contact_name=contact_name, contact_email=contact_email, required_skills=required_skills, equipment_needed=equipment_needed, min_age=min_age, max_age=max_age, priority=priority)
-
-        # Generate links and send emails only if there are volunteers to invite
-        links = []
-        links_info = []
-        sent = 0
-        failed = 0
-        
         if volunteers_data:
-            from .log import make_logging_jwt
-            email_map = {}
-            
-            for volunteer in volunteers_data:
-                token = make_logging_jwt(eid, volunteer['email'], current_app.config.get('JWT_EXP_HOURS',24))
-                link = url_for('log.log_via_jwt', jwt_token=token, _external=True)
-                links.append(link)
-                email_map[volunteer['email']] = link
-                links_info.append({'name': volunteer['name'], 'email': volunteer['email'], 'link': link})
-            
-            # attempt to send emails via the configured Mail subsystem (if initialized)
-            try:
-                from .email import send_email
-                subj = f"Logging link for event: {name}"
-                default_sender = current_app.config.get('MAIL_DEFAULT_SENDER')
-                # human-friendly event date for emails
-                ev_display = ev.display_date if hasattr(ev, 'display_date') else (start_raw or '')
-                for recipient, lnk in email_map.items():
-                    body = f"Dear volunteer,\n\nYou have been invited to log volunteer hours for the event '{name}' ({ev_display}). Use the link below to start/stop your session:\n\n{lnk}\n\nThis link expires in {current_app.config.get('JWT_EXP_HOURS',24)} hours.\n\nThank you,\nAUIB VMS"
-                    try:
-                        send_email(subj, body, recipient, sender=default_sender, async_send=True)
-                        sent += 1
-                    except Exception:
-                        current_app.logger.exception('Failed to queue email to %s', recipient)
-                        failed += 1
-            except Exception:
-                current_app.logger.info('Mail subsystem not available; skipping auto-email send')
-
-        if invite_volunteers and volunteers_data:
-            flash(f'Event created with {len(links)} unique valid emails — emailed: {sent}, failed: {failed}')
-        elif invite_volunteers and not volunteers_data:
+            # tokens, links and emails are produced in the background
+            start_invitation_batch(eid)
+            flash(f'Event created with {len(volunteers_data)} unique valid emails — invitation links are being generated and emailed in the background')
+            return redirect(url_for('officer.event_invitations', event_id=eid))
+        elif invite_volunteers:
             flash('Event created but no valid volunteers were found to invite')
         else:
             flash('Event created successfully! Volunteers can now sign up on their own.')
+        # pass form values back so they persist after POST
+        return _render_event_form(request.form)
 
-    
-    # pass form defaults back to template so values persist on validation errors / after POST
-    return render_template('create_event.html', 
-                         links=links, 
-                         links_info=(locals().get('links_info') if 'links_info' in locals() else None), 
-                         name=(locals().get('name') if 'name' in locals() else None), 
-                         start=(locals().get('start_raw') if 'start_raw' in locals() else None), 
-                         end=(locals().get('end_raw') if 'end_raw' in locals() else None), 
-                         location=(locals().get('location') if 'location' in locals() else None), 
-                         description=(locals().get('description') if 'description' in locals() else None),
-                         volunteer_limit=(locals().get('volunteer_limit') if 'volunteer_limit' in locals() else None),
-                         category=(locals().get('category') if 'category' in locals() else None),
-                         contact_name=(locals().get('contact_name') if 'contact_name' in locals() else None),
-                         contact_email=(locals().get('contact_email') if 'contact_email' in locals() else None),
-                         required_skills=(locals().get('required_skills') if 'required_skills' in locals() else None),
-                         equipment_needed=(locals().get('equipment_needed') if 'equipment_needed' in locals() else None),
-                         min_age=(locals().get('min_age') if 'min_age' in locals() else None),
-                         max_age=(locals().get('max_age') if 'max_age' in locals() else None),
-                         priority=(locals().get('priority') if 'priority' in locals() else 'normal'))
+    return _render_event_form()
+
+
+_EVENT_FORM_FIELDS = (
+    'name', 'start', 'end', 'location', 'description', 'volunteer_limit', 'category', 'contact_name',
+    'contact_email', 'required_skills', 'equipment_needed', 'min_age', 'max_age',
+)
+
+
+def _render_event_form(form=None):
+    """Render create_event.html, refilling the fields from ``form`` when given."""
+    form = form or {}
+    values = {field: form.get(field) for field in _EVENT_FORM_FIELDS}
+    values['priority'] = form.get('priority') or 'normal'
+    return render_template('create_event.html', **values)
 
 
 @bp.route('/approvals', methods=['GET','POST'])
@@ -296,135 +199,198 @@ def approvals():
             flash('Submission not found')
             return redirect(url_for('officer.approvals'))
 
-        if action in ['approve_selected', 'reject_selected']:
-            if not entry_ids:
-                flash('No entries selected')
-                return redirect(url_for('officer.approvals'))
-
-            # Process individual entries
-            approved_count = 0
-            rejected_count = 0
-
-            for entry_id in entry_ids:
-                entry = db.query(models.BulkSubmissionEntry).filter_by(id=entry_id, bulk_submission_id=b_id).first()
-                if entry:
-                    if action == 'approve_selected':
-                        # Create timelog for approved entry
-                        t_id = models.next_timelog_id()
-                        tl = models.TimeLog(
-                            id=t_id,
-                            student_email=entry.email,
-                            event_id=f'BULK_{sub.id}',
-                            start_ts=None,
-                            stop_ts=None,
-                            calculated_hours=entry.hours,
-                            status='APPROVED',
-                            marker='BULK'
-                        )
-                        db.add(tl)
-                        entry.status = 'APPROVED'
-                        approved_count += 1
-                    elif action == 'reject_selected':
-                        reason = request.form.get('rejection_reason_selected')
-                        if not reason:
-                            flash('Rejection reason required')
-                            return redirect(url_for('officer.approvals'))
-                        entry.status = 'REJECTED'
-                        entry.rejection_reason = reason
-                        rejected_count += 1
-
-            # Update bulk submission status
-            all_entries = db.query(models.BulkSubmissionEntry).filter_by(bulk_submission_id=b_id).all()
-            approved_entries = sum(1 for e in all_entries if e.status == 'APPROVED')
-            rejected_entries = sum(1 for e in all_entries if e.status == 'REJECTED')
-            pending_entries = sum(1 for e in all_entries if e.status == 'PENDING')
-
-            if pending_entries == 0:
-                if approved_entries > 0 and rejected_entries == 0:
-                    sub.status = 'APPROVED'
-                elif approved_entries == 0 and rejected_entries > 0:
-                    sub.status = 'REJECTED'
-                else:
-                    sub.status = 'PARTIALLY_APPROVED'
-            else:
-                sub.status = 'PARTIALLY_APPROVED'
-
-            db.commit()
-
-            if action == 'approve_selected':
-                flash(f'Approved {approved_count} entries')
-            else:
-                flash(f'Rejected {rejected_count} entries with reason: {reason}')
-
-        elif action == 'approve_all':
-            # Approve all pending entries
-            pending_entries = db.query(models.BulkSubmissionEntry).filter_by(
-                bulk_submission_id=b_id, status='PENDING'
-            ).all()
-
-            for entry in pending_entries:
-                t_id = models.next_timelog_id()
-                tl = models.TimeLog(
-                    id=t_id,
-                    student_email=entry.email,
-                    event_id=f'BULK_{sub.id}',
-                    start_ts=None,
-                    stop_ts=None,
-                    calculated_hours=entry.hours,
-                    status='APPROVED',
-                    marker='BULK'
-                )
-                db.add(tl)
-                entry.status = 'APPROVED'
-
-            # Check if all entries are now approved
-            all_entries = db.query(models.BulkSubmissionEntry).filter_by(bulk_submission_id=b_id).all()
-            if all(e.status == 'APPROVED' for e in all_entries):
-                sub.status = 'APPROVED'
-            else:
-                sub.status = 'PARTIALLY_APPROVED'
-
-            db.commit()
-            flash(f'Approved {len(pending_entries)} entries')
+        if action not in ['approve_selected', 'reject_selected', 'approve_all', 'reject_all']:
+            flash('Unknown action')
+            return redirect(url_for('officer.approvals'))
 
+        reason = None
+        if action in ['approve_selected', 'reject_selected'] and not entry_ids:
+            flash('No entries selected')
+            return redirect(url_for('officer.approvals'))
+        if action == 'reject_selected':
+            reason = request.form.get('rejection_reason_selected')
         elif action == 'reject_all':
             reason = request.form.get('rejection_reason')
-            if not reason:
-                flash('Rejection reason required')
-                return redirect(url_for('officer.approvals'))
-
-            # Reject all pending entries
-            pending_entries = db.query(models.BulkSubmissionEntry).filter_by(
-                bulk_submission_id=b_id, status='PENDING'
-            ).all()
-
-            for entry in pending_entries:
-                entry.status = 'REJECTED'
-                entry.rejection_reason = reason
-
-            # Check if all entries are now rejected
-            all_entries = db.query(models.BulkSubmissionEntry).filter_by(bulk_submission_id=b_id).all()
-            if all(e.status == 'REJECTED' for e in all_entries):
-                sub.status = 'REJECTED'
-            else:
-                sub.status = 'PARTIALLY_APPROVED'
+        if action in ['reject_selected', 'reject_all'] and not reason:
+            flash('Rejection reason required')
+            return redirect(url_for('officer.approvals'))
 
+        # the *_all actions act on every PENDING entry, the *_selected ones on the ticked ids
+        ids = entry_ids if action.endswith('_selected') else None
+        try:
+            if action.startswith('approve'):
+                count = _approve_entries(db, sub.id, ids)
+            else:
+                count = _reject_entries(db, sub.id, reason, ids)
+            sub.status = _submission_status(db, sub.id)
             db.commit()
-            flash(f'Rejected {len(pending_entries)} entries with reason: {reason}')
+        except Exception:
+            db.rollback()
+            current_app.logger.exception('Failed to update bulk submission %s', sub.id)
+            flash('Could not update the submission; please try again')
+            return redirect(url_for('officer.approvals'))
+
+        if action.startswith('approve'):
+            flash(f'Approved {count} entries')
+        else:
+            flash(f'Rejected {count} entries with reason: {reason}')
 
+        clear_officer_counters()
         return redirect(url_for('officer.approvals'))
 
-    # GET request - show pending submissions
+    # GET request - one keyset page of the queue, oldest first; entries load on demand
     db = get_db()
-    subs = db.query(models.BulkSubmission).filter(
-        models.BulkSubmission.status.in_(['PENDING', 'PARTIALLY_APPROVED'])
-    ).all()
+    Sub, Entry = models.BulkSubmission, models.BulkSubmissionEntry
+    query = db.query(Sub).filter(Sub.status.in_(['PENDING', 'PARTIALLY_APPROVED']))
+    cursor = _parse_cursor(request.args.get('after'))
+    if cursor:
+        created, sid = cursor
+        query = query.filter(or_(Sub.created_at > created, and_(Sub.created_at == created, Sub.id > sid)))
+    subs = query.order_by(Sub.created_at, Sub.id).limit(APPROVALS_PAGE_SIZE + 1).all()
+    next_cursor = None
+    if len(subs) > APPROVALS_PAGE_SIZE:
+        subs = subs[:APPROVALS_PAGE_SIZE]
+        next_cursor = _make_cursor(subs[-1])
+
+    # per-submission entry counts for the page in one grouped query
+    summaries = {}
+    if subs:
+        rows = db.query(
+            Entry.bulk_submission_id,
+            func.count(),
+            func.count().filter(Entry.status == 'PENDING'),
+            func.coalesce(func.sum(Entry.hours), 0),
+            func.count(Entry.duplicate_of).filter(Entry.status == 'PENDING'),
+        ).filter(Entry.bulk_submission_id.in_([s.id for s in subs])).group_by(Entry.bulk_submission_id).all()
+        summaries = {
+            sid: {'total': total, 'pending': pending, 'hours': hours, 'duplicates': duplicates}
+            for sid, total, pending, hours, duplicates in rows
+        }
+
+    return render_template('approvals.html', subs=subs, summaries=summaries, next_cursor=next_cursor, is_first_page=cursor is None)
+
+
+APPROVALS_PAGE_SIZE = 20
+ENTRIES_PAGE_SIZE = 200
 
-    # Add entries to each submission
-    for sub in subs:
-        sub.entries = db.query(models.BulkSubmissionEntry).filter_by(bulk_submission_id=sub.id).all()
 
-    return render_template('approvals.html', subs=subs)
+def _make_cursor(sub):
+    return f"{sub.created_at.isoformat() if sub.created_at else ''}~{sub.id}"
+
+
+def _parse_cursor(raw):
+    """Decode an ``after`` cursor of the form ``<created_at iso>~<submission id>``."""
+    if not raw or '~' not in raw:
+        return None
+    created, sid = raw.split('~', 1)
+    try:
+        return datetime.fromisoformat(created), sid
+    except ValueError:
+        return None
+
+
+@bp.route('/approvals/<b_id>/entries')
+@login_required
+def approval_entries(b_id):
+    """JSON page of a bulk submission's entries, keyed on entry id (``?after=<id>``)."""
+    if current_user.role != 'officer':
+        abort(403)
+    db = get_db()
+    sub = db.query(models.BulkSubmission).filter_by(id=b_id).first()
+    if not sub:
+        return jsonify({'error': 'Submission not found'}), 404
+    entries, next_after = models.bulk_entries_page(sub, request.args.get('after'), ENTRIES_PAGE_SIZE)
+    return jsonify({
+        'entries': [
+            {
+                'id': e.id, 'name': e.name, 'email': e.email, 'hours': e.hours, 'role': e.role, 'status': e.status,
+                'duplicate': _duplicate_kind(e.duplicate_of),
+            }
+            for e in entries
+        ],
+        'next': next_after,
+    })
+
+
+def _duplicate_kind(duplicate_of):
+    """'approved' when an entry repeats an approved timelog, 'pending' for another open claim."""
+    if not duplicate_of:
+        return None
+    return 'approved' if duplicate_of.startswith('tl_') else 'pending'
+
+
+def _entry_filter(b_id, entry_ids):
+    Entry = models.BulkSubmissionEntry
+    if entry_ids is None:
+        return [Entry.bulk_submission_id == b_id, Entry.status == 'PENDING']
+    return [Entry.bulk_submission_id == b_id, any_of(Entry.id, entry_ids)]
+
+
+def _bulk_timelog_id(Entry):
+    """The id of the timelog an approved entry gets: ``tl_<entry id>``."""
+    return literal('tl_', String) + Entry.id
+
+
+def _approve_entries(db, b_id, entry_ids=None):
+    """Approve entries of a bulk submission with one INSERT ... SELECT and one UPDATE.
+
+    Entries that are already approved are skipped so they never get a second
+    timelog. Does not commit; returns the number of approved entries.
+    """
+    Entry, TimeLog = models.BulkSubmissionEntry, models.TimeLog
+    criteria = _entry_filter(b_id, entry_ids) + [Entry.status != 'APPROVED']
+    rows = select(
+        _bulk_timelog_id(Entry),
+        Entry.email,
+        literal(f'BULK_{b_id}', String),
+        Entry.hours,
+        literal('APPROVED', String),
+        literal('BULK', String),
+        Entry.fingerprint,
+    ).where(
+        *criteria,
+        # rejected before rejecting removed the timelog: it is still there
+        ~select(TimeLog.id).where(TimeLog.id == _bulk_timelog_id(Entry)).exists(),
+    )
+    db.execute(insert(TimeLog).from_select(
+        ['id', 'student_email', 'event_id', 'calculated_hours', 'status', 'marker', 'fingerprint'], rows
+    ))
+    result = db.execute(
+        update(Entry).where(*criteria).values(status='APPROVED').execution_options(synchronize_session=False)
+    )
+    return result.rowcount
+
+
+def _reject_entries(db, b_id, reason, entry_ids=None):
+    """Reject entries of a bulk submission with one UPDATE; does not commit.
+
+    Selected entries that were already approved lose their timelog, so their
+    hours stop counting and approving them again creates it afresh.
+    """
+    Entry, TimeLog = models.BulkSubmissionEntry, models.TimeLog
+    if entry_ids is not None:
+        approved = select(_bulk_timelog_id(Entry)).where(*_entry_filter(b_id, entry_ids), Entry.status == 'APPROVED')
+        db.execute(
+            delete(TimeLog).where(TimeLog.id.in_(approved), TimeLog.event_id == f'BULK_{b_id}')
+            .execution_options(synchronize_session=False)
+        )
+    result = db.execute(
+        update(Entry).where(*_entry_filter(b_id, entry_ids)).values(status='REJECTED', rejection_reason=reason)
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount
+
+
+def _submission_status(db, b_id):
+    """Derive a bulk submission's status from one grouped count of its entries."""
+    Entry = models.BulkSubmissionEntry
+    counts = dict(db.query(Entry.status, func.count()).filter(Entry.bulk_submission_id == b_id).group_by(Entry.status).all())
+    approved, rejected, pending = counts.get('APPROVED', 0), counts.get('REJECTED', 0), counts.get('PENDING', 0)
+    if pending == 0 and approved > 0 and rejected == 0:
+        return 'APPROVED'
+    if pending == 0 and approved == 0 and rejected > 0:
+        return 'REJECTED'
+    return 'PARTIALLY_APPROVED'
 
 
 @bp.route('/timelogs', methods=['GET','POST'])
@@ -435,43 +401,19 @@ def timelogs():
     """
     if current_user.role != 'officer':
         abort(403)
-    db = get_db()
     if request.method == 'POST':
-        action = request.form.get('action')
-        t_id = request.form.get('id')
-        tl = db.query(models.TimeLog).filter_by(id=t_id).first()
-        if not tl:
-            flash('Timelog not found')
-            return redirect(url_for('officer.timelogs'))
-        if action == 'approve':
-            # This is a regular timelog submission
-            # if hours not calculated, try to compute from start/stop
-            try:
-                if not tl.calculated_hours and tl.start_ts and tl.stop_ts:
-                    from datetime import datetime
-                    s = datetime.fromisoformat(tl.start_ts)
-                    e = datetime.fromisoformat(tl.stop_ts)
-                    hrs = round((e - s).total_seconds() / 3600.0, 3)
-                    tl.calculated_hours = hrs
-            except Exception:
-                # leave as-is if parsing fails
-                pass
-            tl.status = 'APPROVED'
-            db.commit()
-            flash('Timelog approved')
-        elif action == 'reject':
-            tl.status = 'REJECTED'
-            db.commit()
-            flash('Timelog rejected')
-        return redirect(url_for('officer.timelogs'))
+        ids, action = _selected_timelogs()
+        if not ids:
+            flash('No timelogs selected')
+        elif action not in ('approve', 'reject'):
+            flash('Unknown action')
+        else:
+            count = _update_pending_timelogs(ids, 'PENDING', action, compute_hours=True)
+            if count is not None:
+                flash(f'{count} timelog{"" if count == 1 else "s"} {"approved" if action == "approve" else "rejected"}')
+        return redirect(url_for('officer.timelogs', **request.args.to_dict()))
 
-    pending = db.query(models.TimeLog, models.Event.name.label('event_name')).join(models.Event, models.TimeLog.event_id == models.Event.id).filter(models.TimeLog.status == 'PENDING').all()
-    # Convert to objects with event_name attribute for template compatibility
-    pending_with_names = []
-    for tl, event_name in pending:
-        tl.event_name = event_name
-        pending_with_names.append(tl)
-    return render_template('pending_timelogs.html', timelogs=pending_with_names)
+    return _render_pending_timelogs('PENDING', 'officer.timelogs', 'pending_timelogs.html')
 
 
 @bp.route('/event_requests', methods=['GET','POST'])
@@ -482,32 +424,119 @@ def event_requests():
     """
     if current_user.role != 'officer':
         abort(403)
-    db = get_db()
     if request.method == 'POST':
-        action = request.form.get('action')
-        t_id = request.form.get('id')
-        tl = db.query(models.TimeLog).filter_by(id=t_id).first()
-        if not tl:
-            flash('Event request not found')
-            return redirect(url_for('officer.event_requests'))
-        if action == 'approve':
-            # This is an event join request for an active event
-            tl.status = 'APPROVED'
-            db.commit()
-            flash('Volunteer approved to join the event!')
-        elif action == 'reject':
-            tl.status = 'REJECTED'
-            db.commit()
-            flash('Volunteer request to join event rejected')
-        return redirect(url_for('officer.event_requests'))
+        ids, action = _selected_timelogs()
+        if not ids:
+            flash('No event requests selected')
+        elif action not in ('approve', 'reject'):
+            flash('Unknown action')
+        else:
+            count = _update_pending_timelogs(ids, 'PENDING_APPROVAL', action)
+            if count is not None:
+                if action == 'approve':
+                    flash(f'{count} volunteer{"" if count == 1 else "s"} approved to join the event!')
+                else:
+                    flash(f'{count} volunteer request{"" if count == 1 else "s"} to join events rejected')
+        return redirect(url_for('officer.event_requests', **request.args.to_dict()))
+
+    return _render_pending_timelogs('PENDING_APPROVAL', 'officer.event_requests', 'pending_event_requests.html')
+
+
+TIMELOGS_PAGE_SIZE = 50
+
+
+def _selected_timelogs():
+    """Return ``(ids, action)`` from a pending-list POST.
+
+    A row button posts ``row_action=<action>:<id>``; the batch buttons post
+    ``action`` with the ticked ``ids[]``.
+    """
+    row_action = request.form.get('row_action')
+    if row_action and ':' in row_action:
+        action, t_id = row_action.split(':', 1)
+        return [t_id], action
+    ids = [i for i in request.form.getlist('ids[]') if i]
+    if not ids and request.form.get('id'):
+        ids = [request.form.get('id')]
+    return ids, request.form.get('action')
+
+
+def _update_pending_timelogs(ids, pending_status, action, compute_hours=False):
+    """Approve or reject the listed timelogs that are still in ``pending_status``.
+
+    One ``UPDATE ... WHERE id = ANY(:ids)``; with ``compute_hours`` approved
+    rows missing hours get them from their start and stop times in the same
+    statement. Commits and returns the number of rows changed, or None after
+    flashing an error.
+    """
+    TimeLog = models.TimeLog
+    values = {'status': 'APPROVED' if action == 'approve' else 'REJECTED'}
+    if action == 'approve' and compute_hours:
+        has_times = and_(TimeLog.start_ts.isnot(None), TimeLog.start_ts != '', TimeLog.stop_ts.isnot(None), TimeLog.stop_ts != '')
+        missing = or_(TimeLog.calculated_hours.is_(None), TimeLog.calculated_hours == 0)
+        values['calculated_hours'] = case(
+            # unparseable times leave the hours as they were
+            (and_(missing, has_times), func.coalesce(hours_between(TimeLog.start_ts, TimeLog.stop_ts), TimeLog.calculated_hours)),
+            else_=TimeLog.calculated_hours,
+        )
+    db = get_db()
+    try:
+        result = db.execute(
+            update(TimeLog).where(any_of(TimeLog.id, ids), TimeLog.status == pending_status)
+            .values(**values).execution_options(synchronize_session=False)
+        )
+        db.commit()
+    except Exception:
+        db.rollback()
+        current_app.logger.exception('Failed to %s timelogs', action)
+        flash('Could not update the selected entries; please try again')
+        return None
+    clear_officer_counters()
+    return result.rowcount
+
+
+def _render_pending_timelogs(status, endpoint, template):
+    """One page of timelogs in ``status``, optionally for a single event (``?event_id=``)."""
+    db = get_db()
+    TimeLog, Event = models.TimeLog, models.Event
+    try:
+        page = max(1, int(request.args.get('page', 1)))
+    except ValueError:
+        page = 1
+    event_id = request.args.get('event_id') or None
+
+    # events with something waiting, for the filter; one grouped query
+    event_options = db.query(Event.id, Event.name, func.count(TimeLog.id)).join(
+        TimeLog, TimeLog.event_id == Event.id
+    ).filter(TimeLog.status == status).group_by(Event.id, Event.name).order_by(Event.name).all()
+
+    query = db.query(TimeLog, Event.name.label('event_name'), func.count().over().label('total')).join(
+        Event, TimeLog.event_id == Event.id
+    ).filter(TimeLog.status == status)
+    if event_id:
+        query = query.filter(TimeLog.event_id == event_id)
+    rows = query.order_by(TimeLog.start_ts, TimeLog.id).offset((page - 1) * TIMELOGS_PAGE_SIZE).limit(TIMELOGS_PAGE_SIZE).all()
+    if not rows and page > 1:
+        return redirect(url_for(endpoint, event_id=event_id))
 
-    pending = db.query(models.TimeLog, models.Event.name.label('event_name')).join(models.Event, models.TimeLog.event_id == models.Event.id).filter(models.TimeLog.status == 'PENDING_APPROVAL').all()
     # Convert to objects with event_name attribute for template compatibility
     pending_with_names = []
-    for tl, event_name in pending:
+    for tl, event_name, _ in rows:
         tl.event_name = event_name
         pending_with_names.append(tl)
-    return render_template('pending_event_requests.html', timelogs=pending_with_names)
+    total = rows[0].total if rows else 0
+    # clock-in sessions that clash with another of the student's sessions
+    overlapping = overlaps.overlapping_sessions(db, [tl.id for tl in pending_with_names if tl.start_ts])
+    for tl in pending_with_names:
+        tl.overlaps = tl.id in overlapping
+
+    def url_for_page(p):
+        return url_for(endpoint, page=p, event_id=event_id)
+
+    return render_template(
+        template, timelogs=pending_with_names, event_options=event_options, event_id=event_id,
+        page=page, per_page=TIMELOGS_PAGE_SIZE, total=total, url_for_page=url_for_page,
+    )
 
 
 @bp.route('/reports', methods=['GET', 'POST'])
@@ -715,10 +744,13 @@ def generate_report_data(db, report_type):
         })
     
     df = pd.DataFrame(rows)
+    # flag sessions that overlap another session of the same student
+    overlapping = overlaps.overlapping_sessions(db, [t.id for t in timelogs if t.start_ts])
+    df['overlap'] = [t.id in overlapping for t in timelogs]
     
     # Generate different report formats
     if rtype == 'general':
-        data = df[['student_email', 'event_name', 'calculated_hours', 'status', 'start_ts', 'stop_ts', 'marker']].to_dict('records')
+        data = df[['student_email', 'event_name', 'calculated_hours', 'status', 'start_ts', 'stop_ts', 'marker', 'overlap']].to_dict('records')
         chart_df = df
     elif rtype == 'person_summary':
         if report_type == 'student' and not student_email:
@@ -729,7 +761,7 @@ def generate_report_data(db, report_type):
     elif rtype == 'person_detailed':
         if report_type == 'student' and not student_email:
             return {'error': 'Student email is required for person_detailed reports'}
-        data = df[['student_email', 'event_name', 'calculated_hours', 'start_ts', 'stop_ts', 'status']].to_dict('records')
+        data = df[['student_email', 'event_name', 'calculated_hours', 'start_ts', 'stop_ts', 'status', 'overlap']].to_dict('records')
         chart_df = df
     else:
         return {'error': 'Unknown report type'}
@@ -946,10 +978,12 @@ def delete_event(event_id):
     
     # Delete all timelogs associated with this event (including pending ones)
     db.query(models.TimeLog).filter_by(event_id=event_id).delete()
+    db.query(models.EventInvitation).filter_by(event_id=event_id).delete()
     
     # Delete the event
     db.delete(event)
     db.commit()
+    clear_officer_counters()
     
     flash('Event deleted successfully!')
     return redirect(url_for('officer.manage_events'))
@@ -1014,6 +1048,7 @@ def view_event_volunteers(event_id):
             else:
                 flash('Volunteer not found for this event.', 'error')
         
+        clear_officer_counters()
         return redirect(url_for('officer.view_event_volunteers', event_id=event_id))
     
     # Get all volunteers for this event
@@ -1030,3 +1065,95 @@ def view_event_volunteers(event_id):
         volunteer_list.append(tl)
     
     return render_template('event_volunteers.html', event=event, volunteers=volunteer_list)
+
+
+@bp.route('/event_invitations/<event_id>')
+@login_required
+def event_invitations(event_id):
+    """Officer view: paginated invitation links generated for an event."""
+    if current_user.role != 'officer':
+        abort(403)
+
+    db = get_db()
+    event = db.query(models.Event).filter_by(id=event_id, officer_id=current_user.id).first()
+    if not event:
+        flash('Event not found or you do not have permission to view it.')
+        return redirect(url_for('officer.manage_events'))
+
+    page = max(int(request.args.get('page') or 1), 1)
+    per_page = min(int(request.args.get('per_page') or 50), 500)
+
+    status_counts = dict(db.query(models.EventInvitation.status, func.count(models.EventInvitation.id)).filter_by(
+        event_id=event_id
+    ).group_by(models.EventInvitation.status).all())
+    total = sum(status_counts.values())
+    invitations = db.query(models.EventInvitation).filter_by(event_id=event_id).order_by(
+        models.EventInvitation.email
+    ).offset((page - 1) * per_page).limit(per_page).all()
+
+    def url_for_page(p):
+        args = request.args.to_dict()
+        args['page'] = p
+        return url_for('officer.event_invitations', event_id=event_id, **args)
+
+    return render_template('event_invitations.html', event=event, invitations=invitations, status_counts=status_counts,
+                           page=page, per_page=per_page, total=total, url_for_page=url_for_page)
+
+
+@bp.route('/event_invitations/<event_id>/resend', methods=['POST'])
+@login_required
+def resend_event_invitations(event_id):
+    """Mint and email again the invitations of an event that were never sent."""
+    if current_user.role != 'officer':
+        abort(403)
+
+    from .invitations import RESEND_AFTER_MINUTES, resend_invitations
+    event = get_db().query(models.Event).filter_by(id=event_id, officer_id=current_user.id).first()
+    if not event:
+        flash('Event not found or you do not have permission to view it.')
+        return redirect(url_for('officer.manage_events'))
+
+    count = resend_invitations(event_id)
+    if count is None:
+        flash(f'Invitations are still being sent; unsent ones can be resent after {RESEND_AFTER_MINUTES} minutes.')
+    elif count:
+        flash(f'Resending {count} invitation{"" if count == 1 else "s"} in the background.')
+    else:
+        flash('Every invitation has already been sent.')
+    return redirect(url_for('officer.event_invitations', event_id=event_id))
+
+
+@bp.route('/event_invitations/<event_id>/export.csv')
+@login_required
+def export_event_invitations(event_id):
+    """Stream every invitation link of an event as CSV without building it in memory."""
+    if current_user.role != 'officer':
+        abort(403)
+
+    db = get_db()
+    event = db.query(models.Event).filter_by(id=event_id, officer_id=current_user.id).first()
+    if not event:
+        abort(404)
+
+    import csv
+
+    rows = db.query(models.EventInvitation.name, models.EventInvitation.email, models.EventInvitation.link,
+                    models.EventInvitation.status).filter_by(event_id=event_id).order_by(
+        models.EventInvitation.email
+    ).yield_per(1000)
+
+    def generate():
+        buf = io.StringIO()
+        writer = csv.writer(buf)
+        writer.writerow(['name', 'email', 'link', 'status'])
+        for i, row in enumerate(rows, 1):
+            writer.writerow([row.name or '', row.email, row.link or '', row.status])
+            if i % 1000 == 0:
+                yield buf.getvalue()
+                buf.seek(0)
+                buf.truncate()
+        yield buf.getvalue()
+
+    filename = f"invitations_{event_id}_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}.csv"
+    return current_app.response_class(stream_with_context(generate()), mimetype='text/csv',
+                                      headers={'Content-Disposition': f'attachment; filename="{filename}"'})
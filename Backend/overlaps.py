@@ -0,0 +1,118 @@
+"""Overlap checks for event windows and clock-in sessions.
+
+On PostgreSQL both are compared as ``tsrange`` values with ``&&``. The
+ranges come from the immutable functions ``vms_event_range`` and
+``vms_session_range`` (created in ``db.init_db``), which also back GiST
+expression indexes, so a lookup is an index scan rather than a pairwise
+comparison. Other backends, like the local SQLite test database, get the same
+half-open interval test written as plain comparisons.
+
+Windows are half-open (``[start, end)``): back-to-back events or sessions do
+not overlap. Events without an end, or ending before they start, never
+conflict. A session that is still open runs to infinity.
+"""
+from sqlalchemy import and_, func, literal_column, or_, select
+from sqlalchemy.orm import aliased
+
+from . import models
+
+# timelog statuses that mean the student holds the event slot
+ACTIVE_STATUSES = ('SIGNED_UP', 'PENDING_APPROVAL', 'PENDING', 'APPROVED')
+_OPEN_END = '9999-12-31T23:59:59'
+
+# DDL applied by db.init_db on PostgreSQL only
+PG_DDL = [
+    """
+    CREATE OR REPLACE FUNCTION vms_event_range(start_ts timestamp, end_ts timestamp) RETURNS tsrange
+    LANGUAGE sql IMMUTABLE AS $$
+      SELECT CASE WHEN start_ts IS NULL OR end_ts IS NULL OR end_ts <= start_ts THEN NULL
+                  ELSE tsrange(start_ts, end_ts, '[)') END
+    $$
+    """,
+    # timelog timestamps are ISO strings; the cast is wrapped so it can be
+    # declared immutable and so malformed rows give NULL instead of failing
+    """
+    CREATE OR REPLACE FUNCTION vms_session_range(start_ts text, stop_ts text) RETURNS tsrange
+    LANGUAGE plpgsql IMMUTABLE AS $$
+    DECLARE
+      s timestamp;
+      e timestamp;
+    BEGIN
+      IF start_ts IS NULL OR start_ts = '' THEN
+        RETURN NULL;
+      END IF;
+      s := start_ts::timestamp;
+      IF stop_ts IS NULL OR stop_ts = '' THEN
+        RETURN tsrange(s, NULL, '[)');
+      END IF;
+      e := stop_ts::timestamp;
+      IF e < s THEN
+        RETURN 'empty'::tsrange;
+      END IF;
+      RETURN tsrange(s, e, '[)');
+    EXCEPTION WHEN others THEN
+      RETURN NULL;
+    END
+    $$
+    """,
+    'CREATE INDEX IF NOT EXISTS ix_events_window ON events USING gist (vms_event_range(start_ts, end_ts))',
+    'CREATE INDEX IF NOT EXISTS ix_timelogs_session ON timelogs USING gist (vms_session_range(start_ts, stop_ts))',
+]
+
+
+def _is_postgres(db):
+    return db.get_bind().dialect.name == 'postgresql'
+
+
+def conflicting_events(db, email, event):
+    """Events overlapping ``event``'s window that ``email`` is already signed up for or attending."""
+    if not event.start_ts or not event.end_ts or event.end_ts <= event.start_ts:
+        return []
+    Event, TimeLog = models.Event, models.TimeLog
+    if _is_postgres(db):
+        window = func.tsrange(event.start_ts, event.end_ts, literal_column("'[)'"))
+        overlaps = func.vms_event_range(Event.start_ts, Event.end_ts).op('&&')(window)
+    else:
+        overlaps = and_(Event.end_ts > Event.start_ts, Event.start_ts < event.end_ts, Event.end_ts > event.start_ts)
+    return db.query(Event).join(TimeLog, TimeLog.event_id == Event.id).filter(
+        TimeLog.student_email == email,
+        TimeLog.status.in_(ACTIVE_STATUSES),
+        Event.id != event.id,
+        overlaps,
+    ).distinct().order_by(Event.start_ts).all()
+
+
+def _sessions_overlap(db, a, b):
+    if _is_postgres(db):
+        return func.vms_session_range(a.start_ts, a.stop_ts).op('&&')(func.vms_session_range(b.start_ts, b.stop_ts))
+
+    def valid(t):
+        return and_(t.start_ts.isnot(None), t.start_ts != '', or_(t.stop_ts.is_(None), t.stop_ts == '', t.stop_ts >= t.start_ts))
+
+    def end(t):
+        return func.coalesce(func.nullif(t.stop_ts, ''), _OPEN_END)
+
+    # ISO strings from the same writer order like the timestamps they hold
+    return and_(valid(a), valid(b), a.start_ts < end(b), b.start_ts < end(a), a.start_ts != end(a), b.start_ts != end(b))
+
+
+def overlapping_sessions(db, timelog_ids, batch_size=5000):
+    """Return the subset of ``timelog_ids`` whose session overlaps another of the same student's.
+
+    Rejected sessions are ignored.
+    """
+    from .db import any_of
+    TimeLog = models.TimeLog
+    a, b = aliased(TimeLog), aliased(TimeLog)
+    timelog_ids = list(timelog_ids)
+    found = set()
+    for start in range(0, len(timelog_ids), batch_size):
+        batch = timelog_ids[start:start + batch_size]
+        stmt = select(a.id).join(b, and_(
+            b.student_email == a.student_email,
+            b.id != a.id,
+            b.status != 'REJECTED',
+            _sessions_overlap(db, a, b),
+        )).where(any_of(a.id, batch)).distinct()
+        found.update(db.execute(stmt).scalars())
+    return found
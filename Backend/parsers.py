@@ -0,0 +1,326 @@
+"""Vectorized parsing of uploaded volunteer spreadsheets.
+
+Uploads are read as text cells in chunks and validated with whole-column
+pandas operations (``str.strip``/``str.lower``, ``str.match`` with the email
+patterns from ``models``, numeric coercion with error masks) instead of
+``iterrows``. The per-row error report is assembled from the same masks.
+Workbooks are streamed with openpyxl's read-only mode rather than loaded
+whole, and every upload is held to a row and byte cap.
+"""
+import os
+import zipfile
+
+import numpy as np
+import openpyxl
+import pandas as pd
+from flask import current_app, has_app_context
+from openpyxl.utils.exceptions import InvalidFileException
+
+from .models import EMAIL_RE, AUIB_EMAIL_RE
+
+CHUNK_ROWS = 5000
+MAX_REPORTED_ERRORS = 50
+AUIB_DOMAIN = '@auib.edu.iq'
+HOURS_COLUMNS = ['name', 'email', 'hours', 'role']
+FILE_LIMIT_MESSAGE = 'Too many volunteers in file. Limit is {limit}, file contains {count}.'
+# defaults for the UPLOAD_MAX_ROWS / UPLOAD_MAX_BYTES config keys
+MAX_ROWS = 100000
+MAX_BYTES = 50 * 1024 * 1024
+
+
+class ParseError(ValueError):
+    """The upload cannot be processed at all (unreadable file, missing columns)."""
+
+
+def is_csv(filename, mimetype=None):
+    return (filename or '').lower().endswith('.csv') or mimetype == 'text/csv'
+
+
+def upload_limits():
+    """``(max_rows, max_bytes)`` for uploads, from app config when available."""
+    if has_app_context():
+        return (
+            current_app.config.get('UPLOAD_MAX_ROWS') or MAX_ROWS,
+            current_app.config.get('UPLOAD_MAX_BYTES') or MAX_BYTES,
+        )
+    return MAX_ROWS, MAX_BYTES
+
+
+def _file_size(file):
+    try:
+        pos = file.tell()
+        file.seek(0, os.SEEK_END)
+        size = file.tell()
+        file.seek(pos)
+    except (AttributeError, OSError, ValueError):
+        return None
+    return size
+
+
+def _cell_text(value):
+    if value is None:
+        return ''
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def _iter_xlsx_rows(file):
+    """Yield ``(header, rows)`` from the active sheet of an .xlsx without loading it.
+
+    ``openpyxl`` in read-only mode parses the sheet XML as it is iterated, so
+    memory stays flat however many rows the workbook has.
+    """
+    try:
+        wb = openpyxl.load_workbook(file, read_only=True, data_only=True)
+    except (InvalidFileException, zipfile.BadZipFile, KeyError, OSError) as e:
+        raise ParseError(f'Failed to read file: {e}') from e
+    try:
+        rows = wb.active.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        yield [_cell_text(h).strip() for h in header], rows
+    finally:
+        wb.close()
+
+
+def _xlsx_chunks(file, chunk_rows, check_header, max_rows):
+    for header, rows in _iter_xlsx_rows(file):
+        if check_header:
+            check_header(header)
+        width = len(header)
+        batch, index, count = [], [], 0
+        for n, row in enumerate(rows):
+            if row is None or all(v is None or v == '' for v in row):
+                continue
+            count += 1
+            if count > max_rows:
+                raise ParseError(f'File has too many rows (max {max_rows})')
+            batch.append([_cell_text(v) for v in row[:width]] + [''] * (width - len(row)))
+            index.append(n)
+            if len(batch) == chunk_rows:
+                yield pd.DataFrame(batch, columns=header, index=index, dtype=object)
+                batch, index = [], []
+        if batch:
+            yield pd.DataFrame(batch, columns=header, index=index, dtype=object)
+
+
+def iter_chunks(file, filename, mimetype=None, chunk_rows=CHUNK_ROWS, check_header=None):
+    """Yield DataFrames of at most ``chunk_rows`` rows with every cell as text.
+
+    Blank cells come back as ``''``. The frame index is the 0-based data row,
+    so ``index + 2`` is the spreadsheet row number (the header is row 1).
+    CSV and .xlsx files are streamed, so only one chunk is in memory at a
+    time; legacy .xls still goes through ``pd.read_excel``.
+
+    ``check_header`` is called with the list of column names before any data
+    row is read and may raise ``ParseError`` to stop early. Files larger than
+    the configured byte cap or with more data rows than the row cap raise
+    ``ParseError`` (see ``upload_limits``).
+    """
+    max_rows, max_bytes = upload_limits()
+    size = _file_size(file)
+    if size is not None and size > max_bytes:
+        raise ParseError(f'File too large (max {max_bytes // (1024 * 1024)}MB)')
+    try:
+        if is_csv(filename, mimetype):
+            reader = pd.read_csv(file, dtype=str, keep_default_na=False, chunksize=chunk_rows)
+            with reader:
+                for n, chunk in enumerate(reader):
+                    if n == 0 and check_header:
+                        check_header(list(chunk.columns))
+                    if chunk.index[-1] >= max_rows:
+                        raise ParseError(f'File has too many rows (max {max_rows})')
+                    yield chunk.fillna('')
+            return
+        if not (filename or '').lower().endswith('.xls'):
+            yield from _xlsx_chunks(file, chunk_rows, check_header, max_rows)
+            return
+        df = pd.read_excel(file, dtype=str).fillna('')
+    except pd.errors.EmptyDataError:
+        return
+    except ParseError:
+        raise
+    except (ValueError, OSError) as e:
+        raise ParseError(f'Failed to read file: {e}') from e
+    if check_header:
+        check_header(list(df.columns))
+    if len(df) > max_rows:
+        raise ParseError(f'File has too many rows (max {max_rows})')
+    for start in range(0, len(df), chunk_rows):
+        yield df.iloc[start:start + chunk_rows]
+
+
+def normalize_emails(values):
+    """Strip and lowercase a Series of raw email cells."""
+    return values.astype(str).str.strip().str.lower()
+
+
+def valid_email_mask(emails):
+    """Vectorized ``models.is_valid_email`` for already-normalized emails."""
+    return (
+        emails.str.match(EMAIL_RE.pattern, flags=EMAIL_RE.flags)
+        & emails.str.match(AUIB_EMAIL_RE.pattern, flags=AUIB_EMAIL_RE.flags)
+    ).fillna(False).astype(bool)
+
+
+def _row_prefix(index):
+    return 'Row ' + pd.Series(index + 2, index=index).astype(str) + ': '
+
+
+def first_failure(index, checks):
+    """Return a Series holding, per row, the message of the first failing check.
+
+    ``checks`` is an ordered list of ``(mask, message_series)``; rows that
+    pass every check hold ``''``.
+    """
+    reason = pd.Series('', index=index, dtype=object)
+    # apply in reverse so the earliest check wins when several fail
+    for mask, message in reversed(checks):
+        reason = reason.mask(mask, message)
+    return reason
+
+
+def validate_hours_chunk(df, seen_emails):
+    """Validate one chunk of a club hours upload.
+
+    Returns ``(valid_rows, error_messages)``; ``valid_rows`` has the columns
+    name, email, hours (float) and role. ``seen_emails`` carries accepted
+    emails across chunks so duplicates are flagged upload-wide.
+    """
+    name = df['name'].astype(str).str.strip()
+    email = normalize_emails(df['email'])
+    role = df['role'].astype(str).str.strip()
+    hours_raw = df['hours'].astype(str).str.strip()
+    hours = pd.to_numeric(hours_raw, errors='coerce').astype(float)
+
+    bad_domain = ~email.str.endswith(AUIB_DOMAIN)
+    bad_format = ~valid_email_mask(email)
+    not_number = ~np.isfinite(hours)
+    not_positive = hours <= 0
+    missing = (name == '') | (role == '')
+    duplicate = email.duplicated() | email.isin(seen_emails)
+
+    prefix = _row_prefix(df.index)
+    reason = first_failure(df.index, [
+        (bad_domain, prefix + 'Email must end with @auib.edu.iq: ' + email),
+        (bad_format, prefix + 'Invalid email format: ' + email),
+        (not_number, prefix + 'Hours must be a number: ' + hours_raw),
+        (not_positive, prefix + 'Hours must be positive: ' + hours_raw),
+        (missing, prefix + 'Name and role are required'),
+        (duplicate, prefix + 'Duplicate email in file: ' + email),
+    ])
+    ok = reason == ''
+    valid = pd.DataFrame({'name': name[ok], 'email': email[ok], 'hours': hours[ok], 'role': role[ok]})
+    seen_emails.update(valid['email'])
+    return valid, reason[~ok].tolist()
+
+
+def check_hours_header(columns):
+    missing_columns = [col for col in HOURS_COLUMNS if col not in columns]
+    if missing_columns:
+        raise ParseError(f'Missing required columns: {", ".join(missing_columns)}')
+
+
+def iter_hours_batches(file, filename, mimetype=None, chunk_rows=CHUNK_ROWS, progress=None):
+    """Validate a club bulk-hours upload chunk by chunk.
+
+    Yields ``(entries, errors)`` per chunk, where ``entries`` are the dicts
+    of that chunk's valid rows, ready for a bulk insert. Raises
+    ``ParseError`` as soon as the header lacks a required column.
+    ``progress`` is called with the running row count after each chunk.
+    """
+    seen_emails = set()
+    for chunk in iter_chunks(file, filename, mimetype, chunk_rows, check_header=check_hours_header):
+        valid, chunk_errors = validate_hours_chunk(chunk, seen_emails)
+        yield valid.to_dict('records'), chunk_errors
+        if progress:
+            progress(chunk.index[-1] + 1 if len(chunk) else 0)
+
+
+def parse_hours_file(file, filename, mimetype=None, chunk_rows=CHUNK_ROWS, progress=None):
+    """Parse a club bulk-hours upload.
+
+    Returns ``(entries, errors, error_count)``: ``entries`` is a list of
+    dicts ready for a bulk insert, ``errors`` holds at most
+    ``MAX_REPORTED_ERRORS`` messages and ``error_count`` is the total.
+    Raises ``ParseError`` when the file is unreadable or lacks a required
+    column.
+    """
+    entries = []
+    errors = []
+    error_count = 0
+    for valid, chunk_errors in iter_hours_batches(file, filename, mimetype, chunk_rows, progress):
+        error_count += len(chunk_errors)
+        errors.extend(chunk_errors[:MAX_REPORTED_ERRORS - len(errors)])
+        if not error_count:
+            entries.extend(valid)
+    return (entries if not error_count else []), errors, error_count
+
+
+class RosterError(ParseError):
+    """An event roster was rejected; the message is shown to the officer."""
+
+
+def _pick_column(columns, *candidates):
+    return next((c for c in candidates if c in columns), None)
+
+
+def build_roster(emails, names=None, limit=None, strict=False, limit_message=None):
+    """Normalize, validate and dedupe a roster given as parallel Series.
+
+    Invalid emails are dropped, or rejected with ``RosterError`` when
+    ``strict``. Blank names fall back to the email's local part. Returns a
+    list of ``{'email', 'name'}`` dicts in first-seen order.
+    """
+    emails = normalize_emails(emails)
+    present = emails != ''
+    valid = valid_email_mask(emails)
+    if strict:
+        invalid = present & ~valid
+        if invalid.any():
+            raise RosterError(f'Invalid email address: {emails[invalid].iloc[0]}')
+    if names is None:
+        names = pd.Series('', index=emails.index)
+    names = names.astype(str).str.strip().where(lambda s: s != '', emails.str.split('@').str[0])
+    roster = pd.DataFrame({'email': emails, 'name': names})[valid].drop_duplicates(subset=['email'])
+    roster = roster.to_dict('records')
+    check_roster_limit(roster, limit, limit_message)
+    return roster
+
+
+def check_roster_limit(roster, limit, message=None):
+    """Raise ``RosterError`` when ``roster`` has more than ``limit`` volunteers."""
+    if limit and len(roster) > limit:
+        message = message or 'Too many volunteers. Limit is {limit}, you entered {count}.'
+        raise RosterError(message.format(limit=limit, count=len(roster)))
+
+
+def parse_roster(file, filename, mimetype=None, limit=None, progress=None):
+    """Read an event roster upload (CSV or Excel) with an Email and optional Name column."""
+    def check_header(columns):
+        if not _pick_column(columns, 'Email', 'email'):
+            raise RosterError("File must contain 'Email' column")
+
+    chunks = []
+    for chunk in iter_chunks(file, filename, mimetype, check_header=check_header):
+        chunks.append(chunk)
+        if progress:
+            progress(chunk.index[-1] + 1 if len(chunk) else 0)
+    if not chunks:
+        return []
+    df = pd.concat(chunks)
+    email_col = _pick_column(df.columns, 'Email', 'email')
+    name_col = _pick_column(df.columns, 'Name', 'name')
+    return build_roster(
+        df[email_col], df[name_col] if name_col else None, limit=limit, limit_message=FILE_LIMIT_MESSAGE,
+    )
+
+
+def roster_from_form(names, emails, limit=None):
+    """Build a roster from the manual-entry ``volunteer_names[]``/``volunteer_emails[]`` lists."""
+    if not any((e or '').strip() for e in emails):
+        raise RosterError('At least one volunteer email is required when inviting volunteers')
+    names = list(names[:len(emails)]) + [''] * max(0, len(emails) - len(names))
+    return build_roster(pd.Series(emails, dtype=str), pd.Series(names, dtype=str), limit=limit, strict=True)
@@ -0,0 +1,84 @@
+"""Cached dashboard counters.
+
+The officer home page and the officer header badges (rendered on every page
+through the ``inject_view_as`` context processor) need the same handful of
+counts. They are computed with one ``COUNT(*) FILTER (WHERE ...)`` query and
+kept per process for a short TTL; approval actions call
+``clear_officer_counters`` so officers see their own changes immediately.
+
+Club leader dashboard numbers come from one grouped query over the
+submission entries rather than from decoding each submission's JSON blob.
+"""
+import time
+from datetime import datetime
+
+from sqlalchemy import distinct, func, select, true
+
+from . import models
+from .db import get_db
+
+# officer_id -> (timestamp, counters)
+_officer_cache = {}
+_cache_ttl = 30  # seconds
+
+
+def clear_officer_counters():
+    """Drop cached officer counters so the next render re-reads them."""
+    _officer_cache.clear()
+
+
+def officer_counters(officer_id):
+    """Return pending-work and event counters for ``officer_id``.
+
+    Keys: pending_timelogs, pending_event_requests, pending_bulk_submissions,
+    active_events, total_events.
+    """
+    now = time.time()
+    cached = _officer_cache.get(officer_id)
+    if cached and (now - cached[0]) < _cache_ttl:
+        return cached[1]
+    counters = _query_officer_counters(officer_id)
+    _officer_cache[officer_id] = (now, counters)
+    return counters
+
+
+def _query_officer_counters(officer_id):
+    TimeLog, BulkSubmission, Event = models.TimeLog, models.BulkSubmission, models.Event
+    now = datetime.utcnow()
+
+    timelogs = select(
+        func.count().filter(TimeLog.status == 'PENDING').label('pending_timelogs'),
+        func.count().filter(TimeLog.status == 'PENDING_APPROVAL').label('pending_event_requests'),
+    ).where(TimeLog.status.in_(['PENDING', 'PENDING_APPROVAL'])).subquery()
+    bulk = select(
+        func.count().label('pending_bulk_submissions'),
+    ).where(BulkSubmission.status == 'PENDING').subquery()
+    events = select(
+        func.count().filter(Event.start_ts <= now, Event.end_ts > now).label('active_events'),
+        func.count().filter(Event.officer_id == officer_id).label('total_events'),
+    ).subquery()
+
+    # each subquery yields exactly one row, so joining them on TRUE gives one row
+    stmt = select(timelogs, bulk, events).select_from(
+        timelogs.join(bulk, true()).join(events, true())
+    )
+    row = get_db().execute(stmt).one()
+    return {key: int(value or 0) for key, value in row._mapping.items()}
+
+
+def club_leader_counters(leader_id):
+    """Return submission and volunteer totals for a club leader.
+
+    Keys: total_submissions, pending_submissions, total_volunteers (distinct
+    volunteer emails across every submission entry).
+    """
+    BulkSubmission, Entry = models.BulkSubmission, models.BulkSubmissionEntry
+    stmt = select(
+        func.count(distinct(BulkSubmission.id)).label('total_submissions'),
+        func.count(distinct(BulkSubmission.id)).filter(BulkSubmission.status == 'PENDING').label('pending_submissions'),
+        func.count(distinct(func.lower(Entry.email))).label('total_volunteers'),
+    ).select_from(BulkSubmission).outerjoin(
+        Entry, Entry.bulk_submission_id == BulkSubmission.id
+    ).where(BulkSubmission.club_leader_id == leader_id)
+    row = get_db().execute(stmt).one()
+    return {key: int(value or 0) for key, value in row._mapping.items()}
@@ -0,0 +1,295 @@
+"""Content-addressed storage for ticket attachments.
+
+Uploads are hashed (SHA-256) while they are copied to a temporary file and
+then moved to ``<root>/ab/cd/<hash>``, so identical files are stored once and
+no directory grows past a few hundred entries. ``attachment_blobs`` counts how
+many attachments point at each blob; a blob's file is only removed once its
+count drops to zero. Files are removed after the commit by a background
+cleanup thread (``cleanup_later``), so deleting many tickets never waits on
+the filesystem.
+
+The ``attachment_blobs`` row is what serializes an upload against a purge of
+the same content. ``save_blob`` takes its reference (locking the row) before
+it moves the file into place, and ``purge`` deletes a row only while its
+count is still zero, removing the file before it commits. Whichever comes
+second sees the other's result: the upload puts the file back, or the purge
+finds the new reference and leaves the file alone.
+
+The root is ``ATTACHMENT_STORAGE_DIR`` (``VMS_ATTACHMENT_STORAGE_DIR``),
+by default ``Backend/uploads/blobs``. Attachments saved before this layout
+have no ``sha256`` and still live in ``legacy_dir()``.
+
+Downloads are authorized by the view and then handed to ``send_blob``. With
+``ATTACHMENT_SENDFILE = 'x-accel'`` the bytes are served by nginx from an
+internal location, e.g.::
+
+    location /_attachments/ { internal; alias /srv/vms/blobs/; }
+
+with ``'x-sendfile'`` by Apache/lighttpd, and otherwise by the worker with
+Range support. The content hash is a strong ETag, so a repeat view is a 304.
+"""
+import hashlib
+import itertools
+import os
+import queue
+import tempfile
+import threading
+from collections import Counter
+from datetime import datetime
+
+from flask import current_app, request, send_file
+from sqlalchemy import bindparam, delete, select, update
+from sqlalchemy.exc import IntegrityError
+
+from . import models
+from .db import get_db
+
+COPY_CHUNK = 64 * 1024
+SNIFF_BYTES = 512
+# leading bytes -> MIME type; checked in order
+_MAGIC = [
+    (b'\x89PNG\r\n\x1a\n', 'image/png'),
+    (b'\xff\xd8\xff', 'image/jpeg'),
+    (b'GIF87a', 'image/gif'),
+    (b'GIF89a', 'image/gif'),
+    (b'%PDF-', 'application/pdf'),
+    (b'PK\x03\x04', 'application/zip'),  # also .docx/.xlsx
+    (b'PK\x05\x06', 'application/zip'),  # empty archive
+    (b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1', 'application/x-ole-storage'),  # legacy .doc/.xls
+]
+
+
+_cleanup_queue = queue.Queue()
+_cleanup_thread = None
+_cleanup_lock = threading.Lock()
+
+
+class TooLarge(ValueError):
+    """The stream went past the byte limit; nothing was stored."""
+
+
+def sniff_mime(head):
+    """MIME type from the first bytes of a file; ``text/plain`` for NUL-free data, None if unknown."""
+    for magic, mime in _MAGIC:
+        if head.startswith(magic):
+            return mime
+    if head and b'\x00' not in head:
+        return 'text/plain'
+    return None
+
+
+def root():
+    return current_app.config.get('ATTACHMENT_STORAGE_DIR') or os.path.join(current_app.root_path, 'uploads', 'blobs')
+
+
+def legacy_dir():
+    """Flat directory used for attachments stored before content addressing."""
+    return os.path.join(current_app.root_path, 'uploads', 'tickets')
+
+
+def relative_path(digest):
+    return os.path.join(digest[:2], digest[2:4], digest)
+
+
+def blob_path(digest):
+    return os.path.join(root(), relative_path(digest))
+
+
+def preview_path(digest, fmt):
+    """Where the preview image of a blob is kept (see thumbnails.py)."""
+    return f'{blob_path(digest)}.preview.{fmt}'
+
+
+def stage_blob(stream, max_bytes=None, head=b''):
+    """Copy ``head`` and then ``stream`` to a temporary file in the store.
+
+    Returns ``(sha256, size, tmp_path)``; pass ``tmp_path`` to ``place_blob``
+    or ``discard_staged``. The data is hashed while it is written, so the file
+    is read once. Copying stops with ``TooLarge`` as soon as more than
+    ``max_bytes`` arrive.
+    """
+    base = root()
+    os.makedirs(base, exist_ok=True)
+    digest = hashlib.sha256()
+    size = 0
+    fd, tmp = tempfile.mkstemp(prefix='.upload-', dir=base)
+    try:
+        with os.fdopen(fd, 'wb') as out:
+            chunks = iter(lambda: stream.read(COPY_CHUNK), b'')
+            for chunk in itertools.chain([head] if head else [], chunks):
+                size += len(chunk)
+                if max_bytes is not None and size > max_bytes:
+                    raise TooLarge(f'File too large (max {max_bytes // (1024 * 1024)}MB)')
+                digest.update(chunk)
+                out.write(chunk)
+    except BaseException:
+        discard_staged(tmp)
+        raise
+    return digest.hexdigest(), size, tmp
+
+
+def place_blob(tmp, sha256):
+    """Move a staged file to its place; an existing copy of the blob is simply replaced."""
+    final = blob_path(sha256)
+    os.makedirs(os.path.dirname(final), exist_ok=True)
+    os.replace(tmp, final)
+
+
+def discard_staged(tmp):
+    try:
+        os.remove(tmp)
+    except OSError:
+        pass
+
+
+def write_blob(stream, max_bytes=None, head=b''):
+    """Store a file without counting a reference; returns ``(sha256, size)``."""
+    sha256, size, tmp = stage_blob(stream, max_bytes=max_bytes, head=head)
+    try:
+        place_blob(tmp, sha256)
+    except BaseException:
+        discard_staged(tmp)
+        raise
+    return sha256, size
+
+
+def save_blob(db, stream, mime_type, max_bytes=None, head=b''):
+    """Store a file and count one reference to it; the caller commits. Returns ``(sha256, size)``.
+
+    The reference is taken before the file is moved into place (see the
+    module docstring), so a concurrent ``purge`` cannot remove it.
+    """
+    sha256, size, tmp = stage_blob(stream, max_bytes=max_bytes, head=head)
+    try:
+        add_ref(db, sha256, size, mime_type)
+        place_blob(tmp, sha256)
+    except BaseException:
+        discard_staged(tmp)
+        raise
+    return sha256, size
+
+
+def add_ref(db, sha256, size, mime_type):
+    """Count one more attachment pointing at ``sha256``; the caller commits."""
+    Blob = models.AttachmentBlob
+    bumped = db.execute(update(Blob).where(Blob.sha256 == sha256).values(ref_count=Blob.ref_count + 1))
+    if bumped.rowcount:
+        return
+    try:
+        with db.begin_nested():
+            db.add(Blob(sha256=sha256, size=size, mime_type=mime_type, ref_count=1, created_at=datetime.utcnow()))
+    except IntegrityError:
+        # another upload of the same file created the row first
+        db.execute(update(Blob).where(Blob.sha256 == sha256).values(ref_count=Blob.ref_count + 1))
+
+
+def release(db, digests):
+    """Drop one reference per entry in ``digests``; the caller commits.
+
+    Returns the digests whose count reached zero. Their rows stay (at zero)
+    until ``purge`` removes them with their files; pass the list to
+    ``cleanup_later`` (or ``purge``) after the commit.
+    """
+    counts = Counter(d for d in digests if d)
+    if not counts:
+        return []
+    Blob = models.AttachmentBlob
+    table = Blob.__table__
+    # Core executemany on the session's connection: one statement for the batch
+    db.connection().execute(
+        update(table).where(table.c.sha256 == bindparam('b_sha256')).values(ref_count=table.c.ref_count - bindparam('b_n')),
+        [{'b_sha256': d, 'b_n': n} for d, n in counts.items()],
+    )
+    return list(db.execute(select(Blob.sha256).where(Blob.sha256.in_(list(counts)), Blob.ref_count <= 0)).scalars())
+
+
+def purge(db, digests):
+    """Remove blobs in ``digests`` that are still unreferenced, rows and files; commits.
+
+    The conditional delete locks each row, so an upload that took a new
+    reference keeps its blob, and one still waiting to take it puts the file
+    back afterwards. Returns the number of files removed.
+    """
+    if not digests:
+        return 0
+    Blob = models.AttachmentBlob
+    try:
+        unused = list(db.execute(
+            delete(Blob).where(Blob.sha256.in_(list(digests)), Blob.ref_count <= 0)
+            .returning(Blob.sha256).execution_options(synchronize_session=False)
+        ).scalars())
+        removed = 0
+        for digest in unused:
+            for path in (blob_path(digest), preview_path(digest, 'webp'), preview_path(digest, 'jpg')):
+                try:
+                    os.remove(path)
+                    removed += path == blob_path(digest)
+                except OSError:
+                    pass
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    return removed
+
+
+def cleanup_later(digests, legacy_files=()):
+    """Queue ``purge(digests)`` and the removal of legacy attachment files; call after commit."""
+    digests, legacy_files = list(digests), list(legacy_files)
+    if not digests and not legacy_files:
+        return
+    global _cleanup_thread
+    _cleanup_queue.put((current_app._get_current_object(), digests, legacy_files))
+    with _cleanup_lock:
+        if _cleanup_thread is None:
+            _cleanup_thread = threading.Thread(target=_cleanup_worker, daemon=True)
+            _cleanup_thread.start()
+
+
+def _cleanup_worker():
+    while True:
+        app, digests, legacy_files = _cleanup_queue.get()
+        with app.app_context():
+            try:
+                purge(get_db(), digests)
+                for path in legacy_files:
+                    try:
+                        os.remove(os.path.join(legacy_dir(), path))
+                    except OSError as e:
+                        app.logger.error(f"Failed to delete attachment file {path}: {e}")
+            except Exception:
+                app.logger.exception('Attachment file cleanup failed')
+            finally:
+                _cleanup_queue.task_done()
+
+
+def send_blob(sha256, download_name, mime_type, preview=None):
+    """Response for downloading blob ``sha256``; the caller has checked access.
+
+    With ``preview`` (its format) the blob's preview image is sent inline instead.
+    """
+    etag = f'{sha256}-preview' if preview else sha256
+    suffix = f'.preview.{preview}' if preview else ''
+    if preview:
+        mime_type = 'image/webp' if preview == 'webp' else 'image/jpeg'
+    if etag in request.if_none_match:
+        response = current_app.response_class(status=304)
+    else:
+        mode = current_app.config.get('ATTACHMENT_SENDFILE')
+        if mode == 'x-accel':
+            response = current_app.response_class(mimetype=mime_type)
+            prefix = current_app.config.get('ATTACHMENT_ACCEL_PREFIX') or '/_attachments/'
+            response.headers['X-Accel-Redirect'] = prefix.rstrip('/') + '/' + relative_path(sha256).replace(os.sep, '/') + suffix
+        elif mode == 'x-sendfile':
+            response = current_app.response_class(mimetype=mime_type)
+            response.headers['X-Sendfile'] = os.path.abspath(blob_path(sha256) + suffix)
+        else:
+            # handles Range and If-Range itself
+            response = send_file(blob_path(sha256) + suffix, mimetype=mime_type, etag=etag, conditional=True)
+        if not preview:
+            response.headers.set('Content-Disposition', 'attachment', filename=download_name)
+    response.set_etag(etag)
+    # private: access is checked per user; no-cache: revalidate, which is a cheap 304
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response
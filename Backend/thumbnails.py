@@ -0,0 +1,120 @@
+"""Thumbnails for image attachments and first-page previews for PDFs.
+
+After an upload is committed, ``generate_for`` hands each new image or PDF
+blob to a process pool, so decoding a large photo never holds up the request
+or the GIL of the web worker. The preview is written next to the blob
+(``<hash>.preview.webp``, or ``.jpg`` where Pillow lacks WebP) and its format
+is recorded on ``attachment_blobs.preview``. Identical files share one
+preview.
+
+Pillow is needed for any preview and PyMuPDF for PDF pages; without them
+attachments simply have no preview.
+"""
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from flask import current_app
+from sqlalchemy import update
+
+from . import models, storage
+from .db import get_db
+
+try:
+    from PIL import Image, ImageOps, features
+except ImportError:
+    Image = None
+
+try:
+    import pymupdf as fitz
+except ImportError:
+    fitz = None
+
+PREVIEW_SIZE = (320, 320)
+IMAGE_TYPES = ('image/png', 'image/jpeg', 'image/gif')
+PDF_TYPES = ('application/pdf',)
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def preview_format():
+    if Image is None:
+        return None
+    return 'webp' if features.check('webp') else 'jpg'
+
+
+def supported(mime_type):
+    if Image is None:
+        return False
+    return mime_type in IMAGE_TYPES or (fitz is not None and mime_type in PDF_TYPES)
+
+
+def render_preview(src, dest, mime_type, fmt, size=PREVIEW_SIZE):
+    """Write a preview of ``src`` to ``dest``; runs in a pool process. Returns ``fmt`` or None."""
+    if mime_type in PDF_TYPES:
+        with fitz.open(src) as doc:
+            if not doc.page_count:
+                return None
+            page = doc.load_page(0)
+            zoom = max(size) / max(page.rect.width, page.rect.height, 1)
+            pix = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), alpha=False)
+            img = Image.frombytes('RGB', (pix.width, pix.height), pix.samples)
+    else:
+        img = Image.open(src)
+        img.draft('RGB', size)  # JPEG: decode at reduced scale
+        img = ImageOps.exif_transpose(img)
+    img.thumbnail(size)
+    if img.mode not in ('RGB', 'L'):
+        img = img.convert('RGB')
+    tmp = dest + '.tmp'
+    img.save(tmp, format='WEBP' if fmt == 'webp' else 'JPEG', quality=80)
+    os.replace(tmp, dest)
+    return fmt
+
+
+def _get_pool(app):
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            workers = app.config.get('THUMBNAIL_WORKERS', 2)
+            # spawn: forking a threaded web worker is not safe
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+        return _pool
+
+
+def generate_for(attachments):
+    """Queue previews for committed attachments whose blob has none yet."""
+    app = current_app._get_current_object()
+    fmt = preview_format()
+    if not fmt or not app.config.get('THUMBNAIL_WORKERS', 2):
+        return 0
+    wanted = {a.sha256: a.mime_type for a in attachments if a.sha256 and supported(a.mime_type)}
+    if not wanted:
+        return 0
+    Blob = models.AttachmentBlob
+    missing = [sha for (sha,) in get_db().query(Blob.sha256).filter(Blob.sha256.in_(list(wanted)), Blob.preview.is_(None))]
+    try:
+        pool = _get_pool(app)
+        for sha256 in missing:
+            future = pool.submit(render_preview, storage.blob_path(sha256), storage.preview_path(sha256, fmt), wanted[sha256], fmt)
+            future.add_done_callback(lambda f, sha256=sha256: _record(app, sha256, f))
+    except Exception:
+        app.logger.exception('Could not queue attachment previews')
+        return 0
+    return len(missing)
+
+
+def _record(app, sha256, future):
+    with app.app_context():
+        try:
+            fmt = future.result()
+        except Exception:
+            app.logger.exception('Preview generation failed for blob %s', sha256)
+            return
+        if not fmt:
+            return
+        db = get_db()
+        db.execute(update(models.AttachmentBlob).where(models.AttachmentBlob.sha256 == sha256).values(preview=fmt))
+        db.commit()
@@ -0,0 +1,118 @@
+"""Full-text search over support tickets.
+
+On PostgreSQL ``tickets.search_vector`` is a generated ``tsvector`` over the
+title (weight A), description (B) and the ticket's public responses (C), kept
+in ``tickets.responses_text``, with a GIN index (created in ``db.init_db``).
+Queries use ``websearch_to_tsquery``, so users can type quoted phrases,
+``or`` and ``-word``; results are ordered by ``ts_rank_cd`` and snippets come
+from ``ts_headline``. Other backends, like the local SQLite test database,
+match every word with ``ILIKE`` instead and highlight in Python.
+
+Internal notes are never added to ``responses_text``, so searching cannot
+reveal them to submitters.
+"""
+import re
+
+from markupsafe import Markup, escape
+from sqlalchemy import and_, case, func, literal_column, or_, select
+
+from . import models
+
+LANGUAGE = 'english'
+SNIPPET_CHARS = 160
+# private-use characters mark matches; they are swapped for <mark> after escaping
+_START, _STOP = '\ue000', '\ue001'
+_HEADLINE_OPTS = f'StartSel="{_START}", StopSel="{_STOP}", MaxFragments=2, MaxWords=25, MinWords=8'
+_TITLE_OPTS = f'StartSel="{_START}", StopSel="{_STOP}", HighlightAll=true'
+_WORD_RE = re.compile(r'[\w@.+-]+', re.UNICODE)
+
+# DDL applied by db.init_db on PostgreSQL only
+PG_DDL = [
+    f"""
+    ALTER TABLE tickets ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS (
+      setweight(to_tsvector('{LANGUAGE}', coalesce(title, '')), 'A') ||
+      setweight(to_tsvector('{LANGUAGE}', coalesce(description, '')), 'B') ||
+      setweight(to_tsvector('{LANGUAGE}', coalesce(responses_text, '')), 'C')
+    ) STORED
+    """,
+    'CREATE INDEX IF NOT EXISTS ix_tickets_search ON tickets USING gin (search_vector)',
+]
+
+
+def _is_postgres(db):
+    return db.get_bind().dialect.name == 'postgresql'
+
+
+def _words(term):
+    # the fallback ignores websearch operators and requires every word
+    return [w for w in _WORD_RE.findall(term.replace('"', ' ')) if w.lower() != 'or' and not w.startswith('-')]
+
+
+def apply(db, query, term):
+    """Restrict a ``Ticket`` query to matches for ``term``; returns ``(query, order_by)``.
+
+    ``order_by`` is a list of expressions for most relevant first.
+    """
+    Ticket = models.Ticket
+    if _is_postgres(db):
+        tsquery = func.websearch_to_tsquery(LANGUAGE, term)
+        vector = literal_column('tickets.search_vector')
+        return query.filter(vector.op('@@')(tsquery)), [func.ts_rank_cd(vector, tsquery).desc(), Ticket.updated_at.desc()]
+
+    words = _words(term) or [term]
+    fields = (Ticket.title, Ticket.description, Ticket.responses_text)
+    query = query.filter(and_(*[or_(*[f.icontains(w, autoescape=True) for f in fields]) for w in words]))
+    in_title = case((and_(*[Ticket.title.icontains(w, autoescape=True) for w in words]), 1), else_=0)
+    return query, [in_title.desc(), Ticket.updated_at.desc()]
+
+
+def _markup(text):
+    return Markup(str(escape(text)).replace(_START, '<mark>').replace(_STOP, '</mark>'))
+
+
+def _mark_words(text, words):
+    if not words:
+        return text
+    pattern = re.compile('|'.join(re.escape(w) for w in sorted(words, key=len, reverse=True)), re.IGNORECASE)
+    return pattern.sub(lambda m: _START + m.group(0) + _STOP, text)
+
+
+def _fallback_snippet(body, words):
+    body = ' '.join((body or '').split())
+    lowered = body.lower()
+    hits = [lowered.find(w.lower()) for w in words]
+    hits = [h for h in hits if h >= 0]
+    start = max(0, min(hits) - SNIPPET_CHARS // 4) if hits else 0
+    snippet = body[start:start + SNIPPET_CHARS]
+    if start > 0:
+        snippet = '…' + snippet
+    if start + SNIPPET_CHARS < len(body):
+        snippet += '…'
+    return _mark_words(snippet, words)
+
+
+def highlights(db, ticket_ids, term):
+    """``{ticket_id: (title, snippet)}`` with matches wrapped in ``<mark>``; both are safe ``Markup``.
+
+    Only call this for the tickets being shown: headlines are computed per row.
+    """
+    if not ticket_ids:
+        return {}
+    Ticket = models.Ticket
+    if _is_postgres(db):
+        tsquery = func.websearch_to_tsquery(LANGUAGE, term)
+        body = func.concat_ws(' ', Ticket.description, Ticket.responses_text)
+        rows = db.execute(select(
+            Ticket.id,
+            func.ts_headline(LANGUAGE, Ticket.title, tsquery, _TITLE_OPTS),
+            func.ts_headline(LANGUAGE, body, tsquery, _HEADLINE_OPTS),
+        ).where(Ticket.id.in_(ticket_ids))).all()
+        return {tid: (_markup(title), _markup(snippet)) for tid, title, snippet in rows}
+
+    words = _words(term) or [term]
+    rows = db.execute(select(Ticket.id, Ticket.title, Ticket.description, Ticket.responses_text)
+                      .where(Ticket.id.in_(ticket_ids))).all()
+    return {
+        tid: (_markup(_mark_words(title, words)), _markup(_fallback_snippet(f'{desc} {responses or ""}', words)))
+        for tid, title, desc, responses in rows
+    }
@@ -1,20 +1,39 @@
 from flask import Blueprint, render_template, request, flash, redirect, url_for, abort, current_app, send_from_directory
 from flask_login import login_required, current_user
-from sqlalchemy import desc
-from werkzeug.exceptions import BadRequest
+from sqlalchemy import delete, desc, func, literal, or_, select, update
+from sqlalchemy.orm import joinedload, selectinload
+from werkzeug.exceptions import BadRequest, RequestEntityTooLarge
 from werkzeug.utils import secure_filename
-import os
 from datetime import datetime
+from functools import wraps
 
 from .models import Ticket, TicketResponse, TicketAttachment, User, gen_id
-from .db import get_db
-from .email import send_email
+from . import notifications, storage, thumbnails, ticket_search, workload
+from .db import any_of, get_db
 
 bp = Blueprint('tickets', __name__, url_prefix='/tickets')
 
 # File upload configuration
 ALLOWED_EXTENSIONS = {'txt', 'pdf', 'png', 'jpg', 'jpeg', 'gif', 'doc', 'docx', 'xls', 'xlsx', 'zip'}
 MAX_FILE_SIZE = 10 * 1024 * 1024  # 10MB
+MAX_FILES_PER_TICKET = 5  # attachments accepted with a new ticket
+FORM_OVERHEAD = 64 * 1024  # room for the other form fields and multipart headers
+# extension -> (type the content must sniff as, MIME type recorded); the client's type is ignored
+ATTACHMENT_TYPES = {
+    'txt': ('text/plain', 'text/plain'),
+    'pdf': ('application/pdf', 'application/pdf'),
+    'png': ('image/png', 'image/png'),
+    'jpg': ('image/jpeg', 'image/jpeg'),
+    'jpeg': ('image/jpeg', 'image/jpeg'),
+    'gif': ('image/gif', 'image/gif'),
+    'doc': ('application/x-ole-storage', 'application/msword'),
+    'xls': ('application/x-ole-storage', 'application/vnd.ms-excel'),
+    'docx': ('application/zip', 'application/vnd.openxmlformats-officedocument.wordprocessingml.document'),
+    'xlsx': ('application/zip', 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'),
+    'zip': ('application/zip', 'application/zip'),
+}
+MAX_PER_PAGE = 100
+RESPONSES_PAGE_SIZE = 20
 
 
 def allowed_file(filename):
@@ -22,30 +41,47 @@ def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
 
-def get_upload_dir():
-    """Get the upload directory path"""
-    upload_dir = os.path.join(current_app.root_path, 'uploads', 'tickets')
-    os.makedirs(upload_dir, exist_ok=True)
-    return upload_dir
+def upload_limit(max_bytes, back, **back_kwargs):
+    """Cap the request body of an upload view at ``max_bytes``.
+
+    Werkzeug refuses a larger declared Content-Length before reading the body,
+    and stops reading a stream without one once it passes the cap, so an
+    oversized upload is never spooled to disk. The user is sent back to
+    ``back`` (an endpoint, given the view's URL arguments) with a message.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            request.max_content_length = max_bytes
+            try:
+                return view(*args, **kwargs)
+            except RequestEntityTooLarge:
+                flash(f'Upload too large (max {MAX_FILE_SIZE // (1024 * 1024)}MB per file).', 'error')
+                return redirect(url_for(back, **kwargs, **back_kwargs))
+        return wrapper
+    return decorator
 
 
 def save_attachment(file, ticket_id, response_id=None):
-    """Save uploaded file and create attachment record"""
+    """Store an uploaded file in the blob store and create its attachment record"""
     if not file or not allowed_file(file.filename):
         raise ValueError("Invalid file type")
 
-    if file.content_length > MAX_FILE_SIZE:
+    # multipart parts rarely declare a length, so the copy below enforces the cap
+    if file.content_length and file.content_length > MAX_FILE_SIZE:
         raise ValueError("File too large (max 10MB)")
 
-    # Generate secure filename
-    filename = secure_filename(file.filename)
-    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-    unique_filename = f"{timestamp}_{gen_id('')}_{filename}"
+    # Trust the first bytes, not the client's Content-Type
+    expected, mime_type = ATTACHMENT_TYPES[file.filename.rsplit('.', 1)[1].lower()]
+    head = file.stream.read(storage.SNIFF_BYTES)
+    if not head:
+        raise ValueError("File is empty")
+    if storage.sniff_mime(head) != expected:
+        raise ValueError("File content does not match its extension")
 
-    # Save file
-    upload_dir = get_upload_dir()
-    file_path = os.path.join(upload_dir, unique_filename)
-    file.save(file_path)
+    # Identical files share one blob; the record keeps the user's filename
+    filename = secure_filename(file.filename)
+    sha256, size = storage.save_blob(get_db(), file.stream, mime_type, max_bytes=MAX_FILE_SIZE, head=head)
 
     # Create attachment record
     attachment = TicketAttachment(
@@ -53,16 +89,27 @@ def save_attachment(file, ticket_id, response_id=None):
         ticket_id=ticket_id,
         response_id=response_id,
         uploader_id=current_user.id,
-        filename=unique_filename,
+        filename=filename,
         original_filename=filename,
-        file_size=os.path.getsize(file_path),
-        mime_type=file.mimetype or 'application/octet-stream',
-        file_path=unique_filename
+        file_size=size,
+        mime_type=mime_type,
+        file_path=storage.relative_path(sha256),
+        sha256=sha256
     )
 
     return attachment
 
 
+def _response_counts(db, ticket_ids):
+    """``{ticket_id: responses visible to the current user}`` in one grouped query."""
+    if not ticket_ids:
+        return {}
+    query = db.query(TicketResponse.ticket_id, func.count()).filter(TicketResponse.ticket_id.in_(ticket_ids))
+    if current_user.role != 'officer':
+        query = query.filter(or_(TicketResponse.is_internal.is_(None), TicketResponse.is_internal == 0))
+    return dict(query.group_by(TicketResponse.ticket_id).all())
+
+
 @bp.route('/')
 @login_required
 def index():
@@ -76,11 +123,16 @@ def index():
     priority_filter = request.args.get('priority', '').strip()
 
     # Pagination parameters
-    page = int(request.args.get('page', 1))
-    per_page = int(request.args.get('per_page', 25))
-
-    # Base query
-    query = db.query(Ticket)
+    try:
+        page = max(1, int(request.args.get('page', 1)))
+        per_page = min(MAX_PER_PAGE, max(1, int(request.args.get('per_page', 25))))
+    except ValueError:
+        page, per_page = 1, 25
+
+    # Base query; the window count gives the total without a second scan
+    query = db.query(Ticket, func.count().over().label('total')).options(
+        joinedload(Ticket.submitter), joinedload(Ticket.assigned_officer)
+    )
 
     # Apply role-based filtering
     if current_user.role == 'officer':
@@ -88,35 +140,34 @@ def index():
         pass
     else:
         # Regular users see only their own tickets
-        query = query.filter_by(submitter_id=current_user.id)
+        query = query.filter(Ticket.submitter_id == current_user.id)
 
-    # Apply search filter
+    # Apply search filter, most relevant first
+    order_by = [desc(Ticket.updated_at)]
     if search:
-        search_term = f"%{search}%"
-        query = query.filter(
-            db.or_(
-                Ticket.title.ilike(search_term),
-                Ticket.description.ilike(search_term)
-            )
-        )
+        query, order_by = ticket_search.apply(db, query, search)
 
     # Apply status filter
     if status_filter:
-        query = query.filter_by(status=status_filter)
+        query = query.filter(Ticket.status == status_filter)
 
     # Apply category filter
     if category_filter:
-        query = query.filter_by(category=category_filter)
+        query = query.filter(Ticket.category == category_filter)
 
     # Apply priority filter
     if priority_filter:
-        query = query.filter_by(priority=priority_filter)
+        query = query.filter(Ticket.priority == priority_filter)
 
-    # Get total count for pagination
-    total_tickets = query.count()
+    rows = query.order_by(*order_by).offset((page - 1) * per_page).limit(per_page).all()
+    if not rows and page > 1:
+        return redirect(url_for('tickets.index', **dict(request.args.to_dict(), page=1)))
+    tickets = [ticket for ticket, _ in rows]
+    total_tickets = rows[0].total if rows else 0
 
-    # Order by most recent first and paginate
-    tickets = query.order_by(desc(Ticket.updated_at)).offset((page - 1) * per_page).limit(per_page).all()
+    # highlighted title and snippet, only for the tickets on this page
+    highlights = ticket_search.highlights(db, [t.id for t in tickets], search) if search else {}
+    response_counts = _response_counts(db, [t.id for t in tickets])
 
     # Calculate pagination info
     total_pages = (total_tickets + per_page - 1) // per_page
@@ -144,11 +195,13 @@ def index():
     if current_user.role == 'officer':
         officers = db.query(User).filter_by(role='officer').order_by(User.name).all()
 
-    return render_template('tickets/index.html', tickets=tickets, pagination=pagination, officers=officers)
+    return render_template('tickets/index.html', tickets=tickets, pagination=pagination, officers=officers,
+                           highlights=highlights, response_counts=response_counts)
 
 
 @bp.route('/create', methods=['GET', 'POST'])
 @login_required
+@upload_limit(MAX_FILES_PER_TICKET * MAX_FILE_SIZE + FORM_OVERHEAD, 'tickets.create')
 def create():
     """Create a new ticket"""
     if request.method == 'POST':
@@ -182,19 +235,27 @@ def create():
             title=title,
             description=description,
             category=category,
-            priority=priority
+            priority=priority,
+            status='open'
         )
 
+        # Give it to the least-loaded officer if auto-assignment is on
+        if current_app.config.get('TICKET_AUTO_ASSIGN'):
+            ticket.assigned_officer_id = workload.pick_officer(db)
+            workload.adjust(db, after=[(ticket.assigned_officer_id, ticket.status)])
+
         db.add(ticket)
         db.commit()
 
         # Handle file attachments
-        attachments = request.files.getlist('attachments')
+        attachments = request.files.getlist('attachments')[:MAX_FILES_PER_TICKET]
+        saved = []
         for file in attachments:
             if file and file.filename and allowed_file(file.filename):
                 try:
                     attachment = save_attachment(file, ticket.id)
                     db.add(attachment)
+                    saved.append(attachment)
                 except ValueError as e:
                     flash(f'Failed to upload {file.filename}: {str(e)}', 'error')
                 except Exception as e:
@@ -202,11 +263,14 @@ def create():
                     current_app.logger.error(f"Attachment upload failed for {file.filename}: {e}")
 
         db.commit()
+        thumbnails.generate_for(saved)
 
         flash('Your ticket has been submitted successfully. An officer will review it soon.', 'success')
 
         # Send email notification to officers
         notify_ticket_created(ticket)
+        if ticket.assigned_officer_id:
+            notify_ticket_assigned(ticket)
 
         return redirect(url_for('tickets.view', ticket_id=ticket.id))
 
@@ -216,9 +280,15 @@ def create():
 @bp.route('/<ticket_id>')
 @login_required
 def view(ticket_id):
-    """View a specific ticket and its responses"""
+    """View a specific ticket and one page of its responses, newest page first"""
     db = get_db()
-    ticket = db.query(Ticket).filter_by(id=ticket_id).first()
+    ticket = db.query(Ticket).options(
+        joinedload(Ticket.submitter),
+        joinedload(Ticket.assigned_officer),
+        selectinload(Ticket.attachments).options(
+            joinedload(TicketAttachment.uploader), joinedload(TicketAttachment.blob)
+        ),
+    ).filter(Ticket.id == ticket_id).first()
 
     if not ticket:
         abort(404)
@@ -227,20 +297,31 @@ def view(ticket_id):
     if current_user.role != 'officer' and ticket.submitter_id != current_user.id:
         abort(403)
 
-    # Get responses
-    responses = db.query(TicketResponse).filter_by(ticket_id=ticket_id).order_by(TicketResponse.created_at).all()
-
-    # Get user info for responses
-    response_users = {}
-    for response in responses:
-        if response.responder_id not in response_users:
-            user = db.query(User).filter_by(id=response.responder_id).first()
-            response_users[response.responder_id] = user.name if user else 'Unknown'
+    try:
+        page = max(1, int(request.args.get('page', 1)))
+    except ValueError:
+        page = 1
+
+    # Get responses with their authors; internal notes are for officers only
+    query = db.query(TicketResponse, func.count().over().label('total')).options(
+        joinedload(TicketResponse.author)
+    ).filter(TicketResponse.ticket_id == ticket_id)
+    if current_user.role != 'officer':
+        query = query.filter(or_(TicketResponse.is_internal.is_(None), TicketResponse.is_internal == 0))
+    rows = query.order_by(desc(TicketResponse.created_at), desc(TicketResponse.id)).offset(
+        (page - 1) * RESPONSES_PAGE_SIZE).limit(RESPONSES_PAGE_SIZE).all()
+    if not rows and page > 1:
+        return redirect(url_for('tickets.view', ticket_id=ticket_id))
+    total_responses = rows[0].total if rows else 0
+    # shown oldest to newest within the page, like the rest of the thread
+    responses = [response for response, _ in reversed(rows)]
 
     return render_template('tickets/view.html',
                          ticket=ticket,
                          responses=responses,
-                         response_users=response_users)
+                         total_responses=total_responses,
+                         page=page,
+                         has_older=page * RESPONSES_PAGE_SIZE < total_responses)
 
 
 @bp.route('/<ticket_id>/respond', methods=['POST'])
@@ -275,9 +356,15 @@ def respond(ticket_id):
     # Update ticket status if provided
     new_status = request.form.get('status')
     if new_status in ['open', 'in_progress', 'resolved', 'closed']:
+        workload.adjust(db, [(ticket.assigned_officer_id, ticket.status)], [(ticket.assigned_officer_id, new_status)])
         ticket.status = new_status
 
     db.add(response)
+    if not is_internal:
+        # appended in SQL so concurrent responses are not lost
+        db.execute(update(Ticket).where(Ticket.id == ticket_id).values(
+            responses_text=func.coalesce(Ticket.responses_text + '\n', '') + response_text
+        ).execution_options(synchronize_session=False))
     db.commit()
 
     flash('Response added successfully.', 'success')
@@ -308,9 +395,11 @@ def assign(ticket_id):
         if not officer:
             flash('Invalid officer selected.', 'error')
             return redirect(url_for('tickets.view', ticket_id=ticket_id))
-        ticket.assigned_officer_id = officer_id
     else:
-        ticket.assigned_officer_id = None
+        officer_id = None
+
+    workload.adjust(db, [(ticket.assigned_officer_id, ticket.status)], [(officer_id, ticket.status)])
+    ticket.assigned_officer_id = officer_id
 
     db.commit()
     flash('Ticket assignment updated.', 'success')
@@ -340,6 +429,7 @@ def update_status(ticket_id):
         return redirect(url_for('tickets.view', ticket_id=ticket_id))
 
     old_status = ticket.status
+    workload.adjust(db, [(ticket.assigned_officer_id, old_status)], [(ticket.assigned_officer_id, new_status)])
     ticket.status = new_status
     db.commit()
 
@@ -351,103 +441,91 @@ def update_status(ticket_id):
     return redirect(url_for('tickets.view', ticket_id=ticket_id))
 
 
-# Email notification functions
-def send_ticket_notification(ticket, action, recipients=None, response=None):
-    """Send email notification for ticket events"""
-    try:
-        if not recipients:
-            # Default recipients based on action
-            if action == 'created':
-                # Notify all officers
-                db = get_db()
-                officers = db.query(User).filter_by(role='officer').all()
-                recipients = [officer.email for officer in officers]
-            elif action in ['responded', 'status_changed', 'assigned']:
-                # Notify ticket submitter
-                recipients = [ticket.submitter.email] if ticket.submitter else []
-
-        if not recipients:
-            return
-
-        subject = f"Ticket #{ticket.id.split('_')[1]} - {action.replace('_', ' ').title()}"
-
-        # Create email body
-        body = f"""
-Ticket: {ticket.title}
-ID: {ticket.id.split('_')[1]}
-Category: {ticket.category_display}
-Priority: {ticket.priority_display}
-Status: {ticket.status_display}
-Submitted by: {ticket.submitter.name if ticket.submitter else 'Unknown'}
-
-{ticket.description[:200]}{'...' if len(ticket.description) > 200 else ''}
-
-View ticket: {url_for('tickets.view', ticket_id=ticket.id, _external=True)}
-"""
-
-        if response:
-            body += f"\n\nLatest Response from {response.author.name}:\n{response.response_text[:200]}{'...' if len(response.response_text) > 200 else ''}"
-
-        send_email(
-            subject=subject,
-            body=body,
-            recipients=recipients,
-            async_send=True
-        )
-
-    except Exception as e:
-        # Log error but don't fail the operation
-        try:
-            current_app.logger.error(f"Failed to send ticket notification: {e}")
-        except Exception:
-            pass
-
-
+# Email notification functions; events are recorded and sent as digests (see notifications.py)
 def notify_ticket_created(ticket):
     """Send notification when ticket is created"""
-    send_ticket_notification(ticket, 'created')
+    submitter = ticket.submitter.name if ticket.submitter else 'Unknown'
+    detail = f"{ticket.category_display}, {ticket.priority_display} priority, from {submitter}"
+    notifications.queue([(ticket, 'created', notifications.OFFICERS, detail)])
 
 
 def notify_ticket_response(ticket, response):
     """Send notification when ticket gets a response"""
-    send_ticket_notification(ticket, 'responded', response=response)
+    if response.is_internal:
+        return
+    author = response.author.name if response.author else 'Unknown'
+    text = response.response_text
+    detail = f"{author}: {text[:200]}{'...' if len(text) > 200 else ''}"
+    notifications.queue([(ticket, 'responded', ticket.submitter.email if ticket.submitter else None, detail)])
+
+
+def notify_tickets_status_changed(changes):
+    """Send notifications for ``(ticket, old_status, submitter_email)`` whose status changed.
+
+    ``ticket`` only needs ``id``, ``title``, ``priority`` and the new ``status``,
+    so bulk updates can pass plain result rows.
+    """
+    notifications.queue([
+        (ticket, 'status_changed', submitter_email,
+         f"{old_status.replace('_', ' ').title()} -> {ticket.status.replace('_', ' ').title()}")
+        for ticket, old_status, submitter_email in changes if ticket.status != old_status
+    ])
 
 
 def notify_ticket_status_changed(ticket, old_status):
     """Send notification when ticket status changes"""
-    if ticket.status != old_status:
-        send_ticket_notification(ticket, 'status_changed')
+    notify_tickets_status_changed([(ticket, old_status, ticket.submitter.email if ticket.submitter else None)])
 
 
 def notify_ticket_assigned(ticket):
     """Send notification when ticket is assigned"""
     if ticket.assigned_officer:
-        send_ticket_notification(ticket, 'assigned', recipients=[ticket.assigned_officer.email])
+        notifications.queue([(ticket, 'assigned', ticket.assigned_officer.email, f'Assigned to {ticket.assigned_officer.name}')])
 
 
-@bp.route('/attachment/<attachment_id>')
-@login_required
-def download_attachment(attachment_id):
-    """Download a ticket attachment"""
-    db = get_db()
-    attachment = db.query(TicketAttachment).filter_by(id=attachment_id).first()
+def _get_attachment(attachment_id):
+    """The attachment, if the current user may see its ticket (one joined query)."""
+    row = get_db().query(TicketAttachment, Ticket.submitter_id).join(
+        Ticket, Ticket.id == TicketAttachment.ticket_id
+    ).filter(TicketAttachment.id == attachment_id).first()
 
-    if not attachment:
+    if not row:
         abort(404)
+    attachment, submitter_id = row
 
     # Check permissions
-    ticket = attachment.ticket
-    if current_user.role != 'officer' and ticket.submitter_id != current_user.id:
+    if current_user.role != 'officer' and submitter_id != current_user.id:
         abort(403)
+    return attachment
+
+
+@bp.route('/attachment/<attachment_id>/preview')
+@login_required
+def attachment_preview(attachment_id):
+    """Small preview image of an image or PDF attachment"""
+    attachment = _get_attachment(attachment_id)
+    blob = attachment.blob
+    if not blob or not blob.preview:
+        abort(404)
+    return storage.send_blob(blob.sha256, attachment.original_filename, attachment.mime_type, preview=blob.preview)
 
-    upload_dir = get_upload_dir()
-    return send_from_directory(upload_dir, attachment.file_path,
+
+@bp.route('/attachment/<attachment_id>')
+@login_required
+def download_attachment(attachment_id):
+    """Download a ticket attachment"""
+    attachment = _get_attachment(attachment_id)
+    if attachment.sha256:
+        return storage.send_blob(attachment.sha256, attachment.original_filename, attachment.mime_type)
+    # attachments from before the blob store live in the old flat directory
+    return send_from_directory(storage.legacy_dir(), attachment.file_path,
                              download_name=attachment.original_filename,
                              as_attachment=True)
 
 
 @bp.route('/<ticket_id>/attach', methods=['POST'])
 @login_required
+@upload_limit(MAX_FILE_SIZE + FORM_OVERHEAD, 'tickets.view')
 def upload_attachment(ticket_id):
     """Upload attachment to a ticket"""
     db = get_db()
@@ -469,6 +547,7 @@ def upload_attachment(ticket_id):
         attachment = save_attachment(file, ticket_id)
         db.add(attachment)
         db.commit()
+        thumbnails.generate_for([attachment])
 
         flash('Attachment uploaded successfully.', 'success')
 
@@ -501,13 +580,16 @@ def bulk_update():
         return redirect(url_for('tickets.index'))
 
     db = get_db()
-    tickets = db.query(Ticket).filter(Ticket.id.in_(ticket_ids)).all()
-
-    if not tickets:
-        flash('No valid tickets found.', 'error')
-        return redirect(url_for('tickets.index'))
+    ticket_ids = list(dict.fromkeys(ticket_ids))
+    selected = any_of(Ticket.id, ticket_ids)
+    now = datetime.utcnow()
+    # every action is one statement over the whole selection
+    tickets_update = update(Ticket).where(selected).execution_options(synchronize_session=False)
 
-    updated_count = 0
+    def active_tickets():
+        # (officer, status) of the selected tickets that count towards officer workload
+        return db.execute(select(Ticket.assigned_officer_id, Ticket.status)
+                          .where(selected, Ticket.status.in_(workload.TRACKED))).all()
 
     try:
         if bulk_action.startswith('status_'):
@@ -517,16 +599,22 @@ def bulk_update():
                 flash('Invalid status.', 'error')
                 return redirect(url_for('tickets.index'))
 
-            for ticket in tickets:
-                ticket.status = new_status
-                ticket.updated_at = datetime.utcnow()
-                updated_count += 1
+            # old statuses for the notifications, read in the same transaction
+            status_changes = [(row, row.old_status, row.submitter_email) for row in db.execute(
+                select(Ticket.id, Ticket.title, Ticket.priority, Ticket.status.label('old_status'),
+                       literal(new_status).label('status'), Ticket.assigned_officer_id,
+                       User.email.label('submitter_email'))
+                .outerjoin(User, User.id == Ticket.submitter_id)
+                .where(selected, Ticket.status != new_status)
+            ).all()]
+            workload.adjust(db, [(row.assigned_officer_id, old) for row, old, _ in status_changes],
+                            [(row.assigned_officer_id, new_status) for row, _, _ in status_changes])
+            updated_count = db.execute(tickets_update.values(status=new_status, updated_at=now)).rowcount
 
         elif bulk_action == 'assign_me':
-            for ticket in tickets:
-                ticket.assigned_officer_id = current_user.id
-                ticket.updated_at = datetime.utcnow()
-                updated_count += 1
+            active = active_tickets()
+            workload.adjust(db, active, [(current_user.id, status) for _, status in active])
+            updated_count = db.execute(tickets_update.values(assigned_officer_id=current_user.id, updated_at=now)).rowcount
 
         elif bulk_action == 'assign_officer':
             if not assign_to:
@@ -538,52 +626,49 @@ def bulk_update():
                 flash('Invalid officer selected.', 'error')
                 return redirect(url_for('tickets.index'))
 
-            for ticket in tickets:
-                ticket.assigned_officer_id = assign_to
-                ticket.updated_at = datetime.utcnow()
-                updated_count += 1
+            active = active_tickets()
+            workload.adjust(db, active, [(assign_to, status) for _, status in active])
+            updated_count = db.execute(tickets_update.values(assigned_officer_id=assign_to, updated_at=now)).rowcount
 
         elif bulk_action == 'unassign':
-            for ticket in tickets:
-                ticket.assigned_officer_id = None
-                ticket.updated_at = datetime.utcnow()
-                updated_count += 1
+            workload.adjust(db, active_tickets())
+            updated_count = db.execute(tickets_update.values(assigned_officer_id=None, updated_at=now)).rowcount
 
         elif bulk_action == 'delete':
-            # Delete associated responses and attachments first
-            for ticket in tickets:
-                # Delete attachments
-                attachments = db.query(TicketAttachment).filter(TicketAttachment.ticket_id == ticket.id).all()
-                for attachment in attachments:
-                    try:
-                        file_path = os.path.join(get_upload_dir(), attachment.filename)
-                        if os.path.exists(file_path):
-                            os.remove(file_path)
-                    except Exception as e:
-                        current_app.logger.error(f"Failed to delete attachment file {attachment.filename}: {e}")
-
-                # Delete responses and attachments
-                db.query(TicketAttachment).filter(TicketAttachment.ticket_id == ticket.id).delete()
-                db.query(TicketResponse).filter(TicketResponse.ticket_id == ticket.id).delete()
-
-            # Delete tickets
-            for ticket in tickets:
-                db.delete(ticket)
-                updated_count += 1
+            workload.adjust(db, active_tickets())
+            # Delete associated attachments and responses first; shared blobs only lose a reference
+            attachments = db.execute(
+                delete(TicketAttachment).where(any_of(TicketAttachment.ticket_id, ticket_ids))
+                .returning(TicketAttachment.sha256, TicketAttachment.file_path)
+                .execution_options(synchronize_session=False)
+            ).all()
+            unused_blobs = storage.release(db, [a.sha256 for a in attachments])
+            legacy_files = [a.file_path for a in attachments if not a.sha256]
+            db.execute(delete(TicketResponse).where(any_of(TicketResponse.ticket_id, ticket_ids))
+                       .execution_options(synchronize_session=False))
+            updated_count = db.execute(delete(Ticket).where(selected).execution_options(synchronize_session=False)).rowcount
 
         else:
             flash('Invalid action.', 'error')
             return redirect(url_for('tickets.index'))
 
+        if not updated_count:
+            db.rollback()
+            flash('No valid tickets found.', 'error')
+            return redirect(url_for('tickets.index'))
+
         db.commit()
 
-        # Send email notifications for status changes
+        # Files go only once the rows that pointed at them are gone, off the request thread
+        if bulk_action == 'delete':
+            storage.cleanup_later(unused_blobs, legacy_files)
+
+        # Record status-change notifications in one batch; submitters get them as a digest
         if bulk_action.startswith('status_'):
-            for ticket in tickets:
-                try:
-                    send_ticket_notification(ticket, f"Status updated to {new_status.replace('_', ' ')}")
-                except Exception as e:
-                    current_app.logger.error(f"Failed to send notification for ticket {ticket.id}: {e}")
+            try:
+                notify_tickets_status_changed(status_changes)
+            except Exception as e:
+                current_app.logger.error(f"Failed to queue ticket notifications: {e}")
 
         action_messages = {
             'status_resolved': f'Marked {updated_count} ticket(s) as resolved.',
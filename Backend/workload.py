@@ -0,0 +1,150 @@
+"""Per-officer ticket counters and load-aware auto-assignment.
+
+``officer_workload`` holds, for every officer, how many assigned tickets are
+open and in progress. Instead of counting tickets on demand, every status or
+assignment change calls ``adjust`` with the ticket's state before and after,
+in the same transaction as the change, so the counters move by deltas.
+
+With ``TICKET_AUTO_ASSIGN`` on, ``tickets.create`` gives a new ticket to the
+officer with the lowest ``active_count`` (open + in progress), read from the
+top of the ``ix_officer_workload_active`` index rather than by counting.
+
+Counters can drift: a ticket changed by hand in the database, an officer who
+lost the role, two officers changing one ticket at the same moment.
+``reconcile`` recounts from ``tickets`` and repairs the rows; run it from
+cron with ``flask --app Backend reconcile-officer-workload``.
+"""
+from collections import Counter, defaultdict
+from datetime import datetime
+
+import click
+from sqlalchemy import bindparam, delete, exists, func, insert, select, update
+from sqlalchemy.exc import IntegrityError
+
+from . import models
+from .db import any_of, get_db
+
+TRACKED = ('open', 'in_progress')
+
+
+def _counts(db, officer_ids=None):
+    """``{officer_id: Counter(status=n)}`` counted from the tickets table."""
+    Ticket = models.Ticket
+    stmt = select(Ticket.assigned_officer_id, Ticket.status, func.count()).where(
+        Ticket.assigned_officer_id.isnot(None), Ticket.status.in_(TRACKED)
+    ).group_by(Ticket.assigned_officer_id, Ticket.status)
+    if officer_ids is not None:
+        stmt = stmt.where(any_of(Ticket.assigned_officer_id, officer_ids))
+    counts = defaultdict(Counter)
+    for officer_id, status, n in db.execute(stmt):
+        counts[officer_id][status] = n
+    return counts
+
+
+def _row(officer_id, counts, now=None):
+    return {
+        'officer_id': officer_id, 'open_count': counts['open'], 'in_progress_count': counts['in_progress'],
+        'active_count': counts['open'] + counts['in_progress'], 'reconciled_at': now,
+    }
+
+
+def _ensure_rows(db, officer_ids):
+    """Create missing counter rows, counted from the tickets the officers already have."""
+    W = models.OfficerWorkload
+    missing = set(officer_ids) - set(db.execute(select(W.officer_id).where(any_of(W.officer_id, officer_ids))).scalars())
+    if not missing:
+        return
+    counts = _counts(db, list(missing))
+    try:
+        with db.begin_nested():
+            db.execute(insert(W), [_row(officer_id, counts[officer_id]) for officer_id in missing])
+    except IntegrityError:
+        # a concurrent request created them first
+        pass
+
+
+def adjust(db, before=(), after=()):
+    """Move the counters for tickets going from ``before`` to ``after``; the caller commits.
+
+    Both are iterables of ``(assigned_officer_id, status)``, one entry per
+    ticket. Call this before the ticket change is flushed, so counter rows
+    created here are counted from the tickets as they were.
+    """
+    deltas = defaultdict(Counter)
+    for sign, states in ((-1, before), (1, after)):
+        for officer_id, status in states:
+            if officer_id and status in TRACKED:
+                deltas[officer_id][status] += sign
+    deltas = {officer_id: d for officer_id, d in deltas.items() if any(d.values())}
+    if not deltas:
+        return
+    _ensure_rows(db, list(deltas))
+    table = models.OfficerWorkload.__table__
+    db.connection().execute(
+        update(table).where(table.c.officer_id == bindparam('w_officer')).values(
+            open_count=table.c.open_count + bindparam('w_open'),
+            in_progress_count=table.c.in_progress_count + bindparam('w_in_progress'),
+            active_count=table.c.active_count + bindparam('w_active'),
+        ),
+        [{'w_officer': officer_id, 'w_open': d['open'], 'w_in_progress': d['in_progress'],
+          'w_active': d['open'] + d['in_progress']} for officer_id, d in deltas.items()],
+    )
+
+
+def pick_officer(db):
+    """Id of the officer with the fewest open and in-progress tickets, or None when there are no officers."""
+    W, User = models.OfficerWorkload, models.User
+    new_officers = db.execute(
+        select(User.id).where(User.role == 'officer', ~exists().where(W.officer_id == User.id))
+    ).scalars().all()
+    if new_officers:
+        _ensure_rows(db, new_officers)
+    return db.execute(
+        select(W.officer_id).join(User, User.id == W.officer_id).where(User.role == 'officer')
+        .order_by(W.active_count, W.officer_id).limit(1)
+    ).scalar()
+
+
+def reconcile(db=None):
+    """Recount every officer's tickets and repair drifted counters; commits. Returns the rows changed."""
+    db = db or get_db()
+    W, User = models.OfficerWorkload, models.User
+    now = datetime.utcnow()
+    # holding the rows makes concurrent adjust() calls wait, so their deltas
+    # land on top of the recount instead of being overwritten (PostgreSQL)
+    stored = {row.officer_id: row for row in db.execute(select(W).with_for_update()).scalars()}
+    counts = _counts(db)
+    officers = set(db.execute(select(User.id).where(User.role == 'officer')).scalars())
+
+    stale = [officer_id for officer_id in stored if officer_id not in officers]
+    if stale:
+        db.execute(delete(W).where(any_of(W.officer_id, stale)).execution_options(synchronize_session=False))
+    rows = [_row(officer_id, counts[officer_id], now) for officer_id in officers]
+    new = [row for row in rows if row['officer_id'] not in stored]
+    drifted = [row for row in rows if row['officer_id'] in stored and (
+        stored[row['officer_id']].open_count, stored[row['officer_id']].in_progress_count
+    ) != (row['open_count'], row['in_progress_count'])]
+    if new:
+        db.execute(insert(W), new)
+    if drifted:
+        table = W.__table__
+        db.connection().execute(
+            update(table).where(table.c.officer_id == bindparam('w_officer')).values(
+                open_count=bindparam('w_open'), in_progress_count=bindparam('w_in_progress'),
+                active_count=bindparam('w_active'),
+            ),
+            [{'w_officer': row['officer_id'], 'w_open': row['open_count'], 'w_in_progress': row['in_progress_count'],
+              'w_active': row['active_count']} for row in drifted],
+        )
+    db.execute(update(W).values(reconciled_at=now).execution_options(synchronize_session=False))
+    db.commit()
+    return len(stale) + len(new) + len(drifted)
+
+
+def init_app(app):
+    """Register the ``reconcile-officer-workload`` CLI command."""
+
+    @app.cli.command('reconcile-officer-workload')
+    def reconcile_officer_workload_command():
+        """Recount open and in-progress tickets per officer and repair the counters."""
+        click.echo(f'officer workload rows repaired: {reconcile()}')
@@ -0,0 +1,109 @@
+/**
+ * Lazy entry lists for the bulk submission approvals queue.
+ *
+ * The queue page only renders submission summaries; each submission's
+ * entries are fetched from its JSON endpoint in pages when the officer
+ * asks for them, so a term-end queue of large submissions stays fast.
+ */
+(function() {
+  'use strict';
+
+  if (!window.fetch) return;
+
+  function cell(text) {
+    const td = document.createElement('td');
+    td.textContent = text == null ? '' : String(text);
+    return td;
+  }
+
+  function statusCell(status) {
+    const td = document.createElement('td');
+    const badge = document.createElement('span');
+    const variant = { APPROVED: 'success', REJECTED: 'error', PENDING: 'warning' }[status] || 'gray';
+    badge.className = 'badge badge--' + variant;
+    badge.textContent = status;
+    td.appendChild(badge);
+    return td;
+  }
+
+  function entryRow(submissionId, entry) {
+    const tr = document.createElement('tr');
+    const pick = document.createElement('td');
+    if (entry.status === 'PENDING') {
+      const box = document.createElement('input');
+      box.type = 'checkbox';
+      box.name = 'entry_ids[]';
+      box.value = entry.id;
+      box.className = 'entry-checkbox-' + submissionId;
+      box.setAttribute('data-submission-id', submissionId);
+      box.title = 'Select ' + (entry.name || entry.email);
+      pick.appendChild(box);
+    } else {
+      const done = document.createElement('span');
+      done.style.color = 'var(--color-gray-400)';
+      done.title = 'Already processed';
+      done.textContent = '✓';
+      pick.appendChild(done);
+    }
+    tr.appendChild(pick);
+    tr.appendChild(cell(entry.name));
+    tr.appendChild(cell(entry.email));
+    tr.appendChild(cell(entry.hours));
+    tr.appendChild(cell(entry.role));
+    const status = statusCell(entry.status);
+    if (entry.duplicate) {
+      const flag = document.createElement('span');
+      flag.className = 'badge badge--' + (entry.duplicate === 'approved' ? 'error' : 'warning');
+      flag.style.marginLeft = 'var(--space-1)';
+      flag.textContent = 'Possible duplicate';
+      flag.title = entry.duplicate === 'approved'
+        ? 'The same hours for this project and date range are already approved'
+        : 'Another pending submission claims the same hours for this project and date range';
+      status.appendChild(flag);
+    }
+    tr.appendChild(status);
+    return tr;
+  }
+
+  function loadPage(button) {
+    const submissionId = button.getAttribute('data-load-entries');
+    const body = document.querySelector('[data-entries-body="' + submissionId + '"]');
+    if (!body) return;
+    const placeholder = body.querySelector('[data-entries-placeholder]');
+    let url = body.getAttribute('data-entries-url');
+    const after = button.getAttribute('data-after');
+    if (after) url += '?after=' + encodeURIComponent(after);
+
+    button.disabled = true;
+    button.textContent = 'Loading…';
+    fetch(url, { credentials: 'same-origin', headers: { 'Accept': 'application/json' } })
+      .then(function(resp) {
+        if (!resp.ok) throw new Error('HTTP ' + resp.status);
+        return resp.json();
+      })
+      .then(function(data) {
+        (data.entries || []).forEach(function(entry) {
+          body.insertBefore(entryRow(submissionId, entry), placeholder);
+        });
+        if (data.next) {
+          button.setAttribute('data-after', data.next);
+          button.textContent = 'Show more entries';
+          button.disabled = false;
+        } else {
+          placeholder.remove();
+        }
+        if (typeof window.updateButtonStates === 'function') window.updateButtonStates(submissionId);
+      })
+      .catch(function() {
+        button.textContent = 'Could not load entries – retry';
+        button.disabled = false;
+      });
+  }
+
+  document.addEventListener('click', function(evt) {
+    const button = evt.target.closest && evt.target.closest('[data-load-entries]');
+    if (!button) return;
+    evt.preventDefault();
+    loadPage(button);
+  });
+})();
@@ -0,0 +1,42 @@
+/**
+ * Multi-select for the officer pending lists.
+ *
+ * Inside a form, a checkbox with data-select-all toggles every
+ * input[name="ids[]"], and buttons marked data-needs-selection stay
+ * disabled until at least one row is ticked.
+ */
+(function() {
+  'use strict';
+
+  function refresh(form) {
+    const boxes = form.querySelectorAll('input[name="ids[]"]');
+    const checked = form.querySelectorAll('input[name="ids[]"]:checked').length;
+    form.querySelectorAll('[data-needs-selection]').forEach(function(btn) {
+      btn.disabled = checked === 0;
+    });
+    const all = form.querySelector('[data-select-all]');
+    if (all) {
+      all.checked = boxes.length > 0 && checked === boxes.length;
+      all.indeterminate = checked > 0 && checked < boxes.length;
+    }
+    const count = form.querySelector('[data-selection-count]');
+    if (count) count.textContent = checked ? checked + ' selected' : '';
+  }
+
+  document.addEventListener('change', function(evt) {
+    const target = evt.target;
+    if (!target || !target.form) return;
+    if (target.hasAttribute('data-select-all')) {
+      target.form.querySelectorAll('input[name="ids[]"]').forEach(function(box) {
+        box.checked = target.checked;
+      });
+      refresh(target.form);
+    } else if (target.name === 'ids[]') {
+      refresh(target.form);
+    }
+  });
+
+  document.querySelectorAll('form').forEach(function(form) {
+    if (form.querySelector('[data-select-all]')) refresh(form);
+  });
+})();
@@ -0,0 +1,236 @@
+/**
+ * Chunked, resumable spreadsheet uploads.
+ *
+ * A file input marked with data-chunked-upload="<purpose>" is sent to
+ * /uploads in 1 MB parts as soon as a file is chosen. Each part carries its
+ * SHA-256 and the whole file's digest is checked on completion. An
+ * interrupted upload resumes from the server's received_bytes, even after a
+ * reload, because the upload id is remembered in localStorage. The server
+ * parses the file in the background; this module polls for progress and,
+ * once parsing is done, submits only the upload id with the form. If
+ * anything goes wrong it falls back to the plain multipart upload.
+ */
+(function() {
+  'use strict';
+
+  const STORE_KEY = 'vms-chunked-uploads';
+  const MAX_RETRIES = 5;
+  const POLL_MS = 1000;
+  const MAX_HASH_BYTES = 64 * 1024 * 1024;
+
+  if (!window.fetch || !window.Blob || !Blob.prototype.slice) return;
+
+  const subtle = window.crypto && window.crypto.subtle;
+
+  function sleep(ms) {
+    return new Promise(function(resolve) { setTimeout(resolve, ms); });
+  }
+
+  function hex(buffer) {
+    return Array.from(new Uint8Array(buffer)).map(function(b) {
+      return b.toString(16).padStart(2, '0');
+    }).join('');
+  }
+
+  function sha256(blob) {
+    if (!subtle) return Promise.resolve(null);
+    return blob.arrayBuffer().then(function(buf) { return subtle.digest('SHA-256', buf); }).then(hex);
+  }
+
+  function remembered() {
+    try {
+      return JSON.parse(localStorage.getItem(STORE_KEY)) || {};
+    } catch (e) {
+      return {};
+    }
+  }
+
+  function remember(key, uploadId) {
+    try {
+      const all = remembered();
+      if (uploadId) all[key] = uploadId; else delete all[key];
+      localStorage.setItem(STORE_KEY, JSON.stringify(all));
+    } catch (e) {
+      // private mode: uploads still work, they just cannot resume after a reload
+    }
+  }
+
+  function request(method, url, body, headers) {
+    return fetch(url, {
+      method: method,
+      credentials: 'same-origin',
+      headers: Object.assign({ 'Accept': 'application/json' }, headers || {}),
+      body: body
+    }).then(function(resp) {
+      return resp.json().catch(function() { return {}; }).then(function(data) {
+        return { ok: resp.ok, status: resp.status, data: data };
+      });
+    });
+  }
+
+  function ChunkedUpload(input) {
+    this.input = input;
+    this.form = input.form;
+    this.purpose = input.getAttribute('data-chunked-upload');
+    this.baseUrl = input.getAttribute('data-upload-url') || '/uploads/';
+    this.fieldName = input.name;
+    this.busy = false;
+
+    this.hidden = this.form.querySelector('input[name="upload_id"]');
+    if (!this.hidden) {
+      this.hidden = document.createElement('input');
+      this.hidden.type = 'hidden';
+      this.hidden.name = 'upload_id';
+      this.form.appendChild(this.hidden);
+    }
+    this.status = document.createElement('div');
+    this.status.className = 'form-help';
+    this.status.setAttribute('aria-live', 'polite');
+    input.insertAdjacentElement('afterend', this.status);
+
+    input.addEventListener('change', this.start.bind(this));
+    this.form.addEventListener('submit', this.guard.bind(this));
+  }
+
+  ChunkedUpload.prototype.say = function(text) {
+    this.status.textContent = text;
+  };
+
+  ChunkedUpload.prototype.guard = function(evt) {
+    if (this.busy) {
+      evt.preventDefault();
+      this.say('Please wait until the file has finished uploading and processing.');
+    }
+  };
+
+  ChunkedUpload.prototype.reset = function() {
+    this.hidden.value = '';
+    this.input.name = this.fieldName;
+  };
+
+  ChunkedUpload.prototype.fallback = function(message) {
+    // let the form post the file the old way
+    this.busy = false;
+    this.reset();
+    this.say((message ? message + ' ' : '') + 'The file will be sent with the form instead.');
+  };
+
+  ChunkedUpload.prototype.start = function() {
+    const file = this.input.files && this.input.files[0];
+    this.reset();
+    if (!file) {
+      this.say('');
+      return;
+    }
+    const self = this;
+    const key = [this.purpose, file.name, file.size, file.lastModified].join('|');
+    this.busy = true;
+    this.run(file, key).then(function(state) {
+      self.busy = false;
+      remember(key, null);
+      if (state.status === 'PARSED') {
+        self.hidden.value = state.upload_id;
+        // the server already has the file; submit only its id
+        self.input.removeAttribute('name');
+        self.say('File uploaded and checked (' + state.rows_processed + ' rows). You can submit the form.');
+      } else {
+        self.say(state.error || 'The file could not be processed.');
+      }
+    }).catch(function(err) {
+      self.fallback(err && err.message ? err.message : '');
+    });
+  };
+
+  ChunkedUpload.prototype.open = function(file, key) {
+    const self = this;
+    const existing = remembered()[key];
+    const resume = existing
+      ? request('GET', this.baseUrl + encodeURIComponent(existing)).then(function(r) {
+          return r.ok && ['UPLOADING', 'PARSING', 'PARSED'].indexOf(r.data.status) !== -1 ? r.data : null;
+        })
+      : Promise.resolve(null);
+    return resume.then(function(state) {
+      if (state) return state;
+      self.say('Preparing upload…');
+      const digest = file.size <= MAX_HASH_BYTES ? sha256(file) : Promise.resolve(null);
+      return digest.then(function(sum) {
+        return request('POST', self.baseUrl, JSON.stringify({
+          purpose: self.purpose, filename: file.name, size: file.size, sha256: sum
+        }), { 'Content-Type': 'application/json' });
+      }).then(function(r) {
+        if (!r.ok) throw new Error(r.data.error || 'Could not start the upload.');
+        remember(key, r.data.upload_id);
+        return r.data;
+      });
+    });
+  };
+
+  ChunkedUpload.prototype.sendParts = function(file, state) {
+    const self = this;
+    const url = this.baseUrl + encodeURIComponent(state.upload_id);
+    let offset = state.received_bytes;
+    let failures = 0;
+
+    function next() {
+      if (offset >= file.size) return Promise.resolve(state);
+      const part = file.slice(offset, Math.min(offset + state.chunk_size, file.size));
+      self.say('Uploading… ' + Math.floor(offset * 100 / file.size) + '%');
+      return sha256(part).then(function(sum) {
+        const headers = { 'Content-Type': 'application/octet-stream' };
+        if (sum) headers['X-Part-SHA256'] = sum;
+        return request('PUT', url + '/parts?offset=' + offset, part, headers);
+      }).then(function(r) {
+        if (r.ok || r.status === 409) {
+          // 409 means the server is at a different offset; continue from there
+          if (r.status === 409 && r.data.status !== 'UPLOADING') return Promise.resolve(state);
+          offset = r.data.received_bytes;
+          failures = 0;
+          return next();
+        }
+        throw new Error(r.data.error || 'Upload failed.');
+      }, function(err) {
+        // network error: back off and retry the same part
+        failures += 1;
+        if (failures > MAX_RETRIES) throw err;
+        self.say('Connection lost, retrying…');
+        return sleep(1000 * Math.pow(2, failures - 1)).then(function() {
+          return request('GET', url).then(function(r) {
+            if (r.ok) offset = r.data.received_bytes;
+          }, function() {}).then(next);
+        });
+      });
+    }
+    return next();
+  };
+
+  ChunkedUpload.prototype.poll = function(uploadId) {
+    const self = this;
+    const url = this.baseUrl + encodeURIComponent(uploadId);
+    return request('GET', url).then(function(r) {
+      if (!r.ok) throw new Error(r.data.error || 'Lost track of the upload.');
+      if (r.data.status === 'PARSED' || r.data.status === 'FAILED') return r.data;
+      self.say('Processing… ' + r.data.rows_processed + ' rows checked');
+      return sleep(POLL_MS).then(function() { return self.poll(uploadId); });
+    });
+  };
+
+  ChunkedUpload.prototype.run = function(file, key) {
+    const self = this;
+    return this.open(file, key).then(function(state) {
+      if (state.status !== 'UPLOADING') return state;
+      return self.sendParts(file, state).then(function() {
+        self.say('Verifying…');
+        return request('POST', self.baseUrl + encodeURIComponent(state.upload_id) + '/complete');
+      }).then(function(r) {
+        if (!r.ok) throw new Error(r.data.error || 'Upload could not be verified.');
+        return r.data;
+      });
+    }).then(function(state) {
+      return state.status === 'PARSED' || state.status === 'FAILED' ? state : self.poll(state.upload_id);
+    });
+  };
+
+  document.querySelectorAll('input[type="file"][data-chunked-upload]').forEach(function(input) {
+    if (input.form) new ChunkedUpload(input);
+  });
+})();
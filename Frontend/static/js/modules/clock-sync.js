@@ -0,0 +1,129 @@
+/**
+ * Offline-first clock in/out for the volunteer logging page.
+ *
+ * Start/Stop presses are stored in localStorage with the device time and
+ * flushed to /log/sync in batches. The server applies them idempotently, so
+ * a record that is re-sent after a dropped response is reported as a
+ * duplicate rather than logged twice. Without JavaScript the plain form
+ * posts still work.
+ */
+(function() {
+  'use strict';
+
+  const QUEUE_KEY = 'vms-clock-queue';
+  const MAX_BATCH = 500;
+  const RETRY_MS = 30000;
+
+  const root = document.getElementById('clock');
+  if (!root || !window.fetch || !window.localStorage) return;
+
+  const token = root.dataset.token;
+  const syncUrl = root.dataset.syncUrl;
+  const openPanel = root.querySelector('[data-clock-open]');
+  const closedPanel = root.querySelector('[data-clock-closed]');
+  const startLabel = root.querySelector('[data-clock-start]');
+  const syncStatus = root.querySelector('[data-clock-sync]');
+  let inFlight = false;
+
+  function loadQueue() {
+    try {
+      return JSON.parse(localStorage.getItem(QUEUE_KEY)) || [];
+    } catch (e) {
+      return [];
+    }
+  }
+
+  function saveQueue(queue) {
+    localStorage.setItem(QUEUE_KEY, JSON.stringify(queue));
+  }
+
+  function newId() {
+    if (window.crypto && crypto.randomUUID) return crypto.randomUUID();
+    return Date.now().toString(36) + Math.random().toString(36).slice(2);
+  }
+
+  function showState(open, since) {
+    openPanel.hidden = !open;
+    closedPanel.hidden = open;
+    if (open && since && startLabel) {
+      startLabel.textContent = new Date(since).toLocaleString();
+    }
+  }
+
+  function renderSyncStatus(message) {
+    const pending = loadQueue().filter(r => r.token === token).length;
+    if (message) {
+      syncStatus.textContent = message;
+    } else if (pending) {
+      syncStatus.textContent = pending + ' clock event(s) saved on this device, waiting to sync…';
+    } else {
+      syncStatus.textContent = '';
+    }
+  }
+
+  // Queued records for this link win over the server-rendered state.
+  function restoreState() {
+    const mine = loadQueue().filter(r => r.token === token);
+    if (mine.length) {
+      const last = mine[mine.length - 1];
+      showState(last.action === 'start', last.client_ts);
+    }
+    renderSyncStatus();
+  }
+
+  async function flush() {
+    if (inFlight) return;
+    const queue = loadQueue();
+    if (!queue.length) return;
+    inFlight = true;
+    const batch = queue.slice(0, MAX_BATCH);
+    let progressed = false;
+    try {
+      const resp = await fetch(syncUrl, {
+        method: 'POST',
+        headers: {'Content-Type': 'application/json'},
+        body: JSON.stringify({records: batch})
+      });
+      if (!resp.ok) throw new Error('HTTP ' + resp.status);
+      const data = await resp.json();
+      const done = new Set();
+      const errors = [];
+      (data.results || []).forEach(r => {
+        if (!r) return;
+        done.add(r.id);
+        if (r.status === 'rejected' && r.error) errors.push(r.error);
+      });
+      saveQueue(loadQueue().filter(r => !done.has(r.id)));
+      progressed = done.size > 0;
+      renderSyncStatus(errors.length ? errors[errors.length - 1] : 'All clock events synced.');
+    } catch (e) {
+      renderSyncStatus();
+    } finally {
+      inFlight = false;
+    }
+    // more than one batch queued: keep going while the server accepts them;
+    // after a failure the RETRY_MS interval tries again
+    if (progressed && loadQueue().length) flush();
+  }
+
+  root.querySelectorAll('[data-clock-form]').forEach(form => {
+    form.addEventListener('submit', function(e) {
+      e.preventDefault();
+      const action = (e.submitter || form.querySelector('button')).value;
+      const record = {id: newId(), token: token, action: action, client_ts: new Date().toISOString()};
+      const queue = loadQueue();
+      queue.push(record);
+      saveQueue(queue);
+      const message = document.querySelector('[data-clock-message]');
+      if (message) message.remove();
+      showState(action === 'start', record.client_ts);
+      renderSyncStatus();
+      flush();
+    });
+  });
+
+  window.addEventListener('online', flush);
+  setInterval(flush, RETRY_MS);
+  restoreState();
+  flush();
+})();
@@ -0,0 +1,82 @@
+/**
+ * On-demand entry detail for the club leader's "My Submissions" page.
+ *
+ * The page only renders per-submission totals; the entries of a submission
+ * are fetched from its JSON endpoint, a page at a time, when the leader
+ * opens them.
+ */
+(function() {
+  'use strict';
+
+  if (!window.fetch) return;
+
+  function cell(text, align) {
+    const td = document.createElement('td');
+    td.style.padding = 'var(--space-1)';
+    if (align) td.style.textAlign = align;
+    td.textContent = text == null ? '' : String(text);
+    return td;
+  }
+
+  function statusCell(status) {
+    const td = cell('', 'center');
+    const badge = document.createElement('span');
+    const variant = { APPROVED: 'success', REJECTED: 'error', PENDING: 'warning' }[status] || 'gray';
+    badge.className = 'badge badge--' + variant;
+    badge.textContent = status;
+    td.appendChild(badge);
+    return td;
+  }
+
+  function entryRow(entry) {
+    const tr = document.createElement('tr');
+    tr.style.borderBottom = '1px solid var(--color-gray-200)';
+    tr.appendChild(cell(entry.name));
+    tr.appendChild(cell(entry.email));
+    tr.appendChild(cell(Number(entry.hours || 0).toFixed(1), 'right'));
+    tr.appendChild(statusCell(entry.status));
+    tr.appendChild(cell(entry.status === 'REJECTED' ? (entry.rejection_reason || 'No reason provided') : ''));
+    return tr;
+  }
+
+  function loadPage(button) {
+    const submissionId = button.getAttribute('data-load-entries');
+    const body = document.querySelector('[data-entries-body="' + submissionId + '"]');
+    if (!body) return;
+    const placeholder = body.querySelector('[data-entries-placeholder]');
+    let url = body.getAttribute('data-entries-url');
+    const after = button.getAttribute('data-after');
+    if (after) url += '?after=' + encodeURIComponent(after);
+
+    button.disabled = true;
+    button.textContent = 'Loading…';
+    fetch(url, { credentials: 'same-origin', headers: { 'Accept': 'application/json' } })
+      .then(function(resp) {
+        if (!resp.ok) throw new Error('HTTP ' + resp.status);
+        return resp.json();
+      })
+      .then(function(data) {
+        (data.entries || []).forEach(function(entry) {
+          body.insertBefore(entryRow(entry), placeholder);
+        });
+        if (data.next) {
+          button.setAttribute('data-after', data.next);
+          button.textContent = 'Show more entries';
+          button.disabled = false;
+        } else {
+          placeholder.remove();
+        }
+      })
+      .catch(function() {
+        button.textContent = 'Could not load entries – retry';
+        button.disabled = false;
+      });
+  }
+
+  document.addEventListener('click', function(evt) {
+    const button = evt.target.closest && evt.target.closest('[data-load-entries]');
+    if (!button) return;
+    evt.preventDefault();
+    loadPage(button);
+  });
+})();
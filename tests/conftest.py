@@ -0,0 +1,29 @@
+import pytest
+
+from Backend import create_app
+
+
+@pytest.fixture
+def sqlite_app(tmp_path, monkeypatch):
+    """App on a throwaway SQLite database, seeded with the sample users.
+
+    For code with a SQLite fallback; PostgreSQL-only behaviour is covered by
+    the ``DATABASE_URL`` fixtures in test_volunteer_flow.py.
+    """
+    monkeypatch.setenv('DATABASE_URL', f"sqlite:///{tmp_path / 'vms.db'}")
+    monkeypatch.setenv('VMS_ATTACHMENT_STORAGE_DIR', str(tmp_path / 'blobs'))
+    # previews are rendered in a process pool; tests call render_preview directly
+    monkeypatch.setenv('VMS_THUMBNAIL_WORKERS', '0')
+    app = create_app()
+    app.config.update({'TESTING': True, 'WTF_CSRF_ENABLED': False})
+    return app
+
+
+@pytest.fixture
+def login(sqlite_app):
+    """``login(email, password)`` returns a test client signed in as that user."""
+    def login(email, password):
+        client = sqlite_app.test_client()
+        client.post('/login', data={'email': email, 'password': password})
+        return client
+    return login
@@ -0,0 +1,36 @@
+from Backend import models
+from Backend.db import get_db
+
+
+def _approvals(client, action, entry_ids, **form):
+    client.post('/officer/approvals', data={'action': action, 'bulk_submission_id': 'b_1', 'entry_ids[]': entry_ids, **form})
+    with client.session_transaction() as session:
+        return [message for _, message in session.pop('_flashes', [])]
+
+
+def _timelogs():
+    return {t.id: (t.status, t.calculated_hours) for t in get_db().query(models.TimeLog).filter_by(event_id='BULK_b_1')}
+
+
+def test_approve_reject_and_approve_again(sqlite_app, login):
+    with sqlite_app.app_context():
+        db = get_db()
+        db.add(models.BulkSubmission(id='b_1', project_name='Food Drive', date_range='2025-03-01 - 2025-03-02'))
+        for entry_id, email in (('be_1', 'a@auib.edu.iq'), ('be_2', 'b@auib.edu.iq')):
+            db.add(models.BulkSubmissionEntry(id=entry_id, bulk_submission_id='b_1', name='Member', email=email,
+                                              hours=2, role='helper'))
+        db.commit()
+    officer = login('officer@auib.edu', 'officer123')
+    with officer.session_transaction() as session:
+        session.pop('_flashes', None)
+
+    assert _approvals(officer, 'approve_selected', ['be_1', 'be_2']) == ['Approved 2 entries']
+    assert _approvals(officer, 'reject_selected', ['be_1'], rejection_reason_selected='Not there') == [
+        'Rejected 1 entries with reason: Not there']
+    with sqlite_app.app_context():
+        # the rejected entry's hours no longer count
+        assert _timelogs() == {'tl_be_2': ('APPROVED', 2)}
+    assert _approvals(officer, 'approve_selected', ['be_1', 'be_2']) == ['Approved 1 entries']
+    with sqlite_app.app_context():
+        assert _timelogs() == {'tl_be_1': ('APPROVED', 2), 'tl_be_2': ('APPROVED', 2)}
+        assert get_db().get(models.BulkSubmission, 'b_1').status == 'APPROVED'
@@ -0,0 +1,114 @@
+import io
+import os
+from datetime import datetime
+
+import pytest
+from werkzeug.security import generate_password_hash
+
+from Backend import models, notifications, storage
+from Backend.db import get_db
+
+LONG_AGO = datetime(2024, 1, 1)
+
+
+@pytest.fixture
+def officer(sqlite_app, login, monkeypatch):
+    """An officer's client, with tickets tk_1..tk_4 and no notification emails."""
+    monkeypatch.setattr(notifications, 'send_email', lambda **kwargs: True)
+    monkeypatch.setattr(notifications, 'schedule_flush', lambda delay: None)
+    with sqlite_app.app_context():
+        db = get_db()
+        db.add(models.User(id='u_off2', email='officer2@auib.edu', name='Officer Two', role='officer',
+                           password_hash=generate_password_hash('x')))
+        student = db.query(models.User).filter_by(email='student@auib.edu').one()
+        for tid, status in (('tk_1', 'open'), ('tk_2', 'open'), ('tk_3', 'in_progress'), ('tk_4', 'resolved')):
+            db.add(models.Ticket(id=tid, submitter_id=student.id, title=f'Ticket {tid}', description='Broken printer',
+                                 category='problem', priority='normal', status=status, updated_at=LONG_AGO))
+        db.commit()
+    client = login('officer@auib.edu', 'officer123')
+    with client.session_transaction() as session:
+        session.pop('_flashes', None)
+    return client
+
+
+def _bulk(client, action, ticket_ids, **form):
+    client.post('/tickets/bulk_update', data={'ticket_ids': ticket_ids, 'bulk_action': action, **form})
+    with client.session_transaction() as session:
+        return session.pop('_flashes', [])
+
+
+def _tickets():
+    return {t.id: t for t in get_db().query(models.Ticket)}
+
+
+def test_status_change_counts_rows_and_touches_updated_at(sqlite_app, officer):
+    # an unknown id is not counted
+    assert _bulk(officer, 'status_resolved', ['tk_1', 'tk_3', 'tk_missing']) == [
+        ('success', 'Marked 2 ticket(s) as resolved.')]
+    with sqlite_app.app_context():
+        tickets = _tickets()
+        assert [tickets[t].status for t in ('tk_1', 'tk_2', 'tk_3')] == ['resolved', 'open', 'resolved']
+        assert tickets['tk_1'].updated_at > LONG_AGO
+        assert tickets['tk_2'].updated_at == LONG_AGO
+    assert _bulk(officer, 'status_in_progress', ['tk_2']) == [('success', 'Marked 1 ticket(s) as in progress.')]
+    assert _bulk(officer, 'status_closed', ['tk_2']) == [('error', 'Invalid status.')]
+    assert _bulk(officer, 'status_open', ['tk_missing']) == [('error', 'No valid tickets found.')]
+
+
+def test_assignment_branches(sqlite_app, officer):
+    with sqlite_app.app_context():
+        me = get_db().query(models.User).filter_by(email='officer@auib.edu').one().id
+    assert _bulk(officer, 'assign_me', ['tk_1', 'tk_2']) == [('success', 'Assigned 2 ticket(s) to yourself.')]
+    assert _bulk(officer, 'assign_officer', ['tk_2', 'tk_3', 'tk_4'], assign_to='u_off2') == [
+        ('success', 'Assigned 3 ticket(s) to officer.')]
+    assert _bulk(officer, 'assign_officer', ['tk_1'], assign_to='u_nobody') == [('error', 'Invalid officer selected.')]
+    with sqlite_app.app_context():
+        tickets = _tickets()
+        assert {tid: t.assigned_officer_id for tid, t in tickets.items()} == {
+            'tk_1': me, 'tk_2': 'u_off2', 'tk_3': 'u_off2', 'tk_4': 'u_off2'}
+        assert all(t.updated_at > LONG_AGO for t in tickets.values())
+    assert _bulk(officer, 'unassign', ['tk_1', 'tk_2']) == [('success', 'Unassigned 2 ticket(s).')]
+    with sqlite_app.app_context():
+        tickets = _tickets()
+        assert tickets['tk_1'].assigned_officer_id is None and tickets['tk_2'].assigned_officer_id is None
+        assert tickets['tk_3'].assigned_officer_id == 'u_off2'
+
+
+def test_delete_releases_blobs_and_keeps_shared_ones(sqlite_app, officer, monkeypatch):
+    released, queued = [], []
+    release = storage.release
+    monkeypatch.setattr(storage, 'release', lambda db, digests: released.append(list(digests)) or release(db, digests))
+    monkeypatch.setattr(storage, 'cleanup_later', lambda digests, legacy_files=(): queued.append((digests, legacy_files)))
+
+    with sqlite_app.app_context():
+        db = get_db()
+        student = db.query(models.User).filter_by(email='student@auib.edu').one()
+        attachments = [('tk_1', b'shared screenshot'), ('tk_3', b'shared screenshot'), ('tk_1', b'only on tk_1')]
+        digests = []
+        for n, (tid, data) in enumerate(attachments):
+            sha256, size = storage.save_blob(db, io.BytesIO(data), 'image/png')
+            digests.append(sha256)
+            db.add(models.TicketAttachment(id=f'att_{n}', ticket_id=tid, uploader_id=student.id, filename=sha256,
+                                           original_filename=f'{n}.png', file_size=size, mime_type='image/png',
+                                           file_path=sha256, sha256=sha256))
+        db.add(models.TicketAttachment(id='att_legacy', ticket_id='tk_2', uploader_id=student.id, filename='old.png',
+                                       original_filename='old.png', file_size=1, mime_type='image/png',
+                                       file_path='tickets/old.png'))
+        db.commit()
+    shared, unique = digests[0], digests[2]
+
+    assert _bulk(officer, 'delete', ['tk_1', 'tk_2']) == [('success', 'Deleted 2 ticket(s).')]
+    # one release for the whole selection; the legacy attachment has no blob
+    assert len(released) == 1
+    assert sorted(d for d in released[0] if d) == sorted([shared, unique])
+    assert queued == [([unique], ['tickets/old.png'])]
+
+    with sqlite_app.app_context():
+        db = get_db()
+        assert set(_tickets()) == {'tk_3', 'tk_4'}
+        assert [a.id for a in db.query(models.TicketAttachment)] == ['att_1']
+        assert db.get(models.AttachmentBlob, shared).ref_count == 1
+        assert storage.purge(db, queued[0][0]) == 1
+        assert db.get(models.AttachmentBlob, unique) is None
+        assert os.path.exists(storage.blob_path(shared))
+        assert not os.path.exists(storage.blob_path(unique))
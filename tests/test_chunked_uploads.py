@@ -0,0 +1,74 @@
+import hashlib
+import os
+import time
+
+import pytest
+
+from Backend import chunked_uploads
+
+ROSTER = b'Email,Name\nv1@auib.edu.iq,Volunteer One\nv2@auib.edu.iq,Volunteer Two\n'
+
+
+@pytest.fixture
+def officer(sqlite_app, login, tmp_path):
+    sqlite_app.config['UPLOAD_STAGING_DIR'] = str(tmp_path / 'staging')
+    return login('officer@auib.edu', 'officer123')
+
+
+def _open(client, data=ROSTER, **extra):
+    body = {'purpose': 'roster', 'filename': 'roster.csv', 'size': len(data), 'sha256': hashlib.sha256(data).hexdigest()}
+    resp = client.post('/uploads/', json=dict(body, **extra))
+    assert resp.status_code == 201
+    return resp.get_json()['upload_id']
+
+
+def test_parts_append_at_offset(officer):
+    upload_id = _open(officer)
+    resp = officer.put(f'/uploads/{upload_id}/parts?offset=0', data=ROSTER[:20])
+    assert resp.get_json()['received_bytes'] == 20
+    # a retried first part is out of sync and is told where to resume
+    resp = officer.put(f'/uploads/{upload_id}/parts?offset=0', data=ROSTER[:20])
+    assert resp.status_code == 409
+    assert resp.get_json()['received_bytes'] == 20
+    resp = officer.put(f'/uploads/{upload_id}/parts?offset=20', data=ROSTER[20:])
+    assert resp.get_json()['received_bytes'] == len(ROSTER)
+    with open(os.path.join(officer.application.config['UPLOAD_STAGING_DIR'], f'{upload_id}.part'), 'rb') as f:
+        assert f.read() == ROSTER
+
+
+def test_other_users_cannot_touch_an_upload(officer, login):
+    upload_id = _open(officer)
+    other = login('admin@auib.edu', 'admin123')
+    assert other.get(f'/uploads/{upload_id}').status_code == 404
+    assert other.put(f'/uploads/{upload_id}/parts?offset=0', data=ROSTER).status_code == 404
+    assert other.post(f'/uploads/{upload_id}/complete').status_code == 404
+    # and a volunteer cannot start a roster upload at all
+    student = login('student@auib.edu', 'student123')
+    assert student.post('/uploads/', json={'purpose': 'roster', 'filename': 'r.csv', 'size': 10}).status_code == 403
+
+
+def test_complete_parses_the_file(officer, sqlite_app):
+    upload_id = _open(officer)
+    officer.put(f'/uploads/{upload_id}/parts?offset=0', data=ROSTER)
+    assert officer.post(f'/uploads/{upload_id}/complete').status_code == 202
+    for _ in range(100):
+        status = officer.get(f'/uploads/{upload_id}').get_json()['status']
+        if status != 'PARSING':
+            break
+        time.sleep(0.05)
+    assert status == 'PARSED'
+    with sqlite_app.test_request_context():
+        from flask_login import login_user
+        from Backend import models
+        from Backend.db import get_db
+        login_user(get_db().query(models.User).filter_by(email='officer@auib.edu').one())
+        result = chunked_uploads.load_upload_result(upload_id, 'roster')
+    assert [v['email'] for v in result['volunteers']] == ['v1@auib.edu.iq', 'v2@auib.edu.iq']
+
+
+def test_complete_rejects_checksum_mismatch(officer):
+    upload_id = _open(officer, sha256=hashlib.sha256(b'something else').hexdigest())
+    officer.put(f'/uploads/{upload_id}/parts?offset=0', data=ROSTER)
+    resp = officer.post(f'/uploads/{upload_id}/complete')
+    assert resp.status_code == 422
+    assert resp.get_json()['status'] == 'FAILED'
@@ -0,0 +1,74 @@
+from datetime import datetime, timedelta
+
+import jwt
+
+from Backend import models
+from Backend.db import get_db
+
+
+def _token(app, issued, hours=24):
+    payload = {'event_id': 'e_1', 'volunteer_email': 'v@auib.edu.iq', 'iat': issued, 'exp': issued + timedelta(hours=hours)}
+    return jwt.encode(payload, app.config['JWT_SECRET'], algorithm=app.config['JWT_ALGORITHM'])
+
+
+def _sync(client, *records):
+    resp = client.post('/log/sync', json={'records': list(records)})
+    assert resp.status_code == 200
+    return resp.get_json()['results']
+
+
+def _setup(app):
+    with app.app_context():
+        db = get_db()
+        db.add(models.Event(id='e_1', name='Beach cleanup'))
+        db.commit()
+
+
+def test_start_stop_pair_gives_hours(sqlite_app):
+    _setup(sqlite_app)
+    now = datetime.utcnow()
+    token = _token(sqlite_app, now - timedelta(hours=3))
+    client = sqlite_app.test_client()
+    results = _sync(
+        client,
+        {'id': 'r2', 'token': token, 'action': 'stop', 'client_ts': (now - timedelta(minutes=30)).isoformat() + 'Z'},
+        {'id': 'r1', 'token': token, 'action': 'start', 'client_ts': (now - timedelta(minutes=120)).isoformat() + 'Z'},
+    )
+    assert [r['status'] for r in results] == ['applied', 'applied']
+    assert results[0]['hours'] == 1.5
+    with sqlite_app.app_context():
+        tl = get_db().query(models.TimeLog).one()
+        assert tl.calculated_hours == 1.5
+        # stamped long before it reached the server: flagged for review
+        assert tl.marker == 'CLIENT_TIME'
+
+
+def test_replayed_record_is_duplicate(sqlite_app):
+    _setup(sqlite_app)
+    now = datetime.utcnow()
+    token = _token(sqlite_app, now - timedelta(hours=1))
+    start = {'id': 'r1', 'token': token, 'action': 'start', 'client_ts': now.isoformat()}
+    client = sqlite_app.test_client()
+    assert _sync(client, start)[0]['status'] == 'applied'
+    assert _sync(client, start)[0]['status'] == 'duplicate'
+    with sqlite_app.app_context():
+        tl = get_db().query(models.TimeLog).one()
+        assert tl.marker is None
+
+
+def test_out_of_window_client_ts_is_rejected(sqlite_app):
+    _setup(sqlite_app)
+    now = datetime.utcnow()
+    token = _token(sqlite_app, now - timedelta(hours=1))
+    client = sqlite_app.test_client()
+    results = _sync(
+        client,
+        # before the link was issued
+        {'id': 'early', 'token': token, 'action': 'start', 'client_ts': (now - timedelta(hours=5)).isoformat()},
+        # a stop dated into the future to inflate the hours
+        {'id': 'future', 'token': token, 'action': 'stop', 'client_ts': (now + timedelta(hours=2)).isoformat()},
+    )
+    assert [r['status'] for r in results] == ['rejected', 'rejected']
+    assert results[1]['error'] == 'client_ts is in the future'
+    with sqlite_app.app_context():
+        assert get_db().query(models.TimeLog).count() == 0
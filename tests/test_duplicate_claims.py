@@ -0,0 +1,51 @@
+from Backend import models
+from Backend.db import get_db
+from Backend.officer import _duplicate_kind
+
+
+def _submit(db, b_id, *entries):
+    db.add(models.BulkSubmission(id=b_id, project_name='Food Drive', date_range='2025-03-01 - 2025-03-02'))
+    for entry_id, email, hours in entries:
+        db.add(models.BulkSubmissionEntry(
+            id=entry_id, bulk_submission_id=b_id, name='Member', email=email, hours=hours, role='helper',
+            fingerprint=models.entry_fingerprint(email, 'Food Drive', '2025-03-01 - 2025-03-02', hours),
+        ))
+    db.flush()
+
+
+def test_fingerprint_ignores_case_spacing_and_hour_format():
+    assert models.entry_fingerprint('A@auib.edu.iq', 'Food  Drive', 'March', 2) == \
+        models.entry_fingerprint(' a@auib.edu.iq', 'food drive', 'march ', '2.00')
+    assert models.entry_fingerprint('a@auib.edu.iq', 'Food Drive', 'March', 2) != \
+        models.entry_fingerprint('a@auib.edu.iq', 'Food Drive', 'March', 2.5)
+
+
+def test_matching_entries_are_flagged(sqlite_app):
+    with sqlite_app.app_context():
+        db = get_db()
+        _submit(db, 'b_1', ('be_1', 'a@auib.edu.iq', 2), ('be_2', 'b@auib.edu.iq', 3))
+        assert models.flag_duplicate_entries(db, 'b_1') == 0
+        # a@ claims the same hours again in a second submission; c@ is new
+        _submit(db, 'b_2', ('be_3', 'A@auib.edu.iq', 2.0), ('be_4', 'c@auib.edu.iq', 1))
+        assert models.flag_duplicate_entries(db, 'b_2') == 1
+        db.commit()
+        flagged = dict(db.query(models.BulkSubmissionEntry.id, models.BulkSubmissionEntry.duplicate_of)
+                       .filter_by(bulk_submission_id='b_2'))
+    assert flagged == {'be_3': 'be_1', 'be_4': None}
+    assert _duplicate_kind(flagged['be_3']) == 'pending'
+    assert _duplicate_kind(flagged['be_4']) is None
+
+
+def test_approved_timelog_match_wins(sqlite_app):
+    with sqlite_app.app_context():
+        db = get_db()
+        _submit(db, 'b_1', ('be_1', 'a@auib.edu.iq', 2))
+        fingerprint = models.entry_fingerprint('a@auib.edu.iq', 'Food Drive', '2025-03-01 - 2025-03-02', 2)
+        db.add(models.TimeLog(id='tl_1', student_email='a@auib.edu.iq', calculated_hours=2, status='APPROVED',
+                              fingerprint=fingerprint))
+        _submit(db, 'b_2', ('be_2', 'a@auib.edu.iq', 2))
+        assert models.flag_duplicate_entries(db, 'b_2') == 1
+        db.commit()
+        duplicate_of = db.query(models.BulkSubmissionEntry.duplicate_of).filter_by(id='be_2').scalar()
+    assert duplicate_of == 'tl_1'
+    assert _duplicate_kind(duplicate_of) == 'approved'
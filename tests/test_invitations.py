@@ -0,0 +1,109 @@
+import jwt
+from flask import Flask
+
+from Backend.log import make_logging_jwts, decode_logging_jwt
+
+
+def make_app():
+    app = Flask(__name__)
+    app.config.update({'JWT_SECRET': 'test-secret', 'JWT_ALGORITHM': 'HS256'})
+    return app
+
+
+def test_bulk_tokens_decode_to_each_volunteer():
+    app = make_app()
+    emails = [f'v{i}@auib.edu.iq' for i in range(50)]
+    with app.app_context():
+        tokens = make_logging_jwts('e_1', emails, hours=2)
+        assert len(tokens) == len(emails)
+        for email, token in zip(emails, tokens):
+            payload, error = decode_logging_jwt(token)
+            assert error is None
+            assert payload['event_id'] == 'e_1'
+            assert payload['volunteer_email'] == email
+            assert payload['exp'] - payload['iat'] == 2 * 3600
+
+
+def test_bulk_tokens_share_one_timestamp():
+    app = make_app()
+    with app.app_context():
+        tokens = make_logging_jwts('e_1', ['a@auib.edu.iq', 'b@auib.edu.iq'])
+    payloads = [jwt.decode(t, 'test-secret', algorithms=['HS256']) for t in tokens]
+    assert payloads[0]['iat'] == payloads[1]['iat']
+
+
+def test_failed_sends_are_marked_failed(sqlite_app, monkeypatch):
+    from Backend import email, invitations, models
+    from Backend.db import get_db
+
+    sent = []
+
+    def fake_send(subject, body, recipients, **kwargs):
+        if recipients == 'bounce@auib.edu.iq':
+            return False
+        if recipients == 'crash@auib.edu.iq':
+            raise RuntimeError('SMTP down')
+        sent.append(recipients)
+        return True
+
+    monkeypatch.setattr(email, 'send_email', fake_send)
+    with sqlite_app.app_context():
+        db = get_db()
+        db.add(models.Event(id='e_1', name='Beach cleanup'))
+        invitations.add_invitations(db, 'e_1', [
+            {'email': 'ok@auib.edu.iq'}, {'email': 'bounce@auib.edu.iq'}, {'email': 'crash@auib.edu.iq'},
+        ])
+        db.commit()
+        invitations.mint_invitations('e_1', 'http://localhost/log/')
+        assert invitations.email_invitations('e_1') == 1
+        status = dict(db.query(models.EventInvitation.email, models.EventInvitation.status))
+    assert sent == ['ok@auib.edu.iq']
+    assert status == {'ok@auib.edu.iq': 'SENT', 'bounce@auib.edu.iq': 'FAILED', 'crash@auib.edu.iq': 'FAILED'}
+
+
+def test_resend_picks_up_stuck_and_failed_invitations(sqlite_app, login, monkeypatch):
+    import threading
+    from datetime import datetime, timedelta
+
+    from Backend import email, models
+    from Backend.db import get_db
+
+    sent = []
+    monkeypatch.setattr(email, 'send_email', lambda subject, body, recipients, **kwargs: sent.append(recipients) or True)
+    with sqlite_app.app_context():
+        db = get_db()
+        officer_id = db.query(models.User.id).filter_by(email='officer@auib.edu').scalar()
+        db.add(models.Event(id='e_1', name='Beach cleanup', officer_id=officer_id))
+        db.add(models.EventInvitation(id='inv_1', event_id='e_1', email='failed@auib.edu.iq', status='FAILED',
+                                      link='http://localhost/log/t1'))
+        db.add(models.EventInvitation(id='inv_2', event_id='e_1', email='sent@auib.edu.iq', status='SENT',
+                                      link='http://localhost/log/t2'))
+        # a batch that is still running
+        db.add(models.EventInvitation(id='inv_3', event_id='e_1', email='stuck@auib.edu.iq', status='PENDING'))
+        db.commit()
+    officer = login('officer@auib.edu', 'officer123')
+    with officer.session_transaction() as session:
+        session.pop('_flashes', None)
+
+    def resend():
+        officer.post('/officer/event_invitations/e_1/resend')
+        for thread in threading.enumerate():
+            if thread.name == 'event-invitations':
+                thread.join()
+        with officer.session_transaction() as session:
+            return [message for _, message in session.pop('_flashes', [])]
+
+    assert resend()[0].startswith('Invitations are still being sent')
+    assert sent == []
+
+    # the worker was restarted: the PENDING row is old and nothing moves it on
+    with sqlite_app.app_context():
+        db = get_db()
+        db.query(models.EventInvitation).filter_by(id='inv_3').update({'created_at': datetime.utcnow() - timedelta(hours=1)})
+        db.commit()
+    assert resend() == ['Resending 2 invitations in the background.']
+    assert sorted(sent) == ['failed@auib.edu.iq', 'stuck@auib.edu.iq']
+    with sqlite_app.app_context():
+        status = dict(get_db().query(models.EventInvitation.email, models.EventInvitation.status))
+    assert set(status.values()) == {'SENT'}
+    assert resend() == ['Every invitation has already been sent.']
@@ -0,0 +1,73 @@
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+from Backend import maintenance
+from Backend.models import compute_hours
+
+
+def test_compute_hours():
+    assert compute_hours('2025-01-01T10:00:00', '2025-01-01T12:30:00') == 2.5
+    assert compute_hours('2025-01-01T10:00:00', datetime(2025, 1, 1, 9)) == -1.0
+    assert compute_hours('bad', '2025-01-01T12:30:00') is None
+    assert compute_hours('2025-01-01T10:00:00', None) is None
+
+
+def test_analyze_chunk_classifies_rows():
+    df = pd.DataFrame([
+        ('a', '2025-01-01T10:00:00', '2025-01-01T12:00:00', 2.0, None, 'PENDING', None),   # fine
+        ('b', '2025-01-01T10:00:00', '2025-01-01T12:00:00', None, None, 'PENDING', None),  # missing hours: fixed silently
+        ('c', '2025-01-01T10:00:00', '2025-01-01T12:00:00', 5.0, None, 'PENDING', None),   # mismatch
+        ('d', '2025-01-01T10:00:00', '2025-01-01T09:00:00', -1.0, None, 'PENDING', None),  # negative
+        ('e', '2025-01-01T10:00:00', '2025-01-02T12:00:00', 26.0, None, 'PENDING', None),  # over 24h
+        ('f', 'yesterday', '2025-01-01T12:00:00', 1.0, None, 'PENDING', None),             # unparseable
+        ('g', '2025-01-01T10:00:00', None, None, None, 'PENDING', None),                   # stale open
+        ('h', None, None, 3.0, 'BULK', 'APPROVED', None),                                  # bulk row: ignored
+        ('i', '2025-01-01T10:00:00', '2025-01-01T12:00:00', 5.0, None, 'APPROVED', None),  # reviewed: recorded only
+        ('j', '2025-01-01T10:00:00', '2025-01-01T12:00:00', 5.0, None, 'REJECTED', None),  # reviewed: recorded only
+        ('k', '2025-01-01T10:00:00', '2025-01-01T12:00:00', None, None, 'APPROVED', None), # no hours at all: fixed
+    ], columns=['id', 'start_ts', 'stop_ts', 'calculated_hours', 'marker', 'status', 'event_end'])
+    fixes, anomalies, stale = maintenance.analyze_chunk(df, datetime(2025, 1, 10), timedelta(hours=48))
+    assert fixes == {'b': 2.0, 'c': 2.0, 'k': 2.0}
+    assert sorted((tid, kind) for tid, kind, _ in anomalies) == [
+        ('c', 'HOURS_MISMATCH'), ('d', 'NON_POSITIVE'), ('e', 'OVER_24H'), ('f', 'UNPARSEABLE'), ('g', 'STALE_OPEN'),
+        ('i', 'HOURS_MISMATCH'), ('j', 'HOURS_MISMATCH'),
+    ]
+    assert list(stale['id']) == ['g']
+
+
+def test_scan_keeps_reviewed_hours(sqlite_app):
+    from Backend import models
+    from Backend.db import get_db
+
+    with sqlite_app.app_context():
+        db = get_db()
+        for tid, status in (('tl_1', 'PENDING'), ('tl_2', 'APPROVED')):
+            db.add(models.TimeLog(id=tid, student_email='v@auib.edu.iq', status=status, calculated_hours=5.0,
+                                  start_ts='2025-01-01T10:00:00', stop_ts='2025-01-01T12:00:00'))
+        db.commit()
+        summary = maintenance.scan_timelogs(now=datetime(2025, 1, 2))
+        hours = dict(db.query(models.TimeLog.id, models.TimeLog.calculated_hours))
+        kinds = sorted(db.query(models.TimelogAnomaly.timelog_id, models.TimelogAnomaly.kind))
+    assert summary['recomputed'] == 1
+    assert hours == {'tl_1': 2.0, 'tl_2': 5.0}
+    assert kinds == [('tl_1', 'HOURS_MISMATCH'), ('tl_2', 'HOURS_MISMATCH')]
+
+
+def test_closing_stale_sessions_keeps_existing_markers(sqlite_app):
+    from Backend import models
+    from Backend.db import get_db
+
+    with sqlite_app.app_context():
+        db = get_db()
+        for tid, marker in (('tl_1', None), ('tl_2', 'CLIENT_TIME')):
+            db.add(models.TimeLog(id=tid, student_email='v@auib.edu.iq', status='PENDING', marker=marker,
+                                  start_ts='2025-01-01T10:00:00'))
+        db.commit()
+        summary = maintenance.scan_timelogs(policy='close', now=datetime(2025, 1, 10))
+        rows = {t.id: (t.marker, t.stop_ts, t.calculated_hours) for t in db.query(models.TimeLog)}
+        kinds = sorted(db.query(models.TimelogAnomaly.timelog_id, models.TimelogAnomaly.kind))
+    assert summary['closed'] == 2
+    assert rows == {'tl_1': ('AUTO_CLOSED', '2025-01-01T10:00:00', 0.0),
+                    'tl_2': ('CLIENT_TIME', '2025-01-01T10:00:00', 0.0)}
+    assert kinds == [('tl_1', 'STALE_OPEN'), ('tl_2', 'STALE_OPEN')]
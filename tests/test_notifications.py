@@ -0,0 +1,134 @@
+import threading
+from datetime import datetime, timedelta
+
+import pytest
+from werkzeug.security import generate_password_hash
+
+from Backend import models, notifications
+from Backend.db import get_db
+
+
+@pytest.fixture
+def outbox(sqlite_app, monkeypatch):
+    sent = []
+
+    def fake_send(subject, body, recipients, async_send=True, **kwargs):
+        sent.append({'subject': subject, 'body': body, 'recipients': recipients})
+        return True
+
+    monkeypatch.setattr(notifications, 'send_email', fake_send)
+    # no timer threads: the tests flush by hand
+    monkeypatch.setattr(notifications, 'schedule_flush', lambda delay: None)
+    with sqlite_app.test_request_context():
+        db = get_db()
+        db.add(models.User(id='u_off2', email='officer2@auib.edu', name='Officer Two', role='officer',
+                           password_hash=generate_password_hash('x')))
+        student = db.query(models.User).filter_by(email='student@auib.edu').one()
+        for tid, priority in (('tk_1', 'normal'), ('tk_2', 'normal'), ('tk_3', 'urgent')):
+            db.add(models.Ticket(id=tid, submitter_id=student.id, title=f'Ticket {tid}', description='Broken printer',
+                                 category='problem', priority=priority))
+        db.commit()
+        yield sent
+
+
+def _ticket(tid):
+    return get_db().query(models.Ticket).filter_by(id=tid).one()
+
+
+def _wait_for_urgent_sends():
+    for thread in threading.enumerate():
+        if thread.name == 'ticket-urgent':
+            thread.join()
+
+
+def test_one_digest_per_recipient(outbox):
+    notifications.queue([
+        (_ticket('tk_1'), 'status_changed', 'student@auib.edu', 'Open -> Resolved'),
+        (_ticket('tk_2'), 'status_changed', 'student@auib.edu', 'Open -> In Progress'),
+        (_ticket('tk_2'), 'responded', 'student@auib.edu', None),
+        (_ticket('tk_1'), 'assigned', 'officer@auib.edu', 'Assigned to Officer One'),
+    ])
+    # nothing goes out inside the window
+    assert notifications.flush_digests() == 0
+    later = datetime.utcnow() + timedelta(minutes=notifications.DIGEST_MINUTES + 1)
+    assert notifications.flush_digests(now=later) == 2
+    by_recipient = {tuple(m['recipients']): m for m in outbox}
+    assert set(by_recipient) == {('student@auib.edu',), ('officer@auib.edu',)}
+    student = by_recipient[('student@auib.edu',)]
+    assert student['subject'] == 'Ticket updates: 2 tickets'
+    assert 'Open -> Resolved' in student['body'] and 'New response' in student['body']
+
+
+def test_officer_events_fan_out_in_one_email(outbox):
+    notifications.queue([
+        (_ticket('tk_1'), 'created', notifications.OFFICERS, None),
+        (_ticket('tk_2'), 'created', notifications.OFFICERS, None),
+    ])
+    assert notifications.flush_digests(force=True) == 1
+    assert len(outbox) == 1
+    assert sorted(outbox[0]['recipients']) == ['officer2@auib.edu', 'officer@auib.edu']
+
+
+def test_urgent_tickets_are_sent_immediately(outbox):
+    notifications.queue([(_ticket('tk_3'), 'created', notifications.OFFICERS, None)])
+    _wait_for_urgent_sends()
+    assert len(outbox) == 1
+    assert outbox[0]['subject'].startswith('[Urgent]')
+    assert notifications.flush_digests(force=True) == 0
+    get_db().expire_all()
+    assert get_db().query(models.TicketNotification).filter_by(sent_at=None).count() == 0
+
+
+def test_failed_urgent_email_is_retried(outbox, monkeypatch):
+    monkeypatch.setattr(notifications, 'send_email', lambda **kwargs: False)
+    notifications.queue([(_ticket('tk_3'), 'responded', 'student@auib.edu', None)])
+    _wait_for_urgent_sends()
+    get_db().expire_all()
+    assert get_db().query(models.TicketNotification).filter_by(sent_at=None).count() == 1
+    monkeypatch.setattr(notifications, 'send_email', lambda **kwargs: outbox.append(kwargs) or True)
+    # the failed send keeps its claim until RETRY_MINUTES have passed
+    assert notifications.flush_digests(force=True) == 0
+    retry = datetime.utcnow() + timedelta(minutes=notifications.RETRY_MINUTES + 1)
+    assert notifications.flush_digests(now=retry, force=True) == 1
+    assert len(outbox) == 1
+
+
+def test_notification_errors_do_not_fail_the_request(sqlite_app, outbox, login, monkeypatch):
+    def broken(delay):
+        raise RuntimeError('timer unavailable')
+
+    monkeypatch.setattr(notifications, 'schedule_flush', broken)
+    officer = login('officer@auib.edu', 'officer123')
+    assert officer.post('/tickets/tk_1/status', data={'status': 'resolved'}).status_code == 302
+    with sqlite_app.app_context():
+        assert _ticket('tk_1').status == 'resolved'
+
+
+def test_no_double_send(outbox, monkeypatch):
+    notifications.queue([(_ticket('tk_1'), 'responded', 'student@auib.edu', None)])
+    nested = []
+    send = notifications.send_email
+
+    def send_while_flushing(**kwargs):
+        # a second worker flushing while this one is sending finds nothing to claim
+        nested.append(notifications.flush_digests(force=True))
+        return send(**kwargs)
+
+    monkeypatch.setattr(notifications, 'send_email', send_while_flushing)
+    assert notifications.flush_digests(force=True) == 1
+    assert nested == [0]
+    assert notifications.flush_digests(force=True) == 0
+    assert len(outbox) == 1
+
+
+def test_failed_digest_is_retried(outbox, monkeypatch):
+    notifications.queue([(_ticket('tk_1'), 'responded', 'student@auib.edu', None)])
+    monkeypatch.setattr(notifications, 'send_email', lambda **kwargs: False)
+    now = datetime.utcnow()
+    assert notifications.flush_digests(now=now, force=True) == 0
+    monkeypatch.setattr(notifications, 'send_email', lambda **kwargs: outbox.append(kwargs) or True)
+    # still claimed by the failed flush
+    assert notifications.flush_digests(now=now, force=True) == 0
+    retry = now + timedelta(minutes=notifications.RETRY_MINUTES + 1)
+    assert notifications.flush_digests(now=retry, force=True) == 1
+    assert len(outbox) == 1
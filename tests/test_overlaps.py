@@ -0,0 +1,50 @@
+from datetime import datetime
+
+from Backend import models, overlaps
+from Backend.db import get_db
+
+
+def _event(db, event_id, start_hour, end_hour):
+    ev = models.Event(id=event_id, name=event_id, start_ts=datetime(2025, 5, 1, start_hour), end_ts=datetime(2025, 5, 1, end_hour))
+    db.add(ev)
+    return ev
+
+
+def _timelog(db, tid, event_id, start=None, stop=None, status='PENDING', email='v@auib.edu.iq'):
+    db.add(models.TimeLog(id=tid, student_email=email, event_id=event_id, status=status, start_ts=start, stop_ts=stop))
+
+
+def test_conflicting_events(sqlite_app):
+    with sqlite_app.app_context():
+        db = get_db()
+        morning = _event(db, 'e_morning', 9, 12)
+        _event(db, 'e_noon', 11, 13)       # overlaps the morning
+        _event(db, 'e_after', 12, 14)      # starts as the morning ends: no overlap
+        _event(db, 'e_other', 10, 11)      # overlaps, but the volunteer left it
+        db.add(models.Event(id='e_open', name='open', start_ts=datetime(2025, 5, 1, 8)))  # no end: never conflicts
+        for tid, event_id, status in (('t1', 'e_noon', 'SIGNED_UP'), ('t2', 'e_after', 'SIGNED_UP'),
+                                      ('t3', 'e_other', 'REJECTED'), ('t4', 'e_open', 'SIGNED_UP')):
+            _timelog(db, tid, event_id, status=status)
+        _timelog(db, 't5', 'e_noon', status='SIGNED_UP', email='someone@auib.edu.iq')
+        db.commit()
+        found = overlaps.conflicting_events(db, 'v@auib.edu.iq', morning)
+        assert [ev.id for ev in found] == ['e_noon']
+        assert overlaps.conflicting_events(db, 'nobody@auib.edu.iq', morning) == []
+
+
+def test_overlapping_sessions(sqlite_app):
+    with sqlite_app.app_context():
+        db = get_db()
+        _timelog(db, 'a', None, '2025-05-01T09:00:00', '2025-05-01T11:00:00')
+        _timelog(db, 'b', None, '2025-05-01T10:00:00', '2025-05-01T12:00:00')   # overlaps a
+        _timelog(db, 'c', None, '2025-05-01T12:00:00', '2025-05-01T13:00:00')   # back to back with b
+        _timelog(db, 'd', None, '2025-05-01T20:00:00', None)                    # still open
+        _timelog(db, 'e', None, '2025-05-01T21:00:00', '2025-05-01T22:00:00')   # inside the open session
+        _timelog(db, 'f', None, '2025-05-01T13:15:00', '2025-05-01T13:45:00', status='REJECTED')
+        _timelog(db, 'h', None, '2025-05-01T13:00:00', '2025-05-01T14:00:00')   # only overlaps the rejected f
+        _timelog(db, 'g', None, '2025-05-01T09:00:00', '2025-05-01T11:00:00', email='other@auib.edu.iq')
+        db.commit()
+        ids = ['a', 'b', 'c', 'd', 'e', 'f', 'g', 'h']
+        assert overlaps.overlapping_sessions(db, ids) == {'a', 'b', 'd', 'e', 'f'}
+        # batching gives the same answer
+        assert overlaps.overlapping_sessions(db, ids, batch_size=2) == {'a', 'b', 'd', 'e', 'f'}
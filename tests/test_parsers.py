@@ -0,0 +1,92 @@
+import io
+
+import openpyxl
+import pytest
+
+from Backend import parsers
+
+
+def csv_file(text):
+    return io.BytesIO(text.encode())
+
+
+def test_hours_upload_reports_first_error_per_row():
+    data = (
+        'name,email,hours,role\n'
+        'A, A@auib.edu.iq ,2,helper\n'
+        'B,b@gmail.com,1,helper\n'
+        'C,c@auib.edu.iq,abc,helper\n'
+        'D,d@auib.edu.iq,0,helper\n'
+        ',e@auib.edu.iq,1,helper\n'
+        'F,a@auib.edu.iq,1,helper\n'
+    )
+    entries, errors, count = parsers.parse_hours_file(csv_file(data), 'hours.csv', chunk_rows=2)
+    assert entries == []
+    assert count == 5
+    assert errors == [
+        'Row 3: Email must end with @auib.edu.iq: b@gmail.com',
+        'Row 4: Hours must be a number: abc',
+        'Row 5: Hours must be positive: 0',
+        'Row 6: Name and role are required',
+        'Row 7: Duplicate email in file: a@auib.edu.iq',
+    ]
+
+
+def test_hours_upload_normalizes_valid_rows():
+    data = 'name,email,hours,role\n Ann , ANN@AUIB.EDU.IQ ,1.5, lead \nBo,bo@auib.edu.iq,2,helper\n'
+    entries, errors, count = parsers.parse_hours_file(csv_file(data), 'hours.csv', chunk_rows=1)
+    assert (errors, count) == ([], 0)
+    assert entries == [
+        {'name': 'Ann', 'email': 'ann@auib.edu.iq', 'hours': 1.5, 'role': 'lead'},
+        {'name': 'Bo', 'email': 'bo@auib.edu.iq', 'hours': 2.0, 'role': 'helper'},
+    ]
+
+
+def test_hours_upload_requires_columns():
+    with pytest.raises(parsers.ParseError, match='Missing required columns: hours, role'):
+        parsers.parse_hours_file(csv_file('name,email\nA,a@auib.edu.iq\n'), 'hours.csv')
+
+
+def test_roster_upload_drops_invalid_and_duplicate_emails():
+    data = 'Email,Name\na@auib.edu.iq,Ann\nA@AUIB.EDU.IQ,Other\nb@auib.edu.iq,\nnot-an-email,X\n'
+    roster = parsers.parse_roster(csv_file(data), 'roster.csv')
+    assert roster == [{'email': 'a@auib.edu.iq', 'name': 'Ann'}, {'email': 'b@auib.edu.iq', 'name': 'b'}]
+
+
+def test_roster_limit_and_manual_entry_errors():
+    with pytest.raises(parsers.RosterError, match='Limit is 1, file contains 2'):
+        parsers.parse_roster(csv_file('email\na@auib.edu.iq\nb@auib.edu.iq\n'), 'roster.csv', limit=1)
+    with pytest.raises(parsers.RosterError, match='Invalid email address: bad'):
+        parsers.roster_from_form(['A', 'B'], ['a@auib.edu.iq', 'bad'])
+    with pytest.raises(parsers.RosterError, match='At least one volunteer email'):
+        parsers.roster_from_form([], ['  '])
+
+
+def xlsx_file(rows):
+    wb = openpyxl.Workbook()
+    for row in rows:
+        wb.active.append(row)
+    out = io.BytesIO()
+    wb.save(out)
+    out.seek(0)
+    return out
+
+
+def test_xlsx_upload_is_streamed_in_chunks():
+    rows = [['name', 'email', 'hours', 'role'], ['A', 'a@auib.edu.iq', 2, 'helper'], [None, None, None, None],
+            ['B', 'b@auib.edu.iq', 1.5, 'lead'], ['C', 'bad@gmail.com', 1, 'helper']]
+    batches = list(parsers.iter_hours_batches(xlsx_file(rows), 'hours.xlsx', chunk_rows=2))
+    assert batches[0] == ([{'name': 'A', 'email': 'a@auib.edu.iq', 'hours': 2.0, 'role': 'helper'},
+                           {'name': 'B', 'email': 'b@auib.edu.iq', 'hours': 1.5, 'role': 'lead'}], [])
+    assert batches[1] == ([], ['Row 5: Email must end with @auib.edu.iq: bad@gmail.com'])
+
+
+def test_upload_header_and_row_cap(monkeypatch):
+    with pytest.raises(parsers.ParseError, match='Missing required columns: hours, role'):
+        next(parsers.iter_hours_batches(xlsx_file([['name', 'email']]), 'hours.xlsx'))
+    monkeypatch.setattr(parsers, 'MAX_ROWS', 2)
+    rows = [['email']] + [[f'u{i}@auib.edu.iq'] for i in range(3)]
+    with pytest.raises(parsers.ParseError, match='too many rows'):
+        parsers.parse_roster(xlsx_file(rows), 'roster.xlsx')
+    with pytest.raises(parsers.ParseError, match='too many rows'):
+        parsers.parse_roster(csv_file('\n'.join(r[0] for r in rows)), 'roster.csv')
@@ -0,0 +1,93 @@
+import hashlib
+import io
+import os
+
+from flask import Flask
+
+from Backend import storage
+
+
+def test_write_blob_is_content_addressed(tmp_path):
+    app = Flask(__name__)
+    app.config['ATTACHMENT_STORAGE_DIR'] = str(tmp_path)
+    data = b'screenshot' * 10000
+    digest = hashlib.sha256(data).hexdigest()
+    with app.app_context():
+        assert storage.write_blob(io.BytesIO(data)) == (digest, len(data))
+        # a second copy of the same content lands on the same blob
+        assert storage.write_blob(io.BytesIO(data)) == (digest, len(data))
+        path = storage.blob_path(digest)
+    assert path == os.path.join(str(tmp_path), digest[:2], digest[2:4], digest)
+    with open(path, 'rb') as f:
+        assert f.read() == data
+    # no temporary files left behind
+    assert os.listdir(tmp_path) == [digest[:2]]
+
+
+def test_write_blob_stops_at_limit(tmp_path):
+    app = Flask(__name__)
+    app.config['ATTACHMENT_STORAGE_DIR'] = str(tmp_path)
+    with app.app_context():
+        try:
+            storage.write_blob(io.BytesIO(b'x' * 1000), max_bytes=999, head=b'y')
+        except storage.TooLarge:
+            pass
+        else:
+            raise AssertionError('expected TooLarge')
+        assert storage.write_blob(io.BytesIO(b'x' * 998), max_bytes=999, head=b'y')[1] == 999
+    assert len(os.listdir(tmp_path)) == 1
+
+
+def test_sniff_mime():
+    assert storage.sniff_mime(b'\x89PNG\r\n\x1a\n....') == 'image/png'
+    assert storage.sniff_mime(b'%PDF-1.7') == 'application/pdf'
+    assert storage.sniff_mime(b'PK\x03\x04rest') == 'application/zip'
+    assert storage.sniff_mime(b'plain words') == 'text/plain'
+    assert storage.sniff_mime(b'\x00\x01binary') is None
+
+
+def _blob(db, digest):
+    from Backend import models
+    return db.query(models.AttachmentBlob).filter_by(sha256=digest).first()
+
+
+def test_purge_keeps_a_blob_uploaded_again(sqlite_app):
+    from Backend.db import get_db
+    data = b'%PDF-1.4 shared report'
+    with sqlite_app.app_context():
+        db = get_db()
+        digest, size = storage.save_blob(db, io.BytesIO(data), 'application/pdf')
+        db.commit()
+        assert storage.release(db, [digest]) == [digest]
+        db.commit()
+        # the same file is attached again before the cleanup runs
+        assert storage.save_blob(db, io.BytesIO(data), 'application/pdf') == (digest, size)
+        db.commit()
+        assert storage.purge(db, [digest]) == 0
+        assert _blob(db, digest).ref_count == 1
+        assert os.path.exists(storage.blob_path(digest))
+
+
+def test_upload_racing_a_purge_restores_the_file(sqlite_app):
+    from Backend.db import get_db
+    data = b'%PDF-1.4 shared report'
+    with sqlite_app.app_context():
+        db = get_db()
+        digest, size = storage.save_blob(db, io.BytesIO(data), 'application/pdf')
+        db.commit()
+        storage.release(db, [digest])
+        db.commit()
+        # an upload of the same content has staged its copy but not yet taken a reference...
+        staged_digest, _, tmp = storage.stage_blob(io.BytesIO(data))
+        assert staged_digest == digest
+        # ...when the purge removes the unreferenced blob
+        assert storage.purge(db, [digest]) == 1
+        assert not os.path.exists(storage.blob_path(digest))
+        assert _blob(db, digest) is None
+        # the upload then takes its reference and moves its copy into place, as save_blob does
+        storage.add_ref(db, digest, size, 'application/pdf')
+        storage.place_blob(tmp, digest)
+        db.commit()
+        assert _blob(db, digest).ref_count == 1
+        with open(storage.blob_path(digest), 'rb') as f:
+            assert f.read() == data
@@ -0,0 +1,34 @@
+import io
+import os
+from concurrent.futures import Future
+
+import pytest
+
+from Backend import models, storage, thumbnails
+from Backend.db import get_db
+
+Image = pytest.importorskip('PIL.Image')
+
+
+def test_render_preview_writes_file_and_records_format(sqlite_app):
+    png = io.BytesIO()
+    Image.new('RGB', (800, 600), (200, 30, 30)).save(png, format='PNG')
+    png.seek(0)
+    fmt = thumbnails.preview_format()
+    with sqlite_app.app_context():
+        db = get_db()
+        sha256, _ = storage.save_blob(db, png, 'image/png')
+        db.commit()
+        dest = storage.preview_path(sha256, fmt)
+
+        assert thumbnails.render_preview(storage.blob_path(sha256), dest, 'image/png', fmt) == fmt
+        assert os.path.exists(dest)
+        assert dest.endswith(f'.preview.{fmt}')
+        with Image.open(dest) as preview:
+            assert max(preview.size) <= max(thumbnails.PREVIEW_SIZE)
+
+        future = Future()
+        future.set_result(fmt)
+        thumbnails._record(sqlite_app, sha256, future)
+        get_db().expire_all()
+        assert get_db().get(models.AttachmentBlob, sha256).preview == fmt
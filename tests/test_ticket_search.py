@@ -0,0 +1,20 @@
+from Backend import ticket_search
+
+
+def test_words_drop_websearch_operators():
+    assert ticket_search._words('"printer jam" or -toner 3rd-floor') == ['printer', 'jam', '3rd-floor']
+
+
+def test_snippet_is_escaped_and_marked():
+    text = ticket_search._fallback_snippet('The <b>printer</b> on floor 3 jams', ['printer'])
+    html = str(ticket_search._markup(text))
+    assert '&lt;b&gt;<mark>printer</mark>&lt;/b&gt;' in html
+    assert '<b>' not in html
+
+
+def test_snippet_windows_long_text_around_first_match():
+    body = 'x ' * 200 + 'toner low ' + 'y ' * 200
+    text = ticket_search._fallback_snippet(body, ['toner'])
+    assert text.startswith('…') and text.endswith('…')
+    assert '<mark>toner</mark>' in str(ticket_search._markup(text))
+    assert len(str(ticket_search._markup(text))) <= ticket_search.SNIPPET_CHARS + 2 + len('<mark></mark>')
@@ -0,0 +1,38 @@
+from types import SimpleNamespace
+
+from sqlalchemy.dialects import postgresql
+
+from Backend import db as db_module, models
+from Backend.db import get_db
+
+
+def test_bad_timestamp_does_not_block_the_batch(sqlite_app, login):
+    with sqlite_app.app_context():
+        db = get_db()
+        db.add(models.Event(id='e_1', name='Food Drive'))
+        for t_id, start, stop in (('tl_1', '2025-03-01T10:00:00', '2025-03-01T12:30:00'),
+                                  ('tl_2', 'yesterday', '2025-03-01T12:30:00'),
+                                  ('tl_3', '2025-03-01T09:00:00', '2025-03-01T10:00:00')):
+            db.add(models.TimeLog(id=t_id, student_email='a@auib.edu.iq', event_id='e_1', start_ts=start, stop_ts=stop,
+                                  status='PENDING'))
+        db.commit()
+    officer = login('officer@auib.edu', 'officer123')
+    with officer.session_transaction() as session:
+        session.pop('_flashes', None)
+
+    officer.post('/officer/timelogs', data={'action': 'approve', 'ids[]': ['tl_1', 'tl_2', 'tl_3']})
+    with officer.session_transaction() as session:
+        assert [message for _, message in session['_flashes']] == ['3 timelogs approved']
+    with sqlite_app.app_context():
+        logs = {t.id: (t.status, t.calculated_hours) for t in get_db().query(models.TimeLog)}
+    assert logs == {'tl_1': ('APPROVED', 2.5), 'tl_2': ('APPROVED', None), 'tl_3': ('APPROVED', 1.0)}
+
+
+def test_postgresql_casts_only_iso_timestamps(monkeypatch):
+    bind = SimpleNamespace(dialect=postgresql.dialect())
+    monkeypatch.setattr(db_module, 'get_db', lambda: SimpleNamespace(get_bind=lambda: bind))
+    TimeLog = models.TimeLog
+    sql = str(db_module.hours_between(TimeLog.start_ts, TimeLog.stop_ts).compile(dialect=postgresql.dialect()))
+    assert sql.startswith('CASE WHEN')
+    assert sql.count(' ~ ') == 2
+    assert 'CAST(timelogs.start_ts AS TIMESTAMP WITHOUT TIME ZONE)' in sql
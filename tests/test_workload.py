@@ -0,0 +1,93 @@
+import pytest
+from sqlalchemy import update
+from werkzeug.security import generate_password_hash
+
+from Backend import models, notifications, workload
+from Backend.db import get_db
+
+
+@pytest.fixture
+def tickets(sqlite_app, monkeypatch):
+    """A second officer, and the seeded officer holding tk_1 (open) and tk_2 (in progress)."""
+    monkeypatch.setattr(notifications, 'send_email', lambda **kwargs: True)
+    monkeypatch.setattr(notifications, 'schedule_flush', lambda delay: None)
+    with sqlite_app.app_context():
+        db = get_db()
+        db.add(models.User(id='u_off2', email='officer2@auib.edu', name='Officer Two', role='officer',
+                           password_hash=generate_password_hash('x')))
+        users = {u.email: u.id for u in db.query(models.User)}
+        for tid, status in (('tk_1', 'open'), ('tk_2', 'in_progress'), ('tk_3', 'resolved')):
+            db.add(models.Ticket(id=tid, submitter_id=users['student@auib.edu'], title=f'Ticket {tid}',
+                                 description='Broken printer', category='problem', priority='normal', status=status,
+                                 assigned_officer_id=users['officer@auib.edu']))
+        db.commit()
+        return users
+
+
+def _counters():
+    """``{officer_id: (open, in_progress, active)}`` as stored, leaving out empty rows."""
+    return {w.officer_id: (w.open_count, w.in_progress_count, w.active_count)
+            for w in get_db().query(models.OfficerWorkload) if w.active_count}
+
+
+def _recount():
+    return {officer_id: (c['open'], c['in_progress'], c['open'] + c['in_progress'])
+            for officer_id, c in workload._counts(get_db()).items()}
+
+
+def test_auto_assign_picks_least_loaded_officer(sqlite_app, tickets, login):
+    sqlite_app.config['TICKET_AUTO_ASSIGN'] = True
+    student = login('student@auib.edu', 'student123')
+    for title in ('Projector is broken', 'Wifi is down again'):
+        student.post('/tickets/create', data={'title': title, 'description': 'Nothing works in room 101',
+                                              'category': 'problem', 'priority': 'normal'})
+    with sqlite_app.app_context():
+        created = get_db().query(models.Ticket).filter(models.Ticket.id.notin_(['tk_1', 'tk_2', 'tk_3'])).all()
+        assert [t.assigned_officer_id for t in created] == ['u_off2', 'u_off2']
+        assert _counters() == _recount() == {tickets['officer@auib.edu']: (1, 1, 2), 'u_off2': (2, 0, 2)}
+
+
+def test_counters_follow_status_and_assignment_changes(sqlite_app, tickets, login):
+    me = tickets['officer@auib.edu']
+    officer = login('officer@auib.edu', 'officer123')
+    with sqlite_app.app_context():
+        # rows are created lazily, counted from the tickets the officer already has
+        workload.adjust(get_db(), [(me, 'open')], [(me, 'in_progress')])
+        get_db().execute(update(models.Ticket).where(models.Ticket.id == 'tk_1').values(status='in_progress'))
+        get_db().commit()
+        assert _counters() == _recount() == {me: (0, 2, 2)}
+
+    officer.post('/tickets/tk_1/status', data={'status': 'resolved'})
+    officer.post('/tickets/tk_3/status', data={'status': 'open'})
+    with sqlite_app.app_context():
+        assert _counters() == _recount() == {me: (1, 1, 2)}
+
+    officer.post('/tickets/tk_2/assign', data={'officer_id': 'u_off2'})
+    with sqlite_app.app_context():
+        assert _counters() == _recount() == {me: (1, 0, 1), 'u_off2': (0, 1, 1)}
+
+    officer.post('/tickets/bulk_update', data={'ticket_ids': ['tk_3'], 'bulk_action': 'unassign'})
+    with sqlite_app.app_context():
+        assert _counters() == _recount() == {'u_off2': (0, 1, 1)}
+
+    officer.post('/tickets/bulk_update', data={'ticket_ids': ['tk_1', 'tk_2'], 'bulk_action': 'delete'})
+    with sqlite_app.app_context():
+        assert _counters() == _recount() == {}
+
+
+def test_reconcile_repairs_hand_edited_counter(sqlite_app, tickets):
+    me = tickets['officer@auib.edu']
+    with sqlite_app.app_context():
+        db = get_db()
+        assert workload.pick_officer(db) == 'u_off2'
+        db.commit()
+        assert _counters() == {me: (1, 1, 2)}
+        # a ticket changed by hand: the counters do not know about it
+        db.execute(update(models.Ticket).where(models.Ticket.id == 'tk_3').values(status='open', assigned_officer_id='u_off2'))
+        db.execute(update(models.OfficerWorkload).where(models.OfficerWorkload.officer_id == me).values(open_count=7, active_count=8))
+        db.commit()
+
+        assert workload.reconcile() == 2
+        assert _counters() == _recount() == {me: (1, 1, 2), 'u_off2': (1, 0, 1)}
+        assert all(w.reconciled_at for w in db.query(models.OfficerWorkload))
+        assert workload.reconcile() == 0